@@ -1,7 +1,8 @@
 import streamlit as st
-from utils.constants import MAP_STYLES, COLUMN_MAPPING
+from utils.constants import MAP_STYLES, COLUMN_MAPPING, TOP_N_CHOICES
+from utils.top_n_index import top_n_rows
 
-def render_sidebar_controls_for_top_N_task(df):
+def render_sidebar_controls_for_top_N_task():
     # Header row with logo and project title
     with st.sidebar:
         st.markdown(
@@ -25,13 +26,13 @@ def render_sidebar_controls_for_top_N_task(df):
     #     )
 
     metric = st.sidebar.selectbox("Select Metric", ["Select"] + list(COLUMN_MAPPING.keys()))
-    top_n = st.sidebar.selectbox("Top N Tornadoes", ["Select", 10, 20, 30, 40, 50, 150])
+    top_n = st.sidebar.selectbox("Top N Tornadoes", ["Select"] + TOP_N_CHOICES)
     map_style = st.sidebar.selectbox("Map Style", list(MAP_STYLES.keys()))
 
     value_range = (0.0, 100.0)
     if metric != "Select" and top_n != "Select":
         col, _ = COLUMN_MAPPING[metric]
-        filtered = df.sort_values(col, ascending=False).head(top_n)
+        filtered = top_n_rows(col, top_n)
         filtered = filtered.dropna(subset=["slat", "slon", "elat", "elon"])
         filtered = filtered[
             (filtered["slat"].between(-90, 90)) & (filtered["slon"].between(-180, 180)) &
@@ -47,9 +48,24 @@ def render_sidebar_controls_for_top_N_task(df):
                 value=(min_val, max_val),
                 step=(max_val - min_val) / 20
             )
+            # Fetch the weather of the rows the map will draw in the background; it shows placeholders until it lands
+            _warm_up_weather((metric, top_n, tuple(value_range)), top_n_rows(col, top_n, value_range))
 
     return metric, top_n, map_style, value_range
 
+def _warm_up_weather(selection, tornadoes):
+    # Once per new (metric, N, range) and session; keys another session is already fetching are skipped
+    from utils.weather import DISABLE_API_FETCH
+    if DISABLE_API_FETCH or st.session_state.get("weather_warmup_selection") == selection:
+        return
+    from utils.coordinates import validate_coordinates
+    from utils.weather_warmup import warm_up_tornadoes
+    drawn = [bool(validate_coordinates(r.slat, r.slon) and validate_coordinates(r.elat, r.elon))
+             for r in tornadoes[["slat", "slon", "elat", "elon"]].itertuples()]
+    tornadoes = tornadoes[drawn]
+    st.session_state["weather_warmup_selection"] = selection
+    st.session_state["weather_warmup_keys"] = warm_up_tornadoes(tornadoes)
+
 def render_sidebar_controls_for_weather_station_task():
     # Header row with logo and project title
     with st.sidebar:
@@ -1,17 +1,9 @@
 import streamlit as st
-
-from components.controls import render_sidebar_controls_for_top_N_task, render_sidebar_controls_for_weather_station_task
-from components.folium_map_render import folium_render_map
-from components.weather_station_explore import render_explore_page
-from utils.constants import COLUMN_MAPPING
-from utils.data_loader import load_tornado_data, load_station_data
-from utils.folium_utils import get_state_from_latlon
-from utils.top_n_utils import render_scientific_explorer, why_top_n_visualtion, initial_text
 import base64
 
-# Load data globally
-TDS = load_tornado_data()
-STATIONS = load_station_data()
+# The landing page only needs streamlit. Each view imports its own components (and through them
+# the tornado data, geopandas, folium, ...) inside its render function, the first time it is opened.
+# `python -m utils.startup_profile` checks the landing page against its startup budget.
 
 def get_base64_encoded_image(image_path):
     with open(image_path, "rb") as img_file:
@@ -142,6 +134,13 @@ def render_task_grid():
             """, unsafe_allow_html=True)
 
 def render_top_N_page():
+    from components.controls import render_sidebar_controls_for_top_N_task
+    from components.folium_map_render import folium_render_map
+    from utils.constants import COLUMN_MAPPING
+    from utils.top_n_index import top_n_rows
+    from utils.top_n_utils import render_scientific_explorer, why_top_n_visualtion, initial_text
+    from utils.weather_metrics import WEATHER_METRICS, WEATHER_DEBUG_PANEL
+
     cols = st.columns([0.05, 0.95])
     with cols[0]:
         if st.button("⬅️", key="back_btn", help="Go back to dashboard"):
@@ -153,24 +152,25 @@ def render_top_N_page():
     initial_text(st)
     st.markdown("<br>", unsafe_allow_html=True)
 
-    metric, top_n, map_style, value_range = render_sidebar_controls_for_top_N_task(TDS)
+    metric, top_n, map_style, value_range = render_sidebar_controls_for_top_N_task()
 
-    if metric != "Select" and top_n != "Select":
-        folium_render_map(TDS, metric, int(top_n), value_range, map_style)
-        why_top_n_visualtion(st)
+    # One weather lookup summary per rerun of this page
+    with WEATHER_METRICS.render("Top N page"):
+        if metric != "Select" and top_n != "Select":
+            folium_render_map(metric, int(top_n), value_range, map_style)
+            why_top_n_visualtion(st)
 
-        col_key, _ = COLUMN_MAPPING[metric]
-        min_val, max_val = value_range
-        filtered = TDS[(TDS[col_key] >= min_val) & (TDS[col_key] <= max_val)]
-        filtered = filtered.sort_values(col_key, ascending=False).head(int(top_n))
+            col_key, _ = COLUMN_MAPPING[metric]
+            filtered = top_n_rows(col_key, int(top_n), value_range)
 
-        filtered = filtered.copy()
-        filtered["state"] = filtered.apply(lambda row: get_state_from_latlon(row["slat"], row["slon"]), axis=1)
+            render_scientific_explorer(st, filtered)
 
-        render_scientific_explorer(st, filtered)
+        else:
+            st.info("Select both metric and top N to begin.")
 
-    else:
-        st.info("Select both metric and top N to begin.")
+    if WEATHER_DEBUG_PANEL:
+        from components.weather_metrics_panel import render_weather_metrics_panel
+        render_weather_metrics_panel()
 
     # === Footer ===
     st.markdown("---")
@@ -181,6 +181,9 @@ def render_top_N_page():
     """, unsafe_allow_html=True)
 
 def render_weather_stations_exploration_page():
+    from components.controls import render_sidebar_controls_for_weather_station_task
+    from components.weather_station_explore import render_explore_page
+
     cols = st.columns([0.05, 0.95])
     with cols[0]:
         if st.button("⬅️", key="back_btn", help="Go back to dashboard"):
@@ -1,6 +1,7 @@
 import folium
 import streamlit as st
 from folium.plugins import MarkerCluster
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 from components.map_utils import create_ef_layers
 from utils.constants import MAP_STYLES, COLUMN_MAPPING, EF_COLORS, \
@@ -8,10 +9,28 @@ from utils.constants import MAP_STYLES, COLUMN_MAPPING, EF_COLORS, \
 from utils.coordinates import validate_coordinates
 from utils.folium_utils import build_tornado_dropdown
 from utils.geojson import add_state_borders, add_ef_legend
-from utils.weather import load_cached_weather, prepare_weather_data
+from utils.top_n_index import top_n_rows
+from utils.weather import load_cached_weather, nearest_weather, prepare_weather_data
+from utils.weather_warmup import WARMUP_POLL_S, failed, in_flight
 
 
-def folium_render_map(data, column, top_n, value_range, map_style):
+def _weather_text(weather, field):
+    # ⏳ while the background warm-up is still fetching the point
+    return "⏳" if weather.get("pending") else weather.get(field, 'N/A')
+
+
+@st.fragment(run_every=WARMUP_POLL_S)
+def _weather_warmup_status():
+    # Polls only this banner; the map is rebuilt once, when the last background fetch has landed
+    warming = in_flight(st.session_state.get("weather_warmup_keys", ()))
+    if warming:
+        st.info(f"⏳ Fetching weather for {len(warming)} points in the background; the map updates once it has arrived.")
+    elif getattr(get_script_run_ctx(), "fragment_ids_this_run", None):
+        # Only from the banner's own poll: the full run drawing it already has every landed key
+        st.rerun()
+
+
+def folium_render_map(column, top_n, value_range, map_style):
     TORNADO_START_ICON = TORNADO_START_PNG_ICON if top_n >= 50 else TORNADO_START_GIF_ICON
     TORNADO_END_ICON = TORNADO_END_PNG_ICON if top_n >= 50 else TORNADO_END_GIF_ICON
     icon_size = (40, 40) if top_n >= 50 else (55, 55)
@@ -21,10 +40,7 @@ def folium_render_map(data, column, top_n, value_range, map_style):
     st.markdown("---")  # Horizontal line separator
 
     col_key, _ = COLUMN_MAPPING[column]
-    min_val, max_val = value_range
-
-    filtered = data[(data[col_key] >= min_val) & (data[col_key] <= max_val)]
-    filtered = filtered.sort_values(col_key, ascending=False).head(top_n)
+    filtered = top_n_rows(col_key, top_n, value_range)
     tornado_options, filtered = build_tornado_dropdown(filtered)
 
     selected_tornado_idx = st.sidebar.selectbox(
@@ -47,6 +63,14 @@ def folium_render_map(data, column, top_n, value_range, map_style):
 
     ef_layers = create_ef_layers()
     cache = load_cached_weather()
+    # Keys of this selection the background warm-up is still fetching; rendered as placeholders
+    warming = in_flight(st.session_state.get("weather_warmup_keys", ()))
+    if warming:
+        _weather_warmup_status()
+    # Keys whose background fetch failed are served nearest-or-missing, not fetched again during the render
+    lost = failed(st.session_state.get("weather_warmup_keys", ()))
+    # Misses of every tornado served from nearby cached points in one lookup
+    nearest = nearest_weather(filtered, cache, include_path=SHOW_PATHS, pending=warming)
     marker_cluster = MarkerCluster(name="Tornado Markers")
 
     for row_idx, row in filtered.iterrows():
@@ -58,7 +82,8 @@ def folium_render_map(data, column, top_n, value_range, map_style):
         color = EF_COLORS.get(int(row["mag"]), "#000000")
         ef_layer = ef_layers.get(f"EF{int(row['mag'])}", folium.FeatureGroup())
 
-        points, weather_data = prepare_weather_data(row, cache, include_path=SHOW_PATHS)
+        points, weather_data = prepare_weather_data(row, cache, include_path=SHOW_PATHS, pending=warming, nearest=nearest,
+                                                    failed=lost)
 
         # Updated to return {} instead of (None,) * 9 when missing
         start_weather = weather_data[0] if weather_data and isinstance(weather_data[0], dict) else {}
@@ -82,11 +107,11 @@ def folium_render_map(data, column, top_n, value_range, map_style):
             icon=folium.CustomIcon(TORNADO_START_ICON, icon_size=icon_size),
             popup=folium.Popup(
                 f"""<b>Tornado Start</b><br><b>Date:</b> {row['date']}<br>
-                    <b>Temp:</b> {start_weather.get('temperature', 'N/A')}°C<br>
-                    <b>Wind:</b> {start_weather.get('wind_speed', 'N/A')} m/s<br>
-                    <b>Humidity:</b> {start_weather.get('humidity', 'N/A')}%<br>
-                    <b>Pressure:</b> {start_weather.get('pressure', 'N/A')} hPa<br>
-                    <b>CAPE:</b> {start_weather.get('cape', 'N/A')}""",
+                    <b>Temp:</b> {_weather_text(start_weather, 'temperature')}°C<br>
+                    <b>Wind:</b> {_weather_text(start_weather, 'wind_speed')} m/s<br>
+                    <b>Humidity:</b> {_weather_text(start_weather, 'humidity')}%<br>
+                    <b>Pressure:</b> {_weather_text(start_weather, 'pressure')} hPa<br>
+                    <b>CAPE:</b> {_weather_text(start_weather, 'cape')}""",
                 max_width=300)
         ).add_to(marker_cluster)
 
@@ -95,12 +120,12 @@ def folium_render_map(data, column, top_n, value_range, map_style):
             location=end,
             icon=folium.CustomIcon(TORNADO_END_ICON, icon_size=icon_size),
             popup=folium.Popup(
-                f"""<b>Tornado End</b><br><b>Date:</b> {row['date']}<br><b>Length:</b> {row['len']} miles<br>
-                    <b>Temp:</b> {end_weather.get('temperature', 'N/A')}°C<br>
-                    <b>Wind:</b> {end_weather.get('wind_speed', 'N/A')} m/s<br>
-                    <b>Humidity:</b> {end_weather.get('humidity', 'N/A')}%<br>
-                    <b>Pressure:</b> {end_weather.get('pressure', 'N/A')} hPa<br>
-                    <b>CAPE:</b> {end_weather.get('cape', 'N/A')}""",
+                f"""<b>Tornado End</b><br><b>Date:</b> {row['date']}<br><b>Length:</b> {round(row['len'], 2)} miles<br>
+                    <b>Temp:</b> {_weather_text(end_weather, 'temperature')}°C<br>
+                    <b>Wind:</b> {_weather_text(end_weather, 'wind_speed')} m/s<br>
+                    <b>Humidity:</b> {_weather_text(end_weather, 'humidity')}%<br>
+                    <b>Pressure:</b> {_weather_text(end_weather, 'pressure')} hPa<br>
+                    <b>CAPE:</b> {_weather_text(end_weather, 'cape')}""",
                 max_width=300)
         ).add_to(marker_cluster)
 
@@ -120,8 +145,8 @@ def folium_render_map(data, column, top_n, value_range, map_style):
                     fill_color=color,
                     popup=folium.Popup(
                         f"""<b>Path Weather</b><br>
-                                    <b>Temp:</b> {weather.get("temperature", 'N/A')}°C<br>
-                                    <b>Wind:</b> {weather.get("wind_speed", 'N/A')} m/s""",
+                                    <b>Temp:</b> {_weather_text(weather, 'temperature')}°C<br>
+                                    <b>Wind:</b> {_weather_text(weather, 'wind_speed')} m/s""",
                                     max_width=300
                     )
                 ).add_to(ef_layer)
@@ -131,11 +156,13 @@ def folium_render_map(data, column, top_n, value_range, map_style):
                 color=color,
                 weight=2 + row["mag"] * 2,
                 tooltip=folium.Tooltip(
-                    f"<b>Date:</b> {row['date']}<br><b>Length:</b> {row['len']} miles<br>"
+                    f"<b>Date:</b> {row['date']}<br><b>Length:</b> {round(row['len'], 2)} miles<br>"
                     f"<b>EF Rating:</b> EF{int(row['mag'])}<br><b>Fatalities:</b> {row['fat']}<br><b>Injuries:</b> {row['inj']}",
                     sticky=True)
             ).add_to(ef_layer)
 
+    cache.flush()  # write this render's newly fetched weather in one batch
+
     # Add markers and layers to map
     for layer in ef_layers.values():
         layer.add_to(folium_map)
@@ -7,7 +7,7 @@ from utils.constants import MAP_STYLES, EF_COLORS, TORNADO_START_GIF_ICON, \
     TORNADO_END_GIF_ICON
 from utils.coordinates import validate_coordinates
 from utils.geojson import add_state_borders, add_ef_legend
-from utils.weather import load_cached_weather, prepare_weather_data
+from utils.weather import load_cached_weather, nearest_weather, prepare_weather_data
 
 
 def geo_radar_initial_text(st):
@@ -46,6 +46,8 @@ def render_geographic_radar_map(selected_df):
     add_state_borders(radar_map)
     ef_layers = create_ef_layers()
     cache = load_cached_weather()
+    # Misses of every tornado served from nearby cached points in one lookup
+    nearest = nearest_weather(selected_df, cache)
     marker_cluster = MarkerCluster(name="Radar Tornado Markers")
 
     for _, row in selected_df.iterrows():
@@ -58,7 +60,7 @@ def render_geographic_radar_map(selected_df):
         ef_layer = ef_layers.get(f"EF{int(row['mag'])}", folium.FeatureGroup())
 
         # Fetch weather data
-        points, weather_data = prepare_weather_data(row, cache, include_path=True)
+        points, weather_data = prepare_weather_data(row, cache, include_path=True, nearest=nearest)
         start_weather = weather_data[0] if weather_data and isinstance(weather_data[0], dict) else {}
         end_weather = weather_data[-1] if weather_data and isinstance(weather_data[-1], dict) else {}
 
@@ -81,7 +83,7 @@ def render_geographic_radar_map(selected_df):
             location=end,
             icon=folium.CustomIcon(TORNADO_END_GIF_ICON, icon_size=(55, 55)),
             popup=folium.Popup(
-                f"""<b>Tornado End</b><br><b>Date:</b> {row['date']}<br><b>Length:</b> {row['len']} miles<br>
+                f"""<b>Tornado End</b><br><b>Date:</b> {row['date']}<br><b>Length:</b> {round(row['len'], 2)} miles<br>
                     <b>Temp:</b> {end_weather.get('temperature', 'N/A')}°C<br>
                     <b>Wind:</b> {end_weather.get('wind_speed', 'N/A')} m/s<br>
                     <b>Humidity:</b> {end_weather.get('humidity', 'N/A')}%<br>
@@ -112,11 +114,13 @@ def render_geographic_radar_map(selected_df):
             color=color,
             weight=2 + row["mag"] * 2,
             tooltip=folium.Tooltip(
-                    f"<b>Date:</b> {row['date']}<br><b>Length:</b> {row['len']} miles<br>"
+                    f"<b>Date:</b> {row['date']}<br><b>Length:</b> {round(row['len'], 2)} miles<br>"
                     f"<b>EF Rating:</b> EF{int(row['mag'])}<br><b>Fatalities:</b> {row['fat']}<br><b>Injuries:</b> {row['inj']}",
                     sticky=True)
         ).add_to(ef_layer)
 
+    cache.flush()  # write this render's newly fetched weather in one batch
+
     marker_cluster.add_to(radar_map)
     for layer in ef_layers.values():
         layer.add_to(radar_map)
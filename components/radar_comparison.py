@@ -2,7 +2,6 @@
 
 import streamlit as st
 import plotly.graph_objects as go
-from utils.folium_utils import get_state_from_latlon
 
 def spyder_radar_initial_text():
     with st.expander("🧠 Why Use a Spider Radar Chart? What Insights Does It Reveal?", expanded=False):
@@ -38,7 +37,6 @@ def render_radar_chart(filtered_df):
 
 
     df = filtered_df.copy()
-    df["name"] = df.apply(lambda row: get_state_from_latlon(row["slat"], row["slon"]), axis=1)
 
     # Label for dropdown
     df["label"] = df.apply(
@@ -2,8 +2,27 @@ import streamlit as st
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
-from utils.weather import fetch_weather, load_cached_weather
-from utils.data_loader import load_tornado_data
+from utils.weather import enrich_with_weather
+from utils.top_n_index import candidate_rows
+
+CORRELATION_TORNADO_COLUMNS = {
+    "mag": "EF",
+    "wid": "Width",
+    "len": "Length",
+    "fat": "Fatalities",
+    "inj": "Injuries",
+}
+CORRELATION_WEATHER_COLUMNS = {
+    "temperature": "Temperature (°C)",
+    "wind_speed": "Wind (km/h)",
+    "precipitation": "Precipitation (mm)",
+    "dew_point": "Dew Point (°C)",
+    "humidity": "Humidity (%)",
+    "cloud_cover": "Cloud Cover (%)",
+    "pressure": "Pressure (hPa)",
+    "cape": "CAPE (J/kg)",
+    "soil_moisture": "Soil Moisture (m³/m³)",
+}
 
 
 def render_correlation_matrix(filtered_df: pd.DataFrame):
@@ -14,49 +33,14 @@ def render_correlation_matrix(filtered_df: pd.DataFrame):
     scope = st.radio("Choose dataset to analyze:", ["Top N Tornadoes (Filtered)", "Top 457 Tornadoes"], horizontal=True)
 
     if scope == "Top 457 Tornadoes":
-        df = load_tornado_data()
-        top_len = df.sort_values("len", ascending=False).head(150)
-        top_wid = df.sort_values("wid", ascending=False).head(150)
-        top_fat = df.sort_values("fat", ascending=False).head(150)
-        top_inj = df.sort_values("inj", ascending=False).head(150)
-        df = pd.concat([top_len, top_wid, top_fat, top_inj]).drop_duplicates()
+        df = candidate_rows()
     else:
         df = filtered_df
 
-    cache = load_cached_weather()
-
-    records = []
-
-    for _, row in df.iterrows():
-        lat, lon, date = row["slat"], row["slon"], row["date"]
-        ef, width, length, fat, inj = row["mag"], row["wid"], row["len"], row["fat"], row["inj"]
-
-        try:
-            weather = fetch_weather(lat, lon, date, cache)
-        except:
-            continue
-
-        if not weather or not isinstance(weather, dict):
-            continue
-
-        records.append({
-            "EF": ef,
-            "Width": width,
-            "Length": length,
-            "Fatalities": fat,
-            "Injuries": inj,
-            "Temperature (°C)": weather.get("temperature"),
-            "Wind (km/h)": weather.get("wind_speed"),
-            "Precipitation (mm)": weather.get("precipitation"),
-            "Dew Point (°C)": weather.get("dew_point"),
-            "Humidity (%)": weather.get("humidity"),
-            "Cloud Cover (%)": weather.get("cloud_cover"),
-            "Pressure (hPa)": weather.get("pressure"),
-            "CAPE (J/kg)": weather.get("cape"),
-            "Soil Moisture (m³/m³)": weather.get("soil_moisture")
-        })
-
-    df_corr = pd.DataFrame(records)
+    enriched = enrich_with_weather(df, list(CORRELATION_WEATHER_COLUMNS))
+    df_corr = enriched[list(CORRELATION_TORNADO_COLUMNS) + list(CORRELATION_WEATHER_COLUMNS)].rename(
+        columns={**CORRELATION_TORNADO_COLUMNS, **CORRELATION_WEATHER_COLUMNS}
+    ).reset_index(drop=True)
 
     if df_corr.empty:
         st.warning("❌ No valid data to display correlation matrix.")
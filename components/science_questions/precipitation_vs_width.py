@@ -3,7 +3,7 @@ import plotly.express as px
 import streamlit as st
 
 from utils.graphical_plot import graphical_plot
-from utils.weather import fetch_weather, load_cached_weather
+from utils.weather import enrich_with_weather
 
 WIDTH_BINS = [0, 100, 300, 800, float("inf")]
 WIDTH_LABELS = ["0–100 yd", "101–300 yd", "301–800 yd", "800+ yd"]
@@ -38,7 +38,6 @@ def precipitation_vs_width_description():
 
 def render_precipitation_vs_width(filtered_df, prefetch_457_df):
     precipitation_vs_width_description()
-    cache = load_cached_weather()
 
     # Dataset toggle
     scope = st.radio(
@@ -49,17 +48,10 @@ def render_precipitation_vs_width(filtered_df, prefetch_457_df):
 
     df = filtered_df if scope == "Top N Tornadoes (Filtered)" else prefetch_457_df
 
-    records = []
-    for _, row in df.iterrows():
-        weather = fetch_weather(row["slat"], row["slon"], row["date"], cache)
-        precip = weather.get("precipitation")
-        if isinstance(precip, (int, float)) and pd.notnull(precip):
-            records.append({
-                "Width": row["wid"],
-                "Precipitation (mm)": precip
-            })
-
-    df_precip = pd.DataFrame(records)
+    enriched = enrich_with_weather(df, ["precipitation"])
+    df_precip = enriched.loc[~enriched["weather_missing"], ["wid", "precipitation"]].rename(
+        columns={"wid": "Width", "precipitation": "Precipitation (mm)"}
+    ).reset_index(drop=True)
     if df_precip.empty:
         st.warning("No precipitation data available.")
         return
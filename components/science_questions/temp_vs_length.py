@@ -3,7 +3,7 @@ import pandas as pd
 import plotly.express as px
 
 from utils.graphical_plot import graphical_plot
-from utils.weather import fetch_weather, load_cached_weather
+from utils.weather import enrich_with_weather
 
 
 LENGTH_BINS = [0, 10, 30, float("inf")]
@@ -50,20 +50,12 @@ def render_temp_vs_length(filtered_df: pd.DataFrame, prefetch_457_df: pd.DataFra
     )
 
     base_df = filtered_df if choice == "Top N Tornadoes (Filtered)" else prefetch_457_df.copy()
-    cache = load_cached_weather()
 
     # Step: Enrich with weather only if needed
-    records = []
-    for _, row in base_df.iterrows():
-        weather = fetch_weather(row["slat"], row["slon"], row["date"], cache)
-        temperature = weather.get("temperature")
-        if isinstance(temperature, (int, float)) and pd.notnull(temperature):
-            records.append({
-                "Max Temp (°C)": temperature,
-                "Tornado Length (mi)": row["len"]
-            })
-
-    df_temp = pd.DataFrame(records)
+    enriched = enrich_with_weather(base_df, ["temperature"])
+    df_temp = enriched.loc[~enriched["weather_missing"], ["temperature", "len"]].rename(
+        columns={"temperature": "Max Temp (°C)", "len": "Tornado Length (mi)"}
+    ).reset_index(drop=True)
 
     if df_temp.empty:
         st.warning("No temperature data available.")
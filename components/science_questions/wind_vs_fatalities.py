@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.data_loader import load_tornado_data
 from utils.graphical_plot import graphical_plot
-from utils.weather import fetch_weather, load_cached_weather
+from utils.weather import enrich_with_weather
 
 FATALITY_BINS = [0, 1, 5, 20, float("inf")]
 FATALITY_LABELS = ["0", "1–5", "6–20", "21+"]
@@ -43,17 +42,10 @@ def wind_vs_fatalities_initial_text():
 # Fetch all needed weather data once and reuse
 @st.cache_data  # Only recomputes if input changes
 def build_weather_dataframe(filtered_df):
-    cache = load_cached_weather()
-    records = []
-    for _, row in filtered_df.iterrows():
-        weather = fetch_weather(row["slat"], row["slon"], row["date"], cache)
-        wind = weather.get("wind_speed")
-        if isinstance(wind, (int, float)) and pd.notnull(wind):
-            records.append({
-                "Wind Gust (km/h)": wind,
-                "Fatalities": row["fat"]
-            })
-    return pd.DataFrame(records)
+    enriched = enrich_with_weather(filtered_df, ["wind_speed"])
+    return enriched.loc[~enriched["weather_missing"], ["wind_speed", "fat"]].rename(
+        columns={"wind_speed": "Wind Gust (km/h)", "fat": "Fatalities"}
+    ).reset_index(drop=True)
 
 def render_wind_vs_fatalities(filtered_df, prefetch_457_df):
     wind_vs_fatalities_initial_text()
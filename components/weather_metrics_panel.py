@@ -0,0 +1,26 @@
+import pandas as pd
+import streamlit as st
+
+from utils.weather_metrics import WEATHER_METRICS, OUTCOMES
+
+
+def render_weather_metrics_panel():
+    # Debug-only view of the weather cache metrics; enabled with FURY_WEATHER_DEBUG=1
+    with st.sidebar.expander("🐞 Weather Cache Metrics", expanded=False):
+        counters = WEATHER_METRICS.counters()
+        for col, outcome in zip(st.columns(len(OUTCOMES)), OUTCOMES):
+            col.metric(outcome.title(), counters.get(outcome, 0))
+
+        st.markdown("**Recent renders**")
+        renders = WEATHER_METRICS.recent_renders()
+        if renders:
+            st.dataframe(pd.DataFrame(renders[::-1]), hide_index=True)
+        else:
+            st.caption("No renders recorded yet.")
+
+        operation = st.selectbox("Latency histogram", ["lookup", "join", "fetch"], key="weather_metrics_op")
+        histogram = pd.DataFrame(WEATHER_METRICS.histogram(operation), columns=["Latency", "Count"])
+        st.dataframe(histogram[histogram["Count"] > 0], hide_index=True)
+
+        if st.button("Reset metrics", key="weather_metrics_reset"):
+            WEATHER_METRICS.reset()
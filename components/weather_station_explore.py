@@ -10,18 +10,15 @@ import os
 import io
 import base64
 
-from utils.constants import US_STATES_GEOJSON_FILE_PATH, TORNADO_CSV_URL
+from utils.constants import US_STATES_GEOJSON_FILE_PATH
+from utils.data_loader import get_tornado_view
 
 
 # --- Utility functions (copied & simplified from temp.py) ---
 
 def prepare_tornado_dataset():
-    df_raw = pd.read_csv(TORNADO_CSV_URL)
-    df = df_raw[~df_raw['st'].isin(['AK', 'HI', 'PR', 'VI'])]
-    geometry = gpd.points_from_xy(df['slon'], df['slat'])
-    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
-    gdf = gdf[gdf['mag'] != -9]
-    return gdf
+    # Shared, memoized CONUS view; built once per process rather than on every slider move
+    return get_tornado_view("conus_geo")
 
 def get_clipped_states():
     states = gpd.read_file(US_STATES_GEOJSON_FILE_PATH)
@@ -69,12 +66,9 @@ def render_tornadoes_per_year_trendline():
             key="yearly_mag_slider"
         )
 
-    # Prepare data
-    gdf_all = prepare_tornado_dataset()
-    gdf_filtered = gdf_all[
-        (gdf_all["mag"] >= mag_range[0]) & (gdf_all["mag"] <= mag_range[1])
-        ]
-    yearly_counts = gdf_filtered["yr"].value_counts().sort_index()
+    # Prepare data (per-year, per-magnitude counts are precomputed with the snapshot)
+    yearly = get_tornado_view("yearly_magnitude_counts")
+    yearly_counts = yearly.loc[:, mag_range[0]:mag_range[1]].sum(axis=1)
 
     # Create plot
     fig2, ax2 = plt.subplots(figsize=(10, 5))
@@ -0,0 +1,119 @@
+# Shared fixtures: a local stub of the Open-Meteo archive, a throwaway weather cache and small SPC CSVs
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+
+from utils.weather_api import DAILY_VARIABLES
+from utils.weather_store import WeatherStore, WriteBehindWeatherCache
+
+# Daily variables the archive knows (a copy, so tests can break DAILY_VARIABLES)
+ARCHIVE_VARIABLES = set(DAILY_VARIABLES.values())
+
+
+class StubArchive:
+    """
+    Answers like the archive API with deterministic values (lat + lon + day offset within the range)
+    and records every request. Rejects a request with any |latitude| > 90 or an unknown variable, like
+    the archive. The next `fail_next` requests, and any whose latitudes satisfy `fail_when`, get `fail_status`.
+    """
+
+    def __init__(self, delay_s=0.0):
+        self.requests_seen = []    # locations per request
+        self.variables_seen = []   # daily variables per request
+        self.fail_next = 0
+        self.fail_when = None
+        self.fail_status = 503
+        self.delay_s = delay_s
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/archive"
+
+    def _handler(self):
+        archive = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, payload = archive.answer(parse_qs(urlparse(self.path).query))
+                if payload is None:
+                    # An error page, not the archive's JSON
+                    self.send_error(status)
+                    return
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def answer(self, query):
+        latitudes = query["latitude"][0].split(",")
+        longitudes = query["longitude"][0].split(",")
+        variables = query["daily"][0].split(",")
+        with self._lock:
+            self.requests_seen.append(len(latitudes))
+            self.variables_seen.append(variables)
+            failing = self.fail_next > 0
+            self.fail_next -= failing
+        if self.delay_s:
+            threading.Event().wait(self.delay_s)
+        if failing or (self.fail_when is not None and self.fail_when(latitudes)):
+            return self.fail_status, None
+        if any(abs(float(lat)) > 90 for lat in latitudes):
+            return 400, {"error": True, "reason": "Latitude must be in range of -90 to 90°."}
+        unknown = [variable for variable in variables if variable not in ARCHIVE_VARIABLES]
+        if unknown:
+            return 400, {"error": True, "reason": f"Cannot initialize WeatherVariable from invalid String value {unknown[0]}"}
+        start = datetime.date.fromisoformat(query["start_date"][0])
+        days = (datetime.date.fromisoformat(query["end_date"][0]) - start).days + 1
+        results = [
+            {"latitude": float(lat), "longitude": float(lon),
+             "daily": {"time": [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)],
+                       **{variable: [round(float(lat) + float(lon) + d, 2) for d in range(days)]
+                          for variable in variables}}}
+            for lat, lon in zip(latitudes, longitudes)
+        ]
+        return 200, results if len(results) > 1 else results[0]
+
+
+@pytest.fixture
+def archive():
+    stub = StubArchive()
+    threading.Thread(target=stub.server.serve_forever, daemon=True).start()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return WriteBehindWeatherCache(WeatherStore(str(tmp_path / "weather.sqlite")))
+
+
+def _spc_row(om, yr=2011, **values):
+    # One SPC-format row: an EF1 in northern Alabama on April 27 unless overridden
+    return {
+        "om": om, "yr": yr, "mo": 4, "dy": 27, "date": f"{yr}-04-27", "time": "15:30:00", "tz": 3,
+        "datetime_utc": f"{yr}-04-27T21:30:00Z", "st": "AL", "stf": 1, "stn": 0, "mag": 1, "inj": 0, "fat": 0,
+        "loss": 0.0, "closs": 0.0, "slat": 34.0, "slon": -87.0, "elat": 34.1, "elon": -86.9, "len": 1.0, "wid": 100,
+        "ns": 1, "sn": 1, "f1": 77, "f2": 0, "f3": 0, "f4": 0, "fc": 0, **values,
+    }
+
+
+@pytest.fixture
+def spc_csv(tmp_path):
+    # Writes one SPC row per dict of overrides (om required) to tmp_path/name and returns the path
+    def write(name, rows):
+        path = tmp_path / name
+        pd.DataFrame([_spc_row(**row) for row in rows]).to_csv(path, index=False)
+        return str(path)
+    return write
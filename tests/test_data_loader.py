@@ -0,0 +1,48 @@
+from functools import partial
+
+import pytest
+
+import utils.data_loader as data_loader
+from utils.constants import EXPLORE_COLUMNS
+from utils.data_loader import get_tornado_view, load_tornado_columns
+
+
+@pytest.fixture
+def small_snapshot(spc_csv, tmp_path, monkeypatch):
+    # The registry's views read a 3-row snapshot instead of the app's
+    csv = spc_csv("tornadoes.csv", [{"om": 1, "mag": 2}, {"om": 2, "mag": -9}, {"om": 3, "st": "PR", "mag": 0}])
+    loads = []
+    load = partial(data_loader.load_tornado_columns, csv_path=csv, snapshot_dir=str(tmp_path / "snapshot"))
+    monkeypatch.setattr(data_loader, "load_tornado_columns", lambda *args: loads.append(args) or load(*args))
+    get_tornado_view.clear()
+    yield loads
+    get_tornado_view.clear()
+
+
+def test_views_are_built_once_and_shared(small_snapshot):
+    view = get_tornado_view("known_magnitude")
+
+    assert get_tornado_view("known_magnitude") is view and len(small_snapshot) == 1
+    assert list(view.columns) == EXPLORE_COLUMNS and view["mag"].tolist() == [2, 0]
+
+
+def test_unknown_views_are_rejected(small_snapshot):
+    with pytest.raises(KeyError):
+        get_tornado_view("top_457")
+
+
+def test_filters_are_pushed_down_without_projecting_their_columns(spc_csv, tmp_path):
+    csv = spc_csv("tornadoes.csv", [{"om": 1, "mag": 4, "st": "OK"}, {"om": 2, "mag": 1, "st": "OK"},
+                                    {"om": 3, "mag": 5, "st": "KS"}, {"om": 4, "mag": 3, "st": "AL"}])
+
+    df = load_tornado_columns(["om"], [("mag", ">=", 3), ("st", "in", ["OK", "KS", "ZZ"])],
+                              csv_path=csv, snapshot_dir=str(tmp_path / "snapshot"))
+
+    # Only the projected column comes back, indexed by snapshot position
+    assert list(df.columns) == ["om"] and df["om"].tolist() == [1, 3] and df.index.tolist() == [0, 2]
+
+
+def test_unknown_filter_ops_are_rejected(spc_csv, tmp_path):
+    csv = spc_csv("tornadoes.csv", [{"om": 1}])
+    with pytest.raises(ValueError):
+        load_tornado_columns(["om"], [("mag", "~", 1)], csv_path=csv, snapshot_dir=str(tmp_path / "snapshot"))
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from utils.folium_utils import assign_states, get_state_from_latlon, with_states
+from utils.regions import region_columns, state_names
+
+# Norman OK, Tuscaloosa AL, Joplin MO, and a point in the Atlantic
+LATS, LONS = [35.22, 33.21, 37.08, 30.0], [-97.44, -87.57, -94.51, -60.0]
+
+
+def test_states_are_assigned_in_bulk():
+    assert assign_states(LATS, LONS).tolist() == ["Oklahoma", "Alabama", "Missouri", "NA"]
+    assert get_state_from_latlon(LATS[1], LONS[1]) == "Alabama"
+    df = with_states(pd.DataFrame({"slat": LATS, "slon": LONS}))
+    assert df["state"].tolist()[:1] == ["Oklahoma"] and with_states(df) is df
+
+
+def test_start_and_end_regions_are_assigned_once_per_point():
+    df = pd.DataFrame({"slat": LATS, "slon": LONS, "elat": [35.3, 0.0, 37.1, 30.0], "elon": [-97.3, 0.0, -94.4, -60.0]})
+
+    regions = region_columns(df)
+
+    assert regions["state_fips"].tolist() == ["40", "01", "29", ""]
+    assert regions["county_fips"][1] == "01125"
+    assert regions["end_state_fips"].tolist() == ["40", "", "29", ""]
+
+
+def test_state_names_relabel_fips_categories_in_name_order():
+    names = state_names(pd.Series(["40", "01", "", "40"], dtype="category"))
+    assert names.tolist() == ["Oklahoma", "Alabama", "NA", "Oklahoma"]
+    assert list(names.cat.categories) == ["Alabama", "NA", "Oklahoma"]
@@ -0,0 +1,7 @@
+from utils.startup_profile import VIEW_SCOPED_MODULES, import_profile
+
+
+def test_the_landing_page_imports_no_view_libraries():
+    profile = import_profile()
+    assert "components.dashboard" in profile
+    assert not {module.split(".")[0] for module in profile} & set(VIEW_SCOPED_MODULES)
@@ -0,0 +1,57 @@
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import utils.data_loader as data_loader
+import utils.top_n_index as top_n_index
+from utils.data_loader import get_tornado_view
+from utils.top_n_index import MetricRangeIndex, candidate_rows, get_candidate_positions
+
+
+def _frame():
+    rng = np.random.default_rng(7)
+    # Many ties, a NaN and float32 values, like the snapshot's len column
+    return pd.DataFrame({"len": rng.integers(0, 20, 500).astype(np.float32) / 4, "fat": rng.integers(0, 5, 500)})
+
+
+def test_top_n_matches_a_descending_sort():
+    df = _frame()
+    df.loc[3, "len"] = np.nan
+    for metric in ["len", "fat"]:
+        index = MetricRangeIndex(df[metric].to_numpy())
+        for n in [1, 10, 499, 500, 600]:
+            expected = df.sort_values(metric, ascending=False, kind="stable").head(n)
+            assert df.iloc[index.top_n(n)].index.tolist() == expected.index.tolist()
+
+
+def test_range_queries_match_a_mask_and_sort():
+    df = _frame()
+    index = MetricRangeIndex(df["len"].to_numpy())
+    # Bounds that fall between, on and outside the float32 values
+    for value_range in [(0.0, 4.75), (1.1, 2.3), (2.5, 2.5), (-1.0, 0.1), (6.0, 9.0)]:
+        in_range = df[(df["len"] >= value_range[0]) & (df["len"] <= value_range[1])]
+        assert index.count_in_range(*value_range) == len(in_range)
+        for n in [1, 20, 1000]:
+            expected = in_range.sort_values("len", ascending=False, kind="stable").head(n)
+            assert df.iloc[index.top_n(n, value_range)].index.tolist() == expected.index.tolist()
+
+
+def test_the_candidate_set_is_each_metrics_top_k_unioned_once(spc_csv, tmp_path, monkeypatch):
+    csv = spc_csv("tornadoes.csv", [{"om": om, "len": om % 4, "fat": 5 - om, "st": "OK" if om % 2 else "KS"}
+                                    for om in range(1, 7)] + [{"om": 7, "len": 9.0, "slat": 0.0, "slon": 0.0}])
+    load = partial(data_loader.load_tornado_columns, csv_path=csv, snapshot_dir=str(tmp_path / "snapshot"))
+    builds = []
+    monkeypatch.setattr(data_loader, "load_tornado_columns", lambda *args: builds.append(args) or load(*args))
+    monkeypatch.setattr(top_n_index, "load_tornado_columns", load)
+    get_tornado_view.clear()
+    get_candidate_positions.clear()
+
+    rows = candidate_rows(k=2, metrics=["len", "fat"])
+    assert get_candidate_positions(2, ("len", "fat")) is get_candidate_positions(2, ("len", "fat"))
+    assert len(builds) == 1
+    # len's top 2 (om 3, 2), then fat's (om 1, 2) without the repeat; om 7 has no start point
+    assert rows["len"].tolist() == [3.0, 2.0, 1.0] and rows["fat"].tolist() == [2, 3, 4]
+    assert candidate_rows(k=1, metrics=["len"], filters=[("st", "in", ["KS"])])["fat"].tolist() == [3]
+    get_tornado_view.clear()
+    get_candidate_positions.clear()
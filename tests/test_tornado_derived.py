@@ -0,0 +1,34 @@
+import json
+import os
+
+import utils.tornado_derived as tornado_derived
+from utils.tornado_derived import DERIVED_FILE, build_derived_artifacts, load_derived_artifacts, update_derived_artifacts
+from utils.tornado_snapshot import append_snapshot_rows
+
+
+def test_yearly_counts_cover_conus_tornadoes_of_known_magnitude(spc_csv, tmp_path):
+    csv = spc_csv("tornadoes.csv", [{"om": 1, "mag": 0}, {"om": 2, "mag": 3}, {"om": 3, "mag": 3},
+                                    {"om": 4, "mag": -9}, {"om": 5, "st": "PR"}, {"om": 1, "yr": 2012, "mag": 5}])
+    snapshot_dir = str(tmp_path / "snapshot")
+
+    derived = load_derived_artifacts(csv, snapshot_dir)
+
+    assert derived["yearly_magnitude_counts"] == {"2011": [1, 0, 0, 2, 0, 0], "2012": [0, 0, 0, 0, 0, 1]}
+    with open(os.path.join(snapshot_dir, DERIVED_FILE)) as f:
+        assert json.load(f) == derived
+
+
+def test_an_ingest_update_matches_a_full_rebuild(spc_csv, tmp_path, monkeypatch):
+    monkeypatch.setattr(tornado_derived, "PREFETCH_TOP_K", 2)
+    csv = spc_csv("tornadoes.csv", [{"om": om, "len": om, "wid": 10 * om, "fat": om % 2, "inj": 5 - om}
+                                    for om in range(1, 5)])
+    delta = spc_csv("2012.csv", [{"om": 1, "yr": 2012, "len": 2.5, "wid": 50, "fat": 3, "inj": 0, "mag": 4}])
+    snapshot_dir = str(tmp_path / "snapshot")
+    derived = load_derived_artifacts(csv, snapshot_dir)
+
+    _, positions = append_snapshot_rows(delta, csv, snapshot_dir)
+    updated = update_derived_artifacts(derived, positions, csv, snapshot_dir)
+
+    assert updated == build_derived_artifacts(csv, snapshot_dir)
+    assert updated["prefetch_top_k"]["positions"]["wid"] == [4, 3]
+    assert load_derived_artifacts(csv, snapshot_dir) == updated
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.tornado_snapshot import (
+    _codes_dtype, _column_to_array, _open_columns, append_snapshot_rows, ensure_snapshot, load_snapshot_columns,
+    load_snapshot_frame,
+)
+
+
+def test_category_codes_widen_with_the_category_count():
+    assert [_codes_dtype(n) for n in (10, 127, 32767)] == [np.int8, np.int16, np.int32]
+    with pytest.raises(ValueError):
+        _codes_dtype(2 ** 31)
+
+
+def test_many_categories_keep_distinct_codes():
+    # More categories than int16 can count (e.g. county FIPS after many deltas) must not wrap
+    values, categories = _column_to_array("county_fips", pd.Series([f"{i:06d}" for i in range(40_000)]))
+    assert values.dtype == np.int32 and len(np.unique(values)) == len(categories) == 40_000
+
+
+
+def test_integers_are_range_checked_before_downcasting():
+    values, _ = _column_to_array("inj", pd.Series([0, 1740]))
+    assert values.dtype == np.int16
+    with pytest.raises(ValueError):
+        _column_to_array("mag", pd.Series([1, 300]))
+
+def test_snapshot_round_trips_the_csv(spc_csv, tmp_path):
+    csv = spc_csv("tornadoes.csv", [{"om": 1, "mag": 3, "len": 12.5}, {"om": 2, "st": "MS", "slat": 33.5, "slon": -89.0}])
+    snapshot_dir = str(tmp_path / "snapshot")
+
+    df = load_snapshot_frame(csv_path=csv, snapshot_dir=snapshot_dir)
+
+    expected = pd.read_csv(csv)
+    assert df["om"].tolist() == [1, 2] and df["mag"].tolist() == [3, 1]
+    assert df["st"].astype(str).tolist() == ["AL", "MS"]
+    assert np.allclose(df["len"], expected["len"]) and df["yr"].dtype == np.int16
+    assert df["state_fips"].astype(str).tolist() == ["01", "28"]
+
+
+def test_a_changed_csv_is_swapped_in_as_a_new_build(spc_csv, tmp_path):
+    csv = spc_csv("tornadoes.csv", [{"om": 1}])
+    snapshot_dir = str(tmp_path / "snapshot")
+    old, _ = load_snapshot_columns(["om"], csv, snapshot_dir)
+
+    spc_csv("tornadoes.csv", [{"om": 1}, {"om": 2}])
+    new, arrays = load_snapshot_columns(["om"], csv, snapshot_dir)
+
+    assert new["build"] != old["build"] and arrays["om"].tolist() == [1, 2]
+    # The old build stays readable for processes that still have its manifest
+    assert _open_columns(old, ["om"], snapshot_dir)["om"].tolist() == [1]
+    assert ensure_snapshot(csv, snapshot_dir) == new
+
+
+def test_deltas_append_only_new_rows_and_keep_category_codes(spc_csv, tmp_path):
+    csv = spc_csv("tornadoes.csv", [{"om": 1}, {"om": 2, "st": "MS"}])
+    delta = spc_csv("2012.csv", [{"om": 2}, {"om": 3, "st": "TX"}, {"om": 1, "yr": 2012}])
+    snapshot_dir = str(tmp_path / "snapshot")
+    before, arrays = load_snapshot_columns(["st"], csv, snapshot_dir)
+    codes = arrays["st"].tolist()
+
+    manifest, positions = append_snapshot_rows(delta, csv, snapshot_dir)
+    df = load_snapshot_frame(["yr", "om", "st"], csv_path=csv, snapshot_dir=snapshot_dir)
+
+    assert positions.tolist() == [2, 3] and manifest["rows"] == 4
+    assert list(zip(df["yr"], df["om"], df["st"].astype(str))) == [
+        (2011, 1, "AL"), (2011, 2, "MS"), (2011, 3, "TX"), (2012, 1, "AL")]
+    assert load_snapshot_columns(["st"], csv, snapshot_dir)[1]["st"][:2].tolist() == codes
+
+    # Re-ingesting the same file is a no-op
+    again, positions = append_snapshot_rows(delta, csv, snapshot_dir)
+    assert len(positions) == 0 and again["build"] == manifest["build"]
+
+
+def test_a_rebuild_keeps_ingested_deltas(spc_csv, tmp_path):
+    csv = spc_csv("tornadoes.csv", [{"om": 1}])
+    delta = spc_csv("2012.csv", [{"om": 1, "yr": 2012}])
+    snapshot_dir = str(tmp_path / "snapshot")
+    append_snapshot_rows(delta, csv, snapshot_dir)
+
+    spc_csv("tornadoes.csv", [{"om": 1}, {"om": 2}])
+    _, arrays = load_snapshot_columns(["yr", "om"], csv, snapshot_dir)
+
+    assert list(zip(arrays["yr"].tolist(), arrays["om"].tolist())) == [(2011, 1), (2011, 2), (2012, 1)]
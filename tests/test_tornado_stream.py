@@ -0,0 +1,29 @@
+import pandas as pd
+
+from utils.constants import TOP_N_COLUMNS
+from utils.tornado_stream import stream_tornado_summary
+
+
+def test_small_chunks_give_the_whole_file_summary(spc_csv):
+    rows = [{"om": om, "yr": 2010 + om % 2, "mo": 1 + om % 12, "mag": om % 4, "st": ["OK", "KS", "TX"][om % 3],
+             "len": float(om % 7), "wid": 10 * (om % 5), "fat": om % 3, "inj": om % 4} for om in range(1, 41)]
+    rows[5]["slat"] = 0.0    # invalid start
+    rows[9]["elat"] = 95.0   # invalid end
+    csv = spc_csv("archive.csv", rows)
+
+    summary = stream_tornado_summary(csv, chunksize=7, top_k=5, metrics=["len", "wid"])
+
+    df = pd.read_csv(csv)
+    valid = df.drop(index=[5, 9])
+    compared = ["yr", "mag", "len", "wid", "fat", "inj"]
+    assert summary["rows_read"] == 40 and summary["rows_valid"] == 38
+    for metric in ["len", "wid"]:
+        expected = valid.sort_values(metric, ascending=False, kind="stable").head(5)
+        top = summary["top_k"][metric]
+        assert list(top.columns) == TOP_N_COLUMNS
+        assert top[compared].values.tolist() == expected[compared].values.tolist()
+    counts = summary["monthly_counts"].set_index(["yr", "mo"]).sum(axis=1)
+    assert counts.sum() == 38 and (counts.groupby(level=0).sum() == valid.groupby("yr").size()).all()
+    totals = summary["state_totals"]
+    assert totals["tornadoes"].to_dict() == valid.groupby("st").size().to_dict()
+    assert totals["fat"].to_dict() == valid.groupby("st")["fat"].sum().to_dict()
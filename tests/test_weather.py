@@ -0,0 +1,68 @@
+from functools import partial
+
+import pandas as pd
+import pytest
+
+import utils.weather as weather
+from utils.weather import enrich_with_weather, fetch_weather, weather_key_frame
+from utils.weather_api import fetch_missing_weather
+from utils.weather_store import WEATHER_FIELDS, coordinate_key
+
+
+def test_fetch_weather_completes_partial_rows(archive, cache, monkeypatch):
+    # A row lacking soil_moisture is a miss: the missing field is fetched and merged, the rest kept
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", False)
+    monkeypatch.setattr(weather, "fetch_missing_weather", partial(fetch_missing_weather, base_url=archive.url))
+    cache.put("2016-05-09", "34.50,-97.00", {field: 1.0 for field in WEATHER_FIELDS if field != "soil_moisture"})
+
+    record = fetch_weather(34.5, -97.0, "2016-05-09", cache)
+
+    assert len(archive.requests_seen) == 1
+    assert record["temperature"] == 1.0 and record["soil_moisture"] == round(34.5 - 97.0, 2)
+    assert fetch_weather(34.5, -97.0, "2016-05-09", cache) == record and len(archive.requests_seen) == 1
+
+
+def test_fetch_weather_serves_partial_rows_when_blocked(cache, monkeypatch):
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", True)
+    cache.put("2016-05-09", "34.50,-97.00", {"temperature": 1.0})
+
+    record = fetch_weather(34.5, -97.0, "2016-05-09", cache)
+
+    assert record["temperature"] == 1.0 and record["distance_km"] == 0.0
+
+
+def _tornadoes():
+    return pd.DataFrame({"date": pd.to_datetime(["2011-04-27", "2011-04-27", "2013-05-20"]),
+                         "slat": [34.0, 33.2, 35.33], "slon": [-87.0, -87.57, -97.48],
+                         "elat": [34.1, 33.4, 35.4], "elon": [-86.9, -87.3, -97.4]})
+
+
+def test_enrich_joins_start_and_path_points(cache, monkeypatch):
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", True)
+    df = _tornadoes()
+    keys = weather_key_frame(df, "path")
+    # Every point of the first tornado, only the start of the second, nothing for the third
+    cached = keys[(keys["row"] == 0) | ((keys["row"] == 1) & (keys["point"] == 0))]
+    cache.store.upsert_many([(date_str, coordinate_key(lat, lon), {"temperature": lat, "wind_speed": 1.0})
+                             for date_str, lat, lon in cached[["date", "lat", "lon"]].itertuples(index=False)])
+
+    start = enrich_with_weather(df, ["temperature", "wind_speed"], cache=cache, nearest_km=0)
+    path = enrich_with_weather(df, ["temperature"], points="path", cache=cache, nearest_km=0)
+
+    # The matrix holds float32 values
+    assert start["temperature"].tolist()[:2] == pytest.approx([34.0, 33.2]) and start["weather_missing"].tolist() == [False, False, True]
+    assert start["weather_distance_km"].tolist()[:2] == [0.0, 0.0] and len(start) == len(df)
+    assert path["temperature"][0] == pytest.approx(keys.loc[keys["row"] == 0, "lat"].mean())
+    assert path["temperature"][1] == pytest.approx(33.2) and path["weather_missing"].tolist() == [False, False, True]
+
+
+def test_enrich_fetches_misses_batched_by_date(archive, cache, monkeypatch):
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", False)
+    monkeypatch.setattr(weather, "fetch_missing_weather", partial(fetch_missing_weather, base_url=archive.url))
+
+    enriched = enrich_with_weather(_tornadoes(), ["temperature"], cache=cache)
+
+    # Three start points on two dates far apart: one request per date
+    assert len(archive.requests_seen) == 2
+    assert enriched["temperature"].tolist() == pytest.approx([34.0 - 87.0, 33.2 - 87.57, 35.33 - 97.48])
+    assert not enriched["weather_missing"].any()
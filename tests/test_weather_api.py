@@ -0,0 +1,117 @@
+import os
+import sqlite3
+
+from utils.weather_api import DAILY_VARIABLES, fetch_missing_weather, make_session, plan_report
+from utils.weather_store import WEATHER_FIELDS, WEATHER_SCHEMA_VERSION, WeatherStore, _SCHEMA
+
+# Short session backoff so retry tests stay fast
+FAST = dict(backoff_s=0.01, backoff_jitter_s=0.01)
+
+
+def test_one_request_per_date_batch(archive, cache):
+    # 2 dates: 6 path points on one, 250 points on the other (3 batches of <= 100)
+    keys = [("2011-04-27", f"34.{i:02d},-87.{i:02d}") for i in range(6)]
+    keys += [("2013-05-20", f"35.{i // 100:02d},-97.{i % 100:02d}") for i in range(250)]
+
+    stats = fetch_missing_weather(keys, cache, archive.url)
+
+    assert stats["requests"] == 4 and archive.requests_seen == [6, 100, 100, 50]
+    assert stats["fetched"] == 256
+    record = cache.get("2013-05-20", "35.01,-97.05")
+    assert set(record) == set(WEATHER_FIELDS) and record["temperature"] == round(35.01 - 97.05, 2)
+
+
+def test_cached_keys_are_not_requested_again(archive, cache):
+    keys = [("2011-04-27", f"34.{i:02d},-87.00") for i in range(6)]
+    fetch_missing_weather(keys, cache, archive.url)
+    cache.flush()
+
+    assert fetch_missing_weather(keys, cache, archive.url)["requests"] == 0
+    assert len(archive.requests_seen) == 1
+
+
+def test_nearby_dates_coalesce_into_one_range(archive, cache):
+    # 03-01, 03-02 and 03-04 become one range (03-03 comes along); 03-20 stays alone
+    keys = [(date_str, "36.00,-95.00") for date_str in ["2012-03-01", "2012-03-02", "2012-03-04", "2012-03-20"]]
+    report = plan_report(keys)
+
+    stats = fetch_missing_weather(keys, cache, archive.url)
+
+    assert report["saved_vs_date_batched"] == 2 and report["unused_location_days"] == 1
+    assert stats["requests"] == 2 and stats["fetched"] == 4 and len(archive.requests_seen) == 2
+    # The range is split back into per-date entries
+    assert cache.get("2012-03-04", "36.00,-95.00")["temperature"] == round(36.0 - 95.0 + 3, 2)
+    assert cache.get("2012-03-03", "36.00,-95.00") is not None
+
+
+def test_session_retries_absorb_brief_5xx(archive, cache):
+    archive.fail_next = 2
+    stats = fetch_missing_weather([("2015-06-01", "40.00,-100.00")], cache, archive.url, session=make_session(**FAST))
+    assert stats["fetched"] == 1 and stats["failed"] == 0
+
+
+def test_transient_failures_are_not_cached(archive, cache):
+    archive.fail_next = 10
+    stats = fetch_missing_weather([("2015-06-02", "40.00,-100.00")], cache, archive.url,
+                                  session=make_session(retries=1, **FAST))
+    assert stats["failed"] == 1 and cache.get("2015-06-02", "40.00,-100.00") is None
+
+
+def test_rejected_location_is_cached_empty_and_batch_mates_fetched(archive, cache):
+    stats = fetch_missing_weather([("2014-04-28", "95.00,-97.00"), ("2014-04-28", "35.00,-97.00")], cache, archive.url)
+    assert stats["unavailable"] == 1 and stats["fetched"] == 1
+    assert cache.get("2014-04-28", "95.00,-97.00") == dict.fromkeys(WEATHER_FIELDS)
+
+
+def test_partial_rows_fetch_only_the_missing_fields(archive, cache):
+    # A row written without soil_moisture (an older field set) fetches just that variable and keeps the rest
+    key = ("2016-05-09", "34.50,-97.00")
+    cache.put(*key, {field: 1.0 for field in WEATHER_FIELDS if field != "soil_moisture"})
+    cache.flush()
+    plan = plan_report(cache.missing_fields([key]))
+
+    stats = fetch_missing_weather([key], cache, archive.url)
+
+    assert (plan["values_requested"], plan["values_full_refetch"]) == (1, len(WEATHER_FIELDS))
+    assert stats["fetched"] == 1 and archive.variables_seen == [[DAILY_VARIABLES["soil_moisture"]]]
+    merged = cache.get(*key)
+    assert merged["temperature"] == 1.0 and merged["soil_moisture"] == round(34.5 - 97.0, 2)
+
+
+def test_version_1_store_migrates_with_complete_rows(tmp_path):
+    # A version 1 table (no field mask) is migrated with every row marked complete
+    path = os.path.join(tmp_path, "legacy.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.executescript(_SCHEMA)
+        conn.execute("INSERT INTO weather VALUES ('2010-05-10', 35.0, -97.0, 1, 2, 3, 4, 5, 6, 7, 8, 9)")
+
+    store = WeatherStore(path)
+
+    assert store.missing_keys([("2010-05-10", "35.00,-97.00")]) == []
+    assert store.get_meta("schema_version") == str(WEATHER_SCHEMA_VERSION)
+    assert store.get("2010-05-10", "35.00,-97.00")["cape"] == 8
+
+
+def test_other_client_errors_are_not_cached(archive, cache):
+    # A 401 (or a proxy's error page) says nothing about the keys
+    archive.fail_next, archive.fail_status = 1, 401
+    stats = fetch_missing_weather([("2015-06-03", "40.00,-100.00")], cache, archive.url)
+    assert (stats["failed"], stats["unavailable"]) == (1, 0) and cache.get("2015-06-03", "40.00,-100.00") is None
+
+
+def test_a_bad_variable_is_not_cached(archive, cache, monkeypatch):
+    monkeypatch.setitem(DAILY_VARIABLES, "cape", "cape_maximum")
+    stats = fetch_missing_weather([("2015-06-04", "40.00,-100.00")], cache, archive.url)
+    assert (stats["failed"], stats["unavailable"]) == (1, 0) and cache.missing_keys([("2015-06-04", "40.00,-100.00")])
+
+
+def test_a_split_batch_keeps_the_locations_settled_before_a_failure(archive, cache):
+    # 95.00 gets the batch rejected, so it is retried per location; the last location then fails
+    keys = [("2014-04-28", "35.00,-97.00"), ("2014-04-28", "95.00,-97.00"), ("2014-04-28", "36.00,-97.00")]
+    archive.fail_when = lambda latitudes: latitudes == ["36.00"]
+
+    stats = fetch_missing_weather(keys, cache, archive.url, session=make_session(retries=0, **FAST))
+
+    assert (stats["fetched"], stats["unavailable"], stats["failed"]) == (1, 1, 1) and stats["requests"] == 4
+    assert cache.get("2014-04-28", "35.00,-97.00")["temperature"] == round(35.0 - 97.0, 2)
+    assert cache.missing_keys(keys) == [("2014-04-28", "36.00,-97.00")]
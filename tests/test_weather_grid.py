@@ -0,0 +1,40 @@
+import utils.weather_store as weather_store
+from utils.weather_grid import WEATHER_GRID, collapse_store, grid_key
+from utils.weather_store import WEATHER_FIELDS, WeatherStore
+
+
+def _store_with_one_cell(tmp_path):
+    # Two points of the 35.0,-97.0 era5_land cell on one day; 35.02,-97.01 is nearer the centre
+    store = WeatherStore(str(tmp_path / "weather.sqlite"))
+    store.upsert_many([
+        ("2013-05-20", "35.02,-97.01", dict.fromkeys(WEATHER_FIELDS, 1.0)),
+        ("2013-05-20", "35.04,-96.97", dict.fromkeys(WEATHER_FIELDS, 2.0)),
+    ])
+    return store
+
+
+def test_keys_are_exact_points_by_default():
+    assert WEATHER_GRID == "exact" and grid_key(35.0249, -97.0061) == "35.02,-97.01"
+
+
+def test_opening_the_store_never_collapses_it(tmp_path, monkeypatch):
+    path = str(tmp_path / "weather.sqlite")
+    _store_with_one_cell(tmp_path)
+    monkeypatch.setattr(weather_store, "WEATHER_GRID", "era5_land")
+    monkeypatch.setattr(weather_store, "_stores", {})
+
+    store = weather_store.open_weather_store(path, json_path=str(tmp_path / "missing.json"))
+
+    assert len(store) == 2 and store.get("2013-05-20", "35.00,-97.00") is None
+    assert store.get_meta("grid_era5_land") is None
+
+
+def test_collapse_keys_the_nearest_point_to_the_cell_centre(tmp_path):
+    store = _store_with_one_cell(tmp_path)
+
+    stats = collapse_store(store, "era5_land")
+
+    assert (stats["cells"], stats["added"], stats["pruned"]) == (1, 1, 0) and len(store) == 3
+    assert store.get("2013-05-20", "35.00,-97.00")["temperature"] == 1.0
+
+    assert collapse_store(store, "era5_land", prune=True)["pruned"] == 2 and len(store) == 1
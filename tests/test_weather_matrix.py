@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+import utils.weather as weather
+import utils.weather_matrix as weather_matrix
+from utils.weather_matrix import open_weather_matrix
+from utils.weather_store import WEATHER_FIELDS
+
+
+def _record(value):
+    return dict.fromkeys(WEATHER_FIELDS, value)
+
+
+def test_lookup_matches_the_store(cache):
+    cache.store.upsert_many([("2011-04-27", "34.00,-87.00", _record(1.0)), ("2011-04-27", "34.50,-86.50", _record(2.0))])
+
+    matrix = open_weather_matrix(cache)
+    values, found = matrix.lookup(["2011-04-27", "2011-04-27", "2011-04-28"], [34.0, 34.5, 34.0], [-87.0, -86.5, -87.0])
+
+    assert found.tolist() == [True, True, False]
+    assert values[0, 0] == 1.0 and values[1, 0] == 2.0 and np.isnan(values[2]).all()
+
+
+def test_reading_never_flushes_queued_writes(cache, monkeypatch):
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", True)
+    cache.put("2011-04-27", "34.00,-87.00", _record(3.0))
+
+    open_weather_matrix(cache)
+    enriched = weather.enrich_with_weather(pd.DataFrame({"date": ["2011-04-27"], "slat": [34.0], "slon": [-87.0]}),
+                                           cache=cache)
+
+    assert cache.pending == 1 and len(cache.store) == 0
+    assert enriched["temperature"].tolist() == [3.0] and enriched["weather_distance_km"].tolist() == [0.0]
+
+
+def test_a_build_is_reused_until_it_falls_far_enough_behind(cache, monkeypatch):
+    monkeypatch.setattr(weather_matrix, "MATRIX_REBUILD_WRITES", 3)
+    builds = []
+    build = weather_matrix.build_weather_matrix
+    monkeypatch.setattr(weather_matrix, "build_weather_matrix", lambda *args: builds.append(1) or build(*args))
+    first = open_weather_matrix(cache)
+
+    for day in range(1, 3):
+        cache.store.upsert_many([(f"2011-04-{day:02d}", "34.00,-87.00", _record(1.0))])
+        assert open_weather_matrix(cache) is first
+    cache.store.upsert_many([("2011-04-03", "34.00,-87.00", _record(1.0))])
+    assert len(open_weather_matrix(cache)) == 3 and len(builds) == 2
+
+    cache.store.upsert_many([("2011-04-04", "34.00,-87.00", _record(1.0))])
+    assert len(open_weather_matrix(cache, refresh=True)) == 4 and len(builds) == 3
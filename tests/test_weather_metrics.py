@@ -0,0 +1,34 @@
+import utils.weather as weather
+from utils.weather import fetch_weather
+from utils.weather_metrics import LATENCY_BUCKETS_MS, WeatherMetrics
+from utils.weather_store import WEATHER_FIELDS
+
+
+def test_renders_record_counter_deltas_and_latency_buckets():
+    metrics = WeatherMetrics()
+    metrics.count("hit", 3)
+    with metrics.render("map"):
+        metrics.count("hit", 2)
+        metrics.count("miss")
+        metrics.observe("lookup", 0.002)
+
+    (render,) = metrics.recent_renders()
+    assert render["render"] == "map" and render["hit"] == 2 and render["miss"] == 1 and render["error"] == 0
+    assert metrics.counters()["hit"] == 5
+    latency = metrics.snapshot()["latency"]["lookup"]
+    assert latency["count"] == 1 and latency["mean_ms"] == 2.0
+    assert dict(metrics.histogram("lookup"))["≤5 ms"] == 1 and len(latency["buckets"]) == len(LATENCY_BUCKETS_MS) + 1
+
+
+def test_lookups_count_instead_of_printing(cache, monkeypatch, capsys):
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", True)
+    metrics = WeatherMetrics()
+    monkeypatch.setattr(weather, "WEATHER_METRICS", metrics)
+    cache.put("2011-04-27", "34.00,-87.00", dict.fromkeys(WEATHER_FIELDS, 1.0))
+
+    fetch_weather(34.0, -87.0, "2011-04-27", cache)
+    fetch_weather(35.0, -87.0, "2011-04-27", cache)
+
+    counters = metrics.counters()
+    assert counters["hit"] == 1 and counters["miss"] == 1 and counters["blocked"] == 1
+    assert capsys.readouterr().out == ""
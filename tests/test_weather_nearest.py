@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from haversine import Unit, haversine
+
+import utils.weather as weather
+from utils.weather import enrich_with_weather, serve_nearest
+from utils.weather_nearest import nearest_cached
+from utils.weather_store import WEATHER_FIELDS
+
+
+def test_the_nearest_point_of_the_same_day_within_range_is_served():
+    stored = pd.DataFrame({"date": ["2011-04-27", "2011-04-27", "2011-04-28", "2011-04-27"],
+                           "lat": [34.0, 34.3, 34.01, 34.02], "lon": [-87.0, -87.0, -87.0, -87.0],
+                           "temperature": [1.0, 2.0, 3.0, np.nan]})
+    queries = pd.DataFrame({"date": ["2011-04-27", "2011-04-27", "2011-04-29"],
+                            "lat": [34.05, 36.0, 34.0], "lon": [-87.0, -87.0, -87.0]})
+
+    served = nearest_cached(queries, stored, ["temperature"], max_km=50)
+
+    # The row without data and the closer point of the next day are skipped; nothing within 50 km of the others
+    assert served["temperature"].tolist()[0] == 1.0 and served["temperature"][1:].isna().all()
+    assert served["distance_km"][0] == pytest.approx(haversine((34.05, -87.0), (34.0, -87.0), Unit.KILOMETERS))
+    assert nearest_cached(queries, stored, ["temperature"], max_km=0)["distance_km"].isna().all()
+
+
+def test_misses_carry_the_distance_they_were_served_from(cache, monkeypatch):
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", True)
+    cache.put("2011-04-27", "34.00,-87.00", dict.fromkeys(WEATHER_FIELDS, 1.0))
+
+    served = serve_nearest([("2011-04-27", "34.10,-87.00"), ("2011-04-27", "35.00,-87.00")], cache, max_km=20)
+    assert list(served) == [("2011-04-27", "34.10,-87.00")]
+    assert served[("2011-04-27", "34.10,-87.00")]["distance_km"] == pytest.approx(11.1, abs=0.1)
+
+    df = pd.DataFrame({"date": ["2011-04-27", "2011-04-27"], "slat": [34.1, 35.0], "slon": [-87.0, -87.0]})
+    enriched = enrich_with_weather(df, cache=cache, nearest_km=20)
+    assert enriched["weather_distance_km"][0] == pytest.approx(11.1, abs=0.1) and enriched["temperature"][0] == 1.0
+    assert enriched["weather_missing"].tolist() == [False, True]
@@ -0,0 +1,52 @@
+import time
+
+import pandas as pd
+import pytest
+
+from utils.weather_prefetch import load_checkpoint, run_prefetch
+
+OPTIONS = dict(max_locations=10, requests_per_s=20.0, burst=2, backoff_base_s=0.01, progress=False)
+
+
+@pytest.fixture
+def tornadoes():
+    # 40 tornadoes a month apart (no date coalescing), each a short path: one batch per tornado
+    dates = pd.date_range("2000-01-01", periods=40, freq="30D")
+    return pd.DataFrame({
+        "date": dates,
+        "slat": [30 + i * 0.3 for i in range(40)], "slon": [-100 + i * 0.2 for i in range(40)],
+        "elat": [30.4 + i * 0.3 for i in range(40)], "elon": [-99.6 + i * 0.2 for i in range(40)],
+    })
+
+
+def test_interrupted_prefetch_resumes_where_it_stopped(archive, cache, tornadoes, tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    options = dict(OPTIONS, base_url=archive.url, checkpoint_path=checkpoint_path)
+
+    archive.fail_next = 3
+    first = run_prefetch(tornadoes, cache, "check", max_batches=5, **options)
+    # 503s are retried by the pipeline; the run stops early with an unfinished checkpoint
+    assert first["retries"] == 3 and first["failed"] == 0
+    assert not first["finished"] and first["completed_batches"] == 5
+
+    started = time.perf_counter()
+    second = run_prefetch(tornadoes, cache, "check", **options)
+    rate = second["requests"] / (time.perf_counter() - started)
+    # The restart fetches only the rest, within the rate limit (plus the burst)
+    assert second["already_cached"] == first["fetched"] + first["already_cached"]
+    assert second["fetched"] + first["fetched"] == first["keys"] - first["already_cached"]
+    assert rate <= 20.0 * 1.25
+
+    third = run_prefetch(tornadoes, cache, "check", **options)
+    assert third["planned_batches"] == 0 and load_checkpoint(checkpoint_path)["finished"]
+
+
+def test_refused_requests_are_given_up_without_retries(archive, cache, tornadoes, tmp_path):
+    archive.fail_next, archive.fail_status = 1, 403
+    result = run_prefetch(tornadoes.head(3), cache, "check", base_url=archive.url,
+                          checkpoint_path=str(tmp_path / "checkpoint.json"), **OPTIONS)
+
+    # One of the three batches is refused once and not asked again; the others are fetched
+    assert result["retries"] == 0 and result["requests"] == 3
+    assert len(result["failed_batches"]) == 1 and result["failed"] == result["keys"] // 3
+    assert result["fetched"] + result["failed"] == result["keys"]
@@ -0,0 +1,103 @@
+import json
+import time
+from functools import partial
+
+import pandas as pd
+
+import utils.weather as weather
+import utils.weather_store as weather_store
+from utils.weather_api import fetch_missing_weather
+from utils.weather_store import WEATHER_FIELDS, WeatherStore, WriteBehindWeatherCache, export_json_cache, open_weather_store
+
+
+def test_a_top_50_render_writes_once(archive, cache, monkeypatch):
+    # 50 tornadoes with paths (300 keys) fetched one tornado at a time, like the map render
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", False)
+    monkeypatch.setattr(weather, "fetch_missing_weather", partial(fetch_missing_weather, base_url=archive.url))
+    writes = []
+    upsert_many = cache.store.upsert_many
+    monkeypatch.setattr(cache.store, "upsert_many", lambda records: writes.append(1) or upsert_many(records))
+    tornadoes = pd.DataFrame({
+        "date": pd.date_range("2000-01-01", periods=50, freq="30D"),
+        "slat": [30 + i * 0.3 for i in range(50)], "slon": [-100 + i * 0.2 for i in range(50)],
+        "elat": [30.5 + i * 0.3 for i in range(50)], "elon": [-99.5 + i * 0.2 for i in range(50)],
+    })
+
+    for _, row in tornadoes.iterrows():
+        weather.prepare_weather_data(row, cache, include_path=True)
+    assert writes == [] and cache.pending >= 50
+
+    cache.flush()
+    assert writes == [1]
+
+
+def test_a_quiet_buffer_is_flushed_on_time(tmp_path):
+    store = WeatherStore(str(tmp_path / "weather.sqlite"))
+    cache = WriteBehindWeatherCache(store, max_age_s=0.1)
+    cache.put("2011-04-27", "34.00,-87.00", dict.fromkeys(WEATHER_FIELDS, 1.0))
+
+    deadline = time.monotonic() + 5
+    while cache.pending and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert cache.pending == 0 and store.get("2011-04-27", "34.00,-87.00")["temperature"] == 1.0
+
+
+def test_records_stay_readable_while_they_are_written(cache, monkeypatch):
+    pair = ("2011-04-27", "34.00,-87.00")
+    seen = []
+    upsert_many = cache.store.upsert_many
+
+    def read_and_put_during_write(records):
+        seen.append(cache.get(*pair))
+        cache.put(*pair, {"temperature": 2.0})
+        return upsert_many(records)
+
+    monkeypatch.setattr(cache.store, "upsert_many", read_and_put_during_write)
+    cache.put(*pair, dict.fromkeys(WEATHER_FIELDS, 1.0))
+    cache.flush()
+
+    # The record was visible mid-write, and the put made meanwhile is still queued for the next flush
+    assert seen[0]["temperature"] == 1.0
+    assert cache.pending == 1 and cache.get(*pair)["temperature"] == 2.0
+
+
+
+def test_a_full_buffer_is_written_in_one_transaction(tmp_path):
+    cache = WriteBehindWeatherCache(WeatherStore(str(tmp_path / "weather.sqlite")), max_records=3)
+    for day in range(1, 3):
+        cache.put(f"2011-04-{day:02d}", "34.00,-87.00", {"temperature": 1.0})
+    assert cache.pending == 2 and len(cache.store) == 0
+
+    cache.put("2011-04-03", "34.00,-87.00", {"temperature": 1.0})
+    assert cache.pending == 0 and len(cache.store) == 3 and cache.store.revision().endswith(":1")
+
+def test_the_json_cache_is_migrated_once_and_exports_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(weather_store, "_stores", {})
+    records = {"2011-04-27": {"34.00,-87.00": dict.fromkeys(WEATHER_FIELDS, 1.5)},
+               "2013-05-20": {"35.33,-97.48": {**dict.fromkeys(WEATHER_FIELDS, 2.0), "cape": None}}}
+    json_path, path = tmp_path / "weather_cache.json", str(tmp_path / "weather.sqlite")
+    json_path.write_text(json.dumps(records))
+
+    store = open_weather_store(path, str(json_path))
+    assert store.get("2013-05-20", "35.33,-97.48") == records["2013-05-20"]["35.33,-97.48"]
+
+    # Reopening (e.g. another process) does not migrate again
+    json_path.write_text(json.dumps({"2011-04-27": {"34.00,-87.00": dict.fromkeys(WEATHER_FIELDS, 9.0)}}))
+    monkeypatch.setattr(weather_store, "_stores", {})
+    store = open_weather_store(path, str(json_path))
+    assert store.get("2011-04-27", "34.00,-87.00")["temperature"] == 1.5
+
+    export_json_cache(store, str(tmp_path / "export.json"))
+    assert json.loads((tmp_path / "export.json").read_text()) == records
+
+
+def test_every_write_bumps_the_revision_other_connections_see(tmp_path):
+    store = WeatherStore(str(tmp_path / "weather.sqlite"))
+    other = WeatherStore(store.path)
+    before = other.revision()
+
+    store.put("2011-04-27", "34.00,-87.00", {"temperature": 1.0})
+
+    assert other.revision() != before and other.get("2011-04-27", "34.00,-87.00")["temperature"] == 1.0
+    assert store.delete_except(set()) == 1 and len(other) == 0
@@ -0,0 +1,44 @@
+import time
+from functools import partial
+
+import pandas as pd
+
+import utils.weather as weather
+import utils.weather_warmup as weather_warmup
+from utils.weather_api import fetch_missing_weather
+from utils.weather_warmup import failed, in_flight, warm_up
+
+
+def test_concurrent_selections_share_one_fetch_per_key(archive, cache):
+    # 30 locations on 2 dates a week apart: 2 batches
+    keys = [(f"2011-04-{day:02d}", f"{34 + i / 10:.2f},-87.00") for day in (20, 27) for i in range(30)]
+
+    # Three sessions picking the same selection at once
+    queued = [warm_up(keys, cache, archive.url) for _ in range(3)]
+    while in_flight(keys):
+        time.sleep(0.05)
+
+    assert queued == [len(keys), 0, 0]
+    assert len(archive.requests_seen) == 2
+    assert not cache.missing_keys(keys)
+    assert warm_up(keys, cache, archive.url) == 0
+
+
+def test_failed_keys_are_not_fetched_again(archive, cache, monkeypatch):
+    monkeypatch.setattr(weather_warmup, "_failed", {})
+    monkeypatch.setattr(weather, "DISABLE_API_FETCH", False)
+    monkeypatch.setattr(weather, "fetch_missing_weather", partial(fetch_missing_weather, base_url=archive.url))
+    archive.fail_when, archive.fail_status = (lambda latitudes: True), 401
+    row = pd.Series({"date": pd.Timestamp("2011-04-27"), "slat": 34.0, "slon": -87.0, "elat": 34.5, "elon": -86.5})
+    keys = weather.weather_cache_keys(row)
+
+    warm_up(keys, cache, archive.url)
+    while in_flight(keys):
+        time.sleep(0.05)
+    requests = len(archive.requests_seen)
+
+    assert failed(keys) == set(keys)
+    assert warm_up(keys, cache, archive.url) == 0
+    _, records = weather.prepare_weather_data(row, cache, failed=failed(keys))
+    assert len(archive.requests_seen) == requests
+    assert all(record["temperature"] is None for record in records)
@@ -0,0 +1,50 @@
+# Write-then-rename for every file the app keeps under cache/
+#
+# The snapshot columns, the weather matrix, their manifests, the prefetch checkpoint and the JSON export
+# are read (or memory-mapped) by other processes while they are rewritten. Writing to a temporary file in
+# the same directory and renaming it over the target means a reader sees the old file or the new one,
+# never a half-written one. Sets of files that must match (a snapshot's columns, a matrix's arrays) are
+# written under a new build tag and switched to by rewriting their manifest, so a reader never mixes builds.
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """
+    Open a temporary file next to `path` for writing and move it over `path` when the block exits.
+    If the block raises, the temporary file is removed and `path` is left untouched.
+    """
+    # Unique per writer, so two processes (or threads) rewriting the same file don't share a temp file
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Files of superseded builds are deleted once this old; a process that read the old manifest a moment
+# ago may still be opening them (mapped files stay readable after deletion on POSIX)
+STALE_FILE_AGE_S = 300
+
+
+def remove_stale_builds(directory, keep, max_age_s=STALE_FILE_AGE_S):
+    """
+    Delete the "<name>-<build>.npy" files in `directory` of every build but `keep` older than `max_age_s`.
+    """
+    cutoff = time.time() - max_age_s
+    for entry in os.scandir(directory):
+        build = entry.name.rsplit("-", 1)[-1].split(".")[0]
+        if entry.name.endswith(".npy") and build != keep and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass  # still mapped on a platform that forbids deleting it; retried on the next build
@@ -4,8 +4,12 @@
 API_KEY = "90927d45c68b47cc8592033a1c84ec33"
 
 US_STATES_GEOJSON_FILE_PATH = "./data/us-states.json"
+US_COUNTIES_GEOJSON_FILE_PATH = "./notebooks/data/us_county_data.geojson"
 WEATHER_CACHE_FILE = "./cache/weather_cache.json"
+WEATHER_STORE_FILE = "./cache/weather_cache.sqlite"
+WEATHER_PREFETCH_CHECKPOINT_FILE = "./cache/weather_prefetch_checkpoint.json"
 TORNADO_CSV_URL = "./data/1950-2023_actual_tornadoes.csv"
+TORNADO_SNAPSHOT_DIR = "./cache/tornado_snapshot/"
 WEATHER_STATION_DATA_URL = "./data/weather_stations/"
 
 MAP_STYLES = {
@@ -33,9 +37,27 @@ TORNADO_END_PNG_ICON = "./assets/tornado_end.png"
 
 THERMOMETER_ICON = "./assets/thermometer.png"
 
+# Choices of the Top N page's "Top N Tornadoes" selector
+TOP_N_CHOICES = [10, 20, 30, 40, 50, 150, 500, 1000]
+
 COLUMN_MAPPING = {
     "Length": ("len", "Tornado Length"),
     "Fatalities": ("fat", "Fatalities"),
     "Injuries": ("inj", "Injuries"),
     "Width": ("wid", "Tornado Width")
-}
\ No newline at end of file
+}
+
+NON_CONUS_STATES = ['AK', 'HI', 'PR', 'VI']
+
+# === Column projections: the fields each consumer actually reads ===
+TOP_N_COLUMNS = ['date', 'yr', 'slat', 'slon', 'elat', 'elon', 'len', 'mag', 'wid', 'fat', 'inj']
+EXPLORE_COLUMNS = ['yr', 'mo', 'mag', 'st', 'slat', 'slon']
+NOTEBOOK_3D_COLUMNS = ['yr', 'mo', 'dy', 'slat', 'slon', 'inj', 'fat']
+# FIPS codes of the state/county containing each start and end point, assigned at snapshot build
+REGION_COLUMNS = ['state_fips', 'county_fips', 'end_state_fips', 'end_county_fips']
+
+# === Row predicates: (column, op, value) filters pushed down to the snapshot ===
+NONZERO_START = [("slat", "!=", 0.0), ("slon", "!=", 0.0)]
+VALID_COORDS = NONZERO_START + [("elat", "between", (-90, 90)), ("elon", "between", (-180, 180))]
+KNOWN_MAGNITUDE = [("mag", "!=", -9)]
+CONUS_ONLY = [("st", "not in", NON_CONUS_STATES)]
@@ -1,12 +1,21 @@
 # handles tornado path geometry and coordinate validation
 import numpy as np
 
+# SPC coordinates carry at most 4 decimals. The tornado table stores them as float32, so round back
+# to the CSV value before building 0.01° weather keys, otherwise e.g. 31.105 would key as 31.10.
+COORDINATE_DECIMALS = 4
+
+def canonical_coordinate(value):
+    return round(float(value), COORDINATE_DECIMALS)
+
 def validate_coordinates(lat, lon):
     if (lat == 0.0 and lon == 0.0) or not (-90 <= lat <= 90 and -180 <= lon <= 180):
         return None
     return (lat, lon)
 
 def get_intermediate_points(start_lat, start_lon, end_lat, end_lon, steps=4):
+    start_lat, start_lon = canonical_coordinate(start_lat), canonical_coordinate(start_lon)
+    end_lat, end_lon = canonical_coordinate(end_lat), canonical_coordinate(end_lon)
     lats = np.linspace(start_lat, end_lat, steps)
     lons = np.linspace(start_lon, end_lon, steps)
     return list(zip(np.round(lats, 2), np.round(lons, 2)))
@@ -3,18 +3,79 @@ import pandas as pd
 import streamlit as st
 import os
 
+from utils.constants import TOP_N_COLUMNS, REGION_COLUMNS, EXPLORE_COLUMNS, NONZERO_START, VALID_COORDS, KNOWN_MAGNITUDE, \
+    CONUS_ONLY, TORNADO_SNAPSHOT_DIR
+from utils.regions import state_names
+from utils.tornado_derived import load_derived_artifacts, MAGNITUDES
+from utils.tornado_snapshot import load_snapshot_frame, TORNADO_BYTES_PER_ROW_TARGET
+
 TORNADO_CSV_URL = "./data/1950-2023_actual_tornadoes.csv"
 WEATHER_STATION_DATA_URL = "./data/weather_stations/"
 
-@st.cache_data
+
+def load_tornado_columns(columns=None, filters=None, csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    """
+    Read only `columns` of the rows matching every filter, e.g.
+    load_tornado_columns(EXPLORE_COLUMNS, KNOWN_MAGNITUDE + CONUS_ONLY).
+    Unused columns and filtered-out rows are never materialized. The paths default to the app's;
+    the notebooks pass their own since they run from notebooks/.
+    """
+    return load_snapshot_frame(columns, filters, csv_path, snapshot_dir)
+
+
+# === Tornado dataset registry ===
+# Every page asks for a named view instead of re-reading the data. Views are built on first use
+# and then shared, uncopied, by every session in the process, so callers must treat them as read-only.
+# Rows appended with `python -m utils.ingest_tornado_delta` show up after the app restarts.
+
+def _all_view():
+    return load_tornado_columns()
+
+def _with_state_names(df):
+    # Start state/county codes come from the snapshot; the state name is a category relabel, not a lookup
+    df["state"] = state_names(df["state_fips"])
+    return df
+
+def _validated_coords_view():
+    return _with_state_names(load_tornado_columns(TOP_N_COLUMNS + REGION_COLUMNS, VALID_COORDS))
+
+def _nonzero_start_view():
+    return _with_state_names(load_tornado_columns(TOP_N_COLUMNS + REGION_COLUMNS, NONZERO_START))
+
+def _known_magnitude_view():
+    return load_tornado_columns(EXPLORE_COLUMNS, KNOWN_MAGNITUDE)
+
+def _conus_geo_view():
+    import geopandas as gpd  # only the explore page needs geometry; keep it out of the other views' imports
+    df = load_tornado_columns(EXPLORE_COLUMNS, KNOWN_MAGNITUDE + CONUS_ONLY)
+    geometry = gpd.points_from_xy(df['slon'], df['slat'])
+    return gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+
+def _yearly_magnitude_counts_view():
+    # Precomputed at snapshot build and kept current by utils.ingest_tornado_delta
+    counts = load_derived_artifacts()["yearly_magnitude_counts"]
+    df = pd.DataFrame.from_dict(counts, orient="index", columns=MAGNITUDES)
+    df.index = df.index.astype(int)
+    return df.sort_index()
+
+TORNADO_VIEWS = {
+    "all": _all_view,
+    "validated_coords": _validated_coords_view,
+    "nonzero_start": _nonzero_start_view,
+    "known_magnitude": _known_magnitude_view,
+    "conus_geo": _conus_geo_view,
+    "yearly_magnitude_counts": _yearly_magnitude_counts_view,
+}
+
+@st.cache_resource(show_spinner=False)
+def get_tornado_view(name):
+    if name not in TORNADO_VIEWS:
+        raise KeyError(f"Unknown tornado view '{name}'. Available: {list(TORNADO_VIEWS)}")
+    return TORNADO_VIEWS[name]()
+
+
 def load_tornado_data():
-    df = pd.read_csv(TORNADO_CSV_URL)
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df[
-        (df["slat"] != 0.0) & (df["slon"] != 0.0) &
-        (df["elat"].between(-90, 90)) & (df["elon"].between(-180, 180))
-    ]
-    return df[['date', 'yr', 'slat', 'slon', 'elat', 'elon', 'len', 'mag', 'wid', 'fat', 'inj']]
+    return get_tornado_view("validated_coords")
 
 
 # some of this data is getting processed as NaN, this could be an issue. investigate later
@@ -27,17 +88,32 @@ def load_station_data():
     return stations
 
 
+def tornado_memory_report(names=None):
+    """
+    Per-view memory (deep, index included) so dtype or duplication regressions show up as numbers.
+    Building the report materializes any view that has not been requested yet.
+    """
+    from utils.top_n_index import candidate_rows  # top_n_index builds on this module's registry
 
+    views = {name: get_tornado_view(name) for name in (names or TORNADO_VIEWS)}
+    views["prefetch_457"] = candidate_rows()
 
-def load_prefetch_457_df():
-    df = pd.read_csv(TORNADO_CSV_URL)
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df[(df["slat"] != 0.0) & (df["slon"] != 0.0)]
+    records = []
+    for name, view in views.items():
+        nbytes = int(view.memory_usage(deep=True, index=True).sum())
+        records.append({
+            "view": name,
+            "rows": len(view),
+            "columns": view.shape[1],
+            "MB": round(nbytes / 1e6, 2),
+            "bytes_per_row": round(nbytes / max(len(view), 1), 1),
+        })
+    return pd.DataFrame(records)
 
-    top_len = df.sort_values("len", ascending=False).head(150)
-    top_wid = df.sort_values("wid", ascending=False).head(150)
-    top_fat = df.sort_values("fat", ascending=False).head(150)
-    top_inj = df.sort_values("inj", ascending=False).head(150)
 
-    combined = pd.concat([top_len, top_wid, top_fat, top_inj]).drop_duplicates()
-    return combined.reset_index(drop=True)
\ No newline at end of file
+if __name__ == "__main__":
+    report = tornado_memory_report()
+    print(report.to_string(index=False))
+    per_row = report.loc[report["view"] == "all", "bytes_per_row"].iloc[0]
+    print(f"Full table: {per_row} bytes/row (target {TORNADO_BYTES_PER_ROW_TARGET}) "
+          f"{'✅' if per_row <= TORNADO_BYTES_PER_ROW_TARGET else '❌'}")
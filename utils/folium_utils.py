@@ -1,21 +1,26 @@
-import geopandas as gpd
-from shapely.geometry import Point
+from utils.regions import point_state_names
 
-from utils.constants import US_STATES_GEOJSON_FILE_PATH
 
-# Load U.S. state shapes (one-time load)
-states_gdf = gpd.read_file(US_STATES_GEOJSON_FILE_PATH)
+def assign_states(lats, lons):
+    """
+    State name for every (lat, lon) pair in one call, "NA" where no state contains the point.
+    Points are matched through the states' STRtree, so a whole table geocodes in one bulk query.
+    """
+    return point_state_names(lats, lons)
 
 def get_state_from_latlon(lat, lon):
-    point = Point(lon, lat)  # Geo format: (lon, lat)
-    for _, row in states_gdf.iterrows():
-        if row["geometry"].contains(point):
-            return row["name"]
-    return "NA"
+    return assign_states([lat], [lon])[0]
+
+def with_states(df):
+    # Snapshot views already carry "state" (assigned once at build by utils.regions); other frames get a copy with it
+    if "state" in df.columns:
+        return df
+    df = df.copy()
+    df["state"] = assign_states(df["slat"], df["slon"])
+    return df
 
 def build_tornado_dropdown(filtered_df):
-    df = filtered_df.copy()
-    df["state"] = df.apply(lambda row: get_state_from_latlon(row["slat"], row["slon"]), axis=1)
+    df = with_states(filtered_df)
     df_sorted = df.sort_values("state")
     options = {
         idx: f"{row['state']} | {str(row['date'])[:10]} | EF{int(row['mag'])} | {round(row['len'], 1)} mi"
@@ -0,0 +1,72 @@
+# Append yearly SPC delta files (e.g. 2024_actual_tornadoes.csv) to the tornado snapshot
+#
+# Run from the repository root:
+#   python -m utils.ingest_tornado_delta data/2024_actual_tornadoes.csv [--keys-out cache/pending_weather_keys.json]
+#
+# Only the new rows are parsed. Derived artifacts are updated for just what those rows touch, and the
+# command reports the (date, "lat,lon") weather keys that newly prefetched tornadoes still need.
+import argparse
+import json
+import os
+
+from utils.constants import TOP_N_COLUMNS
+from utils.tornado_derived import load_derived_artifacts, update_derived_artifacts, prefetch_candidate_positions
+from utils.tornado_snapshot import append_snapshot_rows, load_snapshot_frame
+from utils.weather import load_cached_weather, weather_cache_keys
+
+
+def ingest_delta_files(delta_paths):
+    derived = load_derived_artifacts()
+    old_candidates = set(prefetch_candidate_positions(derived))
+    old_years = dict(derived["yearly_magnitude_counts"])
+
+    appended = []
+    for path in delta_paths:
+        _, positions = append_snapshot_rows(path)
+        derived = update_derived_artifacts(derived, positions)
+        appended.append((path, len(positions)))
+
+    new_candidates = [p for p in prefetch_candidate_positions(derived) if p not in old_candidates]
+    changed_years = sorted(
+        year for year, counts in derived["yearly_magnitude_counts"].items() if old_years.get(year) != counts
+    )
+
+    # Weather keys for tornadoes that just entered the prefetch set and are not cached yet
+    pending_keys = []
+    if new_candidates:
+        rows = load_snapshot_frame(TOP_N_COLUMNS).iloc[new_candidates]
+        wanted = [pair for _, row in rows.iterrows() for pair in weather_cache_keys(row, include_path=True)]
+        pending_keys = load_cached_weather().missing_keys(wanted)
+
+    return {
+        "appended": appended,
+        "changed_years": changed_years,
+        "new_prefetch_candidates": new_candidates,
+        "pending_weather_keys": pending_keys,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append SPC delta CSVs to the tornado snapshot.")
+    parser.add_argument("delta_csv", nargs="+", help="SPC-format CSV(s) with the new rows")
+    parser.add_argument("--keys-out", help="Write the pending (date, lat,lon) weather keys to this JSON file")
+    args = parser.parse_args()
+
+    report = ingest_delta_files(args.delta_csv)
+
+    for path, rows in report["appended"]:
+        print(f"📥 {os.path.basename(path)}: {rows} new rows appended")
+    print(f"📊 Yearly aggregates recomputed for: {', '.join(report['changed_years']) or 'none'}")
+    print(f"🌪️ New prefetch candidates: {len(report['new_prefetch_candidates'])}")
+    print(f"🌦️ Weather keys to fetch: {len(report['pending_weather_keys'])}")
+    for date_str, key in report["pending_weather_keys"]:
+        print(f"   {date_str} @ {key}")
+
+    if args.keys_out:
+        with open(args.keys_out, "w") as f:
+            json.dump([{"date": d, "key": k} for d, k in report["pending_weather_keys"]], f, indent=4)
+        print(f"✅ Pending keys written to {args.keys_out}")
+
+
+if __name__ == "__main__":
+    main()
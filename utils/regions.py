@@ -0,0 +1,101 @@
+# State and county assignment for tornado start/end points, run once when the snapshot is built
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import US_STATES_GEOJSON_FILE_PATH, US_COUNTIES_GEOJSON_FILE_PATH
+
+# The shape files are read relative to the repository root, so notebooks building the snapshot from
+# notebooks/ find them too
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATES_SHAPES_PATH = os.path.normpath(os.path.join(_REPO_ROOT, US_STATES_GEOJSON_FILE_PATH))
+COUNTIES_SHAPES_PATH = os.path.normpath(os.path.join(_REPO_ROOT, US_COUNTIES_GEOJSON_FILE_PATH))
+
+_shapes = {}
+
+
+def _load_shapes(name):
+    # State and county shapes are only needed while building or appending to the snapshot
+    if name not in _shapes:
+        import geopandas as gpd  # state_names runs in the app; geometry is only needed at build time
+        if name == "states":
+            gdf = gpd.read_file(STATES_SHAPES_PATH).rename(columns={"id": "fips"})
+        else:
+            gdf = gpd.read_file(COUNTIES_SHAPES_PATH, columns=["GEOID"]).rename(columns={"GEOID": "fips"})
+        _shapes[name] = gdf[["fips", "geometry"]]
+    return _shapes[name]
+
+
+def first_containing(polygons, lats, lons):
+    """
+    Position in `polygons` of the first shape (file order) that contains each (lat, lon), or -1.
+    All points go through the shapes' STRtree in one bulk query.
+    """
+    import geopandas as gpd
+    points = gpd.points_from_xy(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))  # Geo format: (lon, lat)
+    point_idx, shape_idx = polygons.sindex.query(points, predicate="within")
+
+    # A point on a shared border can match two shapes; keep the first in file order
+    order = np.lexsort((shape_idx, point_idx))
+    point_idx, shape_idx = point_idx[order], shape_idx[order]
+    _, first = np.unique(point_idx, return_index=True)
+
+    positions = np.full(len(points), -1, dtype=np.int64)
+    positions[point_idx[first]] = shape_idx[first]
+    return positions
+
+
+def _fips_codes(name, lats, lons):
+    shapes = _load_shapes(name)
+    positions = first_containing(shapes, lats, lons)
+    codes = np.append(shapes["fips"].to_numpy(dtype=object), "")  # -1 picks "" (no state/county)
+    return codes[positions]
+
+
+def region_columns(df):
+    """
+    State and county FIPS codes for every row's start and end point, "" where the point is outside
+    every shape (offshore, or 0/0 for unknown end points).
+    """
+    return {
+        "state_fips": _fips_codes("states", df["slat"], df["slon"]),
+        "county_fips": _fips_codes("counties", df["slat"], df["slon"]),
+        "end_state_fips": _fips_codes("states", df["elat"], df["elon"]),
+        "end_county_fips": _fips_codes("counties", df["elat"], df["elon"]),
+    }
+
+
+def _state_names_by_fips():
+    with open(STATES_SHAPES_PATH, "r") as f:
+        features = json.load(f)["features"]
+    return {feature["id"]: feature["properties"]["name"] for feature in features}
+
+
+def point_state_names(lats, lons):
+    # State name of every (lat, lon), "NA" outside every state; for points that are not in the snapshot
+    lookup = _state_names_by_fips()
+    return np.array([lookup.get(fips, "NA") for fips in _fips_codes("states", lats, lons)], dtype=object)
+
+
+def state_names(state_fips):
+    """
+    State name column for a categorical FIPS column ("NA" outside every state), with categories
+    in alphabetical order so sorting by it sorts by name. Only the categories are mapped.
+    """
+    lookup = _state_names_by_fips()
+    names = state_fips.map(lambda fips: lookup.get(fips, "NA")).astype("category")
+    return names.cat.reorder_categories(sorted(names.cat.categories))
+
+
+if __name__ == "__main__":
+    # Run from the repository root: python -m utils.regions
+    import time
+
+    tornadoes = pd.read_csv("./data/1950-2023_actual_tornadoes.csv", usecols=["slat", "slon", "elat", "elon"])
+    t0 = time.perf_counter()
+    regions = region_columns(tornadoes)
+    elapsed = time.perf_counter() - t0
+    print(f"Assigned states and counties to {len(tornadoes):,} start/end points in {elapsed:.3f}s "
+          f"({(regions['state_fips'] == '').sum():,} starts outside any state)")
@@ -0,0 +1,87 @@
+# Startup budget for the landing page (render_task_grid), checked with an import-time profile
+#
+# Run from the repository root:
+#   python -m utils.startup_profile
+#
+# Streamlit's own import is reported separately; the budget covers what this app adds on top of it.
+import os
+import subprocess
+import sys
+import time
+
+# Import cost the app may add to the landing page on top of streamlit itself
+LANDING_IMPORT_BUDGET_S = 0.05
+# One full landing-page script run (app.py via streamlit's AppTest), imports included
+LANDING_RENDER_BUDGET_S = 0.5
+
+# Heavy libraries that belong to a specific view and must not load for the landing page
+VIEW_SCOPED_MODULES = ["geopandas", "shapely", "folium", "seaborn", "matplotlib", "statsmodels", "plotly", "scipy"]
+
+APP_PACKAGES = ("components", "utils")
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def import_profile(statement="import components.dashboard"):
+    """
+    Run `statement` under `python -X importtime` in a fresh interpreter (after importing streamlit)
+    and return {module: cumulative seconds} for every module it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import streamlit; {statement}"],
+        capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    seen_streamlit = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = (part.strip() for part in line.split(":", 1)[1].split("|"))
+        if not seen_streamlit:
+            # Everything up to and including the streamlit line is streamlit's own cost
+            seen_streamlit = module == "streamlit"
+            profile.setdefault("<streamlit>", 0.0)
+            if seen_streamlit:
+                profile["<streamlit>"] = int(cumulative) / 1e6
+            continue
+        profile[module.lstrip()] = int(cumulative) / 1e6
+    return profile
+
+
+def landing_page_run():
+    """
+    Render the landing page once through AppTest and return (seconds, view-scoped modules it loaded).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    before = set(sys.modules)
+    t0 = time.perf_counter()
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=60).run()
+    elapsed = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(f"Landing page raised: {[e.value for e in at.exception]}")
+
+    loaded = set(sys.modules) - before
+    heavy = sorted(name for name in VIEW_SCOPED_MODULES if name in loaded)
+    return elapsed, heavy
+
+
+if __name__ == "__main__":
+    profile = import_profile()
+    app_modules = {name: s for name, s in profile.items() if name.split(".")[0] in APP_PACKAGES}
+    app_import_s = max(app_modules.values(), default=0.0)
+    heavy_imported = sorted(name for name in VIEW_SCOPED_MODULES if name in profile)
+
+    print(f"streamlit import: {profile.get('<streamlit>', 0.0):.3f}s")
+    print(f"App imports for the landing page: {app_import_s:.3f}s (budget {LANDING_IMPORT_BUDGET_S:.3f}s) "
+          f"{'✅' if app_import_s <= LANDING_IMPORT_BUDGET_S else '❌'}")
+    for name, seconds in sorted(profile.items(), key=lambda item: -item[1])[:10]:
+        if name != "<streamlit>":
+            print(f"   {seconds * 1e3:8.1f} ms  {name}")
+    print(f"View-scoped libraries imported: {', '.join(heavy_imported) or 'none'} "
+          f"{'✅' if not heavy_imported else '❌'}")
+
+    elapsed, heavy_loaded = landing_page_run()
+    print(f"Landing page run: {elapsed:.3f}s (budget {LANDING_RENDER_BUDGET_S:.3f}s) "
+          f"{'✅' if elapsed <= LANDING_RENDER_BUDGET_S else '❌'}")
+    print(f"View-scoped libraries loaded by the run: {', '.join(heavy_loaded) or 'none'} "
+          f"{'✅' if not heavy_loaded else '❌'}")
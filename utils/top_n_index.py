@@ -0,0 +1,121 @@
+# Precomputed descending-order index per severity metric for Top N queries
+#
+# Run from the repository root for a per-rerun micro-benchmark:
+#   python -m utils.top_n_index
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.constants import COLUMN_MAPPING
+from utils.data_loader import get_tornado_view, load_tornado_columns
+from utils.tornado_derived import PREFETCH_METRICS, PREFETCH_TOP_K
+
+TOP_N_METRICS = [col for col, _ in COLUMN_MAPPING.values()]
+
+
+class MetricRangeIndex:
+    """
+    One metric's rows sorted by descending value (ties keep table order, NaN last).
+    A (min, max, N) query finds the in-range slice with two binary searches, so it costs
+    O(log n + N) instead of a full-table mask and sort.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind != "f":
+            values = values.astype(np.float64)
+        # Bounds are cast to the column's float type so float32 columns compare exactly like pandas masks
+        self._scalar = values.dtype.type
+        self.order = np.argsort(-values, kind="stable")
+        # Ascending copy of the negated values: searchsorted needs ascending input
+        self._ascending = -values[self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def range_bounds(self, min_val, max_val):
+        start = np.searchsorted(self._ascending, -self._scalar(max_val), side="left")
+        end = np.searchsorted(self._ascending, -self._scalar(min_val), side="right")
+        return int(start), int(end)
+
+    def top_n(self, n, value_range=None):
+        if value_range is None:
+            return self.order[:n]
+        start, end = self.range_bounds(*value_range)
+        return self.order[start:min(end, start + n)]
+
+    def count_in_range(self, min_val, max_val):
+        start, end = self.range_bounds(min_val, max_val)
+        return end - start
+
+
+@st.cache_resource(show_spinner=False)
+def get_metric_index(view, metric):
+    # Built once per (registry view, metric) and shared by every session
+    return MetricRangeIndex(get_tornado_view(view)[metric].to_numpy())
+
+
+def top_n_rows(metric, n, value_range=None, view="validated_coords"):
+    """
+    The n rows of a registry view with the largest `metric`, optionally limited to
+    min <= metric <= max. Same rows as sort_values(metric, ascending=False).head(n), without the sort.
+    """
+    return get_tornado_view(view).iloc[get_metric_index(view, metric).top_n(n, value_range)]
+
+
+def top_k_union(indexes, k):
+    # Union of each MetricRangeIndex's top k positions, in index order with duplicates dropped
+    return pd.unique(np.concatenate([index.top_n(k) for index in indexes]))
+
+
+@st.cache_resource(show_spinner=False)
+def get_candidate_positions(k=PREFETCH_TOP_K, metrics=tuple(PREFETCH_METRICS), view="nonzero_start", filters=()):
+    """
+    Row positions into `view` of the union of each metric's top k, in metric order with duplicates dropped,
+    among the rows matching every (column, op, value) filter. The defaults give the prefetched "Top 457"
+    set whose weather is cached; utils.weather_prefetch selects other sets through `filters`.
+    """
+    if not filters:
+        return top_k_union([get_metric_index(view, metric) for metric in metrics], k)
+    frame = get_tornado_view(view)
+    # Filters are pushed down to the snapshot, so they may use columns the view does not project;
+    # view indexes hold snapshot positions
+    eligible = np.flatnonzero(frame.index.isin(load_tornado_columns([], list(filters)).index))
+    return eligible[top_k_union([MetricRangeIndex(frame[metric].to_numpy()[eligible]) for metric in metrics], k)]
+
+
+def candidate_rows(k=PREFETCH_TOP_K, metrics=PREFETCH_METRICS, view="nonzero_start", filters=()):
+    # metrics and filters go through as tuples so the cache key is hashable
+    filters = tuple((name, op, tuple(value) if isinstance(value, list) else value) for name, op, value in filters)
+    return get_tornado_view(view).iloc[get_candidate_positions(k, tuple(metrics), view, filters)]
+
+
+def _benchmark(df, metric, n, value_range, repeats=20):
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        filtered = df[(df[metric] >= value_range[0]) & (df[metric] <= value_range[1])]
+        filtered.sort_values(metric, ascending=False).head(n)
+    before = (time.perf_counter() - t0) / repeats
+
+    index = MetricRangeIndex(df[metric].to_numpy())
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        df.iloc[index.top_n(n, value_range)]
+    after = (time.perf_counter() - t0) / repeats
+    return before, after
+
+
+if __name__ == "__main__":
+    base = get_tornado_view("validated_coords")
+    for scale in (1, 10):
+        tornadoes = pd.concat([base] * scale, ignore_index=True)
+        print(f"\n{len(tornadoes):,} rows ({scale}x); per-rerun latency, mask + sort_values vs searchsorted index")
+        print(f"{'metric':>6} {'N':>6} {'sort (ms)':>10} {'index (ms)':>11}")
+        for metric in TOP_N_METRICS:
+            # A slider-style sub-range: everything between the median and the 99.9th percentile
+            value_range = tuple(float(q) for q in tornadoes[metric].quantile([0.5, 0.999]))
+            for n in (10, 150, 1000, 5000):
+                before_s, after_s = _benchmark(tornadoes, metric, n, value_range)
+                print(f"{metric:>6} {n:>6} {before_s * 1e3:>10.2f} {after_s * 1e3:>11.2f}")
@@ -1,14 +1,9 @@
 import pandas as pd
 
-from components.folium_radar_map import render_geographic_radar_map, geo_radar_initial_text
-from components.radar_comparison import render_radar_chart
-from components.science_questions.correlation_matrix import render_correlation_matrix
-from components.science_questions.precipitation_vs_width import render_precipitation_vs_width
-from components.science_questions.temp_vs_length import render_temp_vs_length
-from components.science_questions.wind_vs_fatalities import render_wind_vs_fatalities
-from utils.data_loader import load_prefetch_457_df
+from utils.top_n_index import candidate_rows
 
-PREFETCH_457_DF = load_prefetch_457_df()
+# Each question's module (and its plotting stack: folium, seaborn, matplotlib, plotly) is imported
+# inside its branch of render_scientific_explorer, the first time that question is opened.
 
 
 def initial_text(st):
@@ -86,9 +81,11 @@ def render_scientific_explorer(st, filtered):
     ])
 
     if question == "Spider Radar Chart (EF, Injuries, Width, etc.)":
+        from components.radar_comparison import render_radar_chart
         render_radar_chart(filtered)
 
     elif question == "Geographic Radar View (Compare Tornado Paths)":
+        from components.folium_radar_map import render_geographic_radar_map, geo_radar_initial_text
         st.markdown("### 📽️ Geographic Tornado Radar Map")
         geo_radar_initial_text(st)
         st.markdown("#### 🌐 Select tornadoes for geographic comparison:")
@@ -107,16 +104,20 @@ def render_scientific_explorer(st, filtered):
             st.info("📌 Select two or more tornadoes to view them on the comparison map.")
 
     elif question == "Wind Gust vs Fatalities":
-        render_wind_vs_fatalities(filtered, PREFETCH_457_DF)
+        from components.science_questions.wind_vs_fatalities import render_wind_vs_fatalities
+        render_wind_vs_fatalities(filtered, candidate_rows())
 
     elif question == "Temperature vs Tornado Length":
-        render_temp_vs_length(filtered, PREFETCH_457_DF)
+        from components.science_questions.temp_vs_length import render_temp_vs_length
+        render_temp_vs_length(filtered, candidate_rows())
 
     elif question == "Precipitation vs Tornado Width":
+        from components.science_questions.precipitation_vs_width import render_precipitation_vs_width
 
-        render_precipitation_vs_width(filtered, PREFETCH_457_DF)
+        render_precipitation_vs_width(filtered, candidate_rows())
 
     elif question == "Correlation Matrix":
+        from components.science_questions.correlation_matrix import render_correlation_matrix
         render_correlation_matrix(filtered)
 
     else:
@@ -0,0 +1,108 @@
+# Small derived artifacts kept next to the tornado snapshot and updated incrementally on ingest
+import json
+import os
+
+import numpy as np
+
+from utils.atomic_write import atomic_write
+from utils.constants import TORNADO_CSV_URL, TORNADO_SNAPSHOT_DIR, NONZERO_START, KNOWN_MAGNITUDE, CONUS_ONLY
+from utils.tornado_snapshot import ensure_snapshot, load_snapshot_columns, snapshot_filter_mask
+
+DERIVED_FILE = "derived.json"
+
+# The prefetched weather set: top K tornadoes per metric, unioned
+PREFETCH_METRICS = ["len", "wid", "fat", "inj"]
+PREFETCH_TOP_K = 150
+
+MAGNITUDES = list(range(6))
+
+
+def _snapshot_stamp(manifest):
+    return {"source_sha256": manifest["source"]["sha256"], "rows": manifest["rows"]}
+
+
+def _yearly_magnitude_counts(manifest, arrays, years=None):
+    # Same population as the explore page's yearly trendline: CONUS, known magnitude
+    mask = snapshot_filter_mask(manifest, arrays, KNOWN_MAGNITUDE + CONUS_ONLY)
+    yr = np.asarray(arrays["yr"])
+    if years is not None:
+        mask &= np.isin(yr, list(years))
+    yr, mag = yr[mask], np.asarray(arrays["mag"])[mask]
+
+    counts = {}
+    for year in np.unique(yr).tolist():
+        counts[str(year)] = np.bincount(mag[yr == year], minlength=len(MAGNITUDES))[:len(MAGNITUDES)].tolist()
+    return counts
+
+
+def _top_k_positions(manifest, arrays, metric, k, candidates=None):
+    from utils.top_n_index import MetricRangeIndex  # top_n_index builds on this module's constants
+    eligible = snapshot_filter_mask(manifest, arrays, NONZERO_START)
+    # Sorted positions: the index breaks ties by position, like the Top N index over the full view
+    positions = np.flatnonzero(eligible) if candidates is None else np.unique(candidates[eligible[candidates]])
+    return positions[MetricRangeIndex(np.asarray(arrays[metric])[positions]).top_n(k)]
+
+
+def build_derived_artifacts(csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    manifest, arrays = load_snapshot_columns(["yr", "mag", "st", "slat", "slon"] + PREFETCH_METRICS,
+                                             csv_path, snapshot_dir)
+    derived = {
+        "snapshot": _snapshot_stamp(manifest),
+        "yearly_magnitude_counts": _yearly_magnitude_counts(manifest, arrays),
+        "prefetch_top_k": {
+            "k": PREFETCH_TOP_K,
+            "positions": {
+                metric: _top_k_positions(manifest, arrays, metric, PREFETCH_TOP_K).tolist()
+                for metric in PREFETCH_METRICS
+            },
+        },
+    }
+    _write_derived(snapshot_dir, derived)
+    return derived
+
+
+def _write_derived(snapshot_dir, derived):
+    with atomic_write(os.path.join(snapshot_dir, DERIVED_FILE)) as f:
+        json.dump(derived, f)
+
+
+def load_derived_artifacts(csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    """
+    Return the derived artifacts, rebuilding them in full if they do not match the current snapshot.
+    """
+    manifest = ensure_snapshot(csv_path, snapshot_dir)
+    path = os.path.join(snapshot_dir, DERIVED_FILE)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            derived = json.load(f)
+        if derived.get("snapshot") == _snapshot_stamp(manifest):
+            return derived
+    return build_derived_artifacts(csv_path, snapshot_dir)
+
+
+def update_derived_artifacts(derived, new_positions, csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    """
+    Fold freshly appended snapshot rows into `derived`, touching only what those rows can change:
+    the yearly counts of the years they fall in, and each metric's top K (old top K ∪ new rows).
+    """
+    manifest, arrays = load_snapshot_columns(["yr", "mag", "st", "slat", "slon"] + PREFETCH_METRICS,
+                                             csv_path, snapshot_dir)
+    new_positions = np.asarray(new_positions, dtype=np.int64)
+
+    if len(new_positions):
+        years = np.unique(np.asarray(arrays["yr"])[new_positions]).tolist()
+        derived["yearly_magnitude_counts"].update(_yearly_magnitude_counts(manifest, arrays, years))
+
+        top_k = derived["prefetch_top_k"]
+        for metric in PREFETCH_METRICS:
+            candidates = np.concatenate([np.asarray(top_k["positions"][metric], dtype=np.int64), new_positions])
+            top_k["positions"][metric] = _top_k_positions(manifest, arrays, metric, top_k["k"], candidates).tolist()
+
+    derived["snapshot"] = _snapshot_stamp(manifest)
+    _write_derived(snapshot_dir, derived)
+    return derived
+
+
+def prefetch_candidate_positions(derived):
+    positions = [p for metric in PREFETCH_METRICS for p in derived["prefetch_top_k"]["positions"][metric]]
+    return list(dict.fromkeys(positions))
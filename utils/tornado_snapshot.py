@@ -0,0 +1,350 @@
+# Columnar on-disk snapshot of the SPC tornado CSV (one .npy file per column)
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from utils.atomic_write import atomic_write, remove_stale_builds
+from utils.constants import TORNADO_CSV_URL, TORNADO_SNAPSHOT_DIR
+from utils.regions import region_columns
+
+SNAPSHOT_FORMAT_VERSION = 5
+MANIFEST_FILE = "manifest.json"
+
+# Explicit in-memory schema for the SPC columns. Integers are range-checked before downcasting;
+# unlisted numeric columns are downcast automatically and unlisted text columns become categories.
+TORNADO_SCHEMA = {
+    "om": "int32", "yr": "int16", "mo": "int8", "dy": "int8",
+    "date": "datetime64[ns]", "time": "category", "tz": "int8", "datetime_utc": "datetime64[ns]",
+    "st": "category", "stf": "int8", "stn": "int16",
+    "mag": "int8", "inj": "int16", "fat": "int16", "loss": "float32", "closs": "float32",
+    "slat": "float32", "slon": "float32", "elat": "float32", "elon": "float32",
+    "len": "float32", "wid": "int16",
+    "ns": "int8", "sn": "int8", "f1": "int16", "f2": "int16", "f3": "int16", "f4": "int16", "fc": "int8",
+    # Derived at build time by utils.regions (not in the SPC file)
+    "state_fips": "category", "county_fips": "category", "end_state_fips": "category", "end_county_fips": "category",
+}
+
+# Memory budget for the full table with the schema above (index included), reported by
+# `python -m utils.data_loader`. Pandas defaults cost ~300 bytes/row for the same columns.
+TORNADO_BYTES_PER_ROW_TARGET = 96
+
+# Load-time targets for the full 1950–2023 file (~70k rows), checked by `python -m utils.tornado_snapshot`
+COLD_START_TARGET_S = 2.0   # CSV parse + snapshot build
+WARM_START_TARGET_S = 0.15  # snapshot already on disk
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(snapshot_dir):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_manifest(snapshot_dir, manifest):
+    with atomic_write(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _column_path(snapshot_dir, name, build):
+    return os.path.join(snapshot_dir, f"{name}-{build}.npy")
+
+
+def _save_column(snapshot_dir, name, build, values):
+    # Write then rename so readers never memory-map a half-written file
+    with atomic_write(_column_path(snapshot_dir, name, build), "wb") as f:
+        np.save(f, values, allow_pickle=False)
+
+
+def _new_build():
+    # Every (re)write of the columns goes to new files; the manifest names the build readers should open
+    return uuid.uuid4().hex[:8]
+
+
+def _codes_dtype(n_categories):
+    # Smallest signed type holding every code plus pandas' -1 for missing values
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    raise ValueError(f"{n_categories} categories do not fit int32 codes")
+
+
+def _categorical_codes(categorical):
+    return categorical.codes.astype(_codes_dtype(len(categorical.categories)))
+
+
+def _column_to_array(name, series):
+    """
+    Convert one parsed CSV column to its schema dtype.
+    Returns (values, categories); categories is None unless the column is categorical.
+    """
+    dtype = TORNADO_SCHEMA.get(name)
+
+    if dtype == "datetime64[ns]":
+        # datetime_utc carries a "Z" suffix, so parse everything as UTC and store naive timestamps
+        values = pd.to_datetime(series, errors="coerce", utc=True).dt.tz_localize(None)
+        return values.to_numpy(dtype=dtype), None
+
+    if dtype == "category" or (dtype is None and not pd.api.types.is_numeric_dtype(series)):
+        categorical = pd.Categorical(series.fillna(""))
+        return _categorical_codes(categorical), [str(c) for c in categorical.categories]
+
+    if dtype is None:
+        downcast = "integer" if pd.api.types.is_integer_dtype(series) else "float"
+        return pd.to_numeric(series, downcast=downcast).to_numpy(), None
+
+    if np.dtype(dtype).kind == "i":
+        info = np.iinfo(dtype)
+        if series.isna().any() or series.min() < info.min or series.max() > info.max:
+            raise ValueError(f"Column '{name}' does not fit {dtype} (range {series.min()}–{series.max()})")
+    return series.to_numpy(dtype=dtype), None
+
+
+def build_snapshot(csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    previous = _read_manifest(snapshot_dir)
+    df = pd.read_csv(csv_path)
+    df = df.assign(**region_columns(df))
+
+    build = _new_build()
+    columns = {}
+    categories = {}
+    for name in df.columns:
+        values, column_categories = _column_to_array(name, df[name])
+        _save_column(snapshot_dir, name, build, values)
+        columns[name] = values.dtype.str
+        if column_categories is not None:
+            categories[name] = column_categories
+
+    stat = os.stat(csv_path)
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "source": {
+            "path": os.path.abspath(csv_path),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": _file_sha256(csv_path),
+        },
+        "build": build,
+        "rows": len(df),
+        "columns": columns,
+        "categories": categories,
+        "deltas": [],
+    }
+    _write_manifest(snapshot_dir, manifest)
+    remove_stale_builds(snapshot_dir, build)
+
+    # Yearly delta files ingested on top of the old CSV are re-applied so a rebuild does not drop them
+    for delta in (previous or {}).get("deltas", []):
+        if os.path.exists(delta["path"]):
+            manifest, _ = append_snapshot_rows(delta["path"], csv_path, snapshot_dir)
+    return manifest
+
+
+def append_snapshot_rows(delta_csv_path, csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    """
+    Append the rows of an SPC-format delta CSV (e.g. one new year) to the snapshot without
+    re-parsing the base CSV. Rows whose (yr, om) already exist are skipped, so re-ingesting a
+    file is a no-op. Returns (manifest, snapshot positions of the appended rows).
+    """
+    manifest = ensure_snapshot(csv_path, snapshot_dir)
+    delta_sha = _file_sha256(delta_csv_path)
+    if any(delta["sha256"] == delta_sha for delta in manifest["deltas"]):
+        return manifest, np.array([], dtype=np.int64)
+
+    delta = pd.read_csv(delta_csv_path)
+    delta = delta.assign(**region_columns(delta))
+    missing = [name for name in manifest["columns"] if name not in delta.columns]
+    if missing:
+        raise ValueError(f"Delta file {delta_csv_path} is missing snapshot columns: {missing}")
+
+    arrays = _open_columns(manifest, list(manifest["columns"]), snapshot_dir)
+    existing = set(zip(np.asarray(arrays["yr"]).tolist(), np.asarray(arrays["om"]).tolist()))
+    is_new = [(yr, om) not in existing for yr, om in zip(delta["yr"].tolist(), delta["om"].tolist())]
+    delta = delta[is_new].reset_index(drop=True)
+
+    old_rows = manifest["rows"]
+    if not delta.empty:
+        build = _new_build()
+        for name in manifest["columns"]:
+            values, delta_categories = _column_to_array(name, delta[name])
+            base = np.asarray(arrays[name])
+            if delta_categories is not None:
+                # Keep existing codes stable and append unseen categories at the end
+                categories = manifest["categories"][name]
+                categories += [c for c in delta_categories if c not in categories]
+                lookup = {category: code for code, category in enumerate(categories)}
+                values = np.array([lookup[delta_categories[code]] for code in values])
+                dtype = _codes_dtype(len(categories))
+                base, values = base.astype(dtype), values.astype(dtype)
+            else:
+                dtype = np.result_type(base.dtype, values.dtype)
+                base, values = base.astype(dtype, copy=False), values.astype(dtype, copy=False)
+            combined = np.concatenate([base, values])
+            _save_column(snapshot_dir, name, build, combined)
+            manifest["columns"][name] = combined.dtype.str
+        manifest["build"] = build
+        manifest["rows"] = old_rows + len(delta)
+
+    manifest["deltas"].append({
+        "path": os.path.abspath(delta_csv_path),
+        "sha256": delta_sha,
+        "rows": len(delta),
+    })
+    _write_manifest(snapshot_dir, manifest)
+    remove_stale_builds(snapshot_dir, manifest["build"])
+    return manifest, np.arange(old_rows, manifest["rows"])
+
+
+def ensure_snapshot(csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    """
+    Return the snapshot manifest, rebuilding the snapshot only if the CSV changed.
+    The cheap mtime/size check runs first; the hash is only computed when they differ.
+    """
+    manifest = _read_manifest(snapshot_dir)
+    if manifest is None or manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return build_snapshot(csv_path, snapshot_dir)
+
+    stat = os.stat(csv_path)
+    source = manifest["source"]
+    if stat.st_mtime == source["mtime"] and stat.st_size == source["size"]:
+        return manifest
+
+    if stat.st_size == source["size"] and _file_sha256(csv_path) == source["sha256"]:
+        # Touched or re-downloaded but identical; remember the new mtime and skip the rebuild
+        source["mtime"] = stat.st_mtime
+        _write_manifest(snapshot_dir, manifest)
+        return manifest
+
+    return build_snapshot(csv_path, snapshot_dir)
+
+
+def load_snapshot_columns(columns=None, csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    """
+    Memory-map the requested column files (all columns by default) as a dict of numpy arrays.
+    Categorical columns come back as their integer codes; see `snapshot_series` to decode them.
+    """
+    manifest = ensure_snapshot(csv_path, snapshot_dir)
+    names = list(manifest["columns"]) if columns is None else list(columns)
+    return manifest, _open_columns(manifest, names, snapshot_dir)
+
+
+def _open_columns(manifest, names, snapshot_dir):
+    missing = [name for name in names if name not in manifest["columns"]]
+    if missing:
+        raise KeyError(f"Columns not in tornado snapshot: {missing}")
+    return {
+        name: np.load(_column_path(snapshot_dir, name, manifest["build"]), mmap_mode="r", allow_pickle=False)
+        for name in names
+    }
+
+
+def snapshot_series(manifest, name, values):
+    if name in manifest["categories"]:
+        return pd.Categorical.from_codes(np.asarray(values), categories=manifest["categories"][name])
+    return np.asarray(values)
+
+
+def _filter_operand(manifest, name, value):
+    # Categorical filters compare against codes; values absent from the column map to -2 (matches nothing)
+    if name not in manifest["categories"]:
+        return value
+    lookup = {category: code for code, category in enumerate(manifest["categories"][name])}
+    if isinstance(value, (list, tuple, set)):
+        return [lookup.get(v, -2) for v in value]
+    return lookup.get(value, -2)
+
+
+FILTER_OPS = {
+    "==": lambda values, v: values == v,
+    "!=": lambda values, v: values != v,
+    "<": lambda values, v: values < v,
+    "<=": lambda values, v: values <= v,
+    ">": lambda values, v: values > v,
+    ">=": lambda values, v: values >= v,
+    "between": lambda values, v: (values >= v[0]) & (values <= v[1]),
+    "in": lambda values, v: np.isin(values, list(v)),
+    "not in": lambda values, v: ~np.isin(values, list(v)),
+}
+
+
+def snapshot_filter_mask(manifest, arrays, filters):
+    """
+    AND together (column, op, value) filters evaluated directly on the memory-mapped columns.
+    """
+    mask = np.ones(manifest["rows"], dtype=bool)
+    for name, op, value in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter op '{op}'. Use one of {list(FILTER_OPS)}")
+        mask &= FILTER_OPS[op](arrays[name], _filter_operand(manifest, name, value))
+    return mask
+
+
+def frame_filter_mask(df, filters):
+    """
+    Same (column, op, value) filters as the snapshot, evaluated on an in-memory DataFrame
+    (used when streaming CSV chunks that never reach the snapshot).
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for name, op, value in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter op '{op}'. Use one of {list(FILTER_OPS)}")
+        mask &= np.asarray(FILTER_OPS[op](df[name].to_numpy(), value))
+    return mask
+
+
+def load_snapshot_frame(columns=None, filters=None, csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    """
+    Materialize only the projected columns of the rows that pass `filters`.
+    Filter columns are read to build the row mask but are not returned unless projected.
+    The index holds each row's position in the full snapshot, so labels agree across projections.
+    """
+    filters = filters or []
+    manifest = ensure_snapshot(csv_path, snapshot_dir)
+    names = list(manifest["columns"]) if columns is None else list(columns)
+    filter_names = [name for name, _, _ in filters if name not in names]
+    arrays = _open_columns(manifest, names + list(dict.fromkeys(filter_names)), snapshot_dir)
+
+    if not filters:
+        return pd.DataFrame({name: snapshot_series(manifest, name, arrays[name]) for name in names})
+
+    positions = np.flatnonzero(snapshot_filter_mask(manifest, arrays, filters))
+    return pd.DataFrame(
+        {name: snapshot_series(manifest, name, arrays[name][positions]) for name in names},
+        index=positions,
+    )
+
+
+def measure_load_times(csv_path=TORNADO_CSV_URL, snapshot_dir=TORNADO_SNAPSHOT_DIR):
+    # Cold: parse the CSV and write the snapshot, then load it
+    t0 = time.perf_counter()
+    build_snapshot(csv_path, snapshot_dir)
+    load_snapshot_frame(csv_path=csv_path, snapshot_dir=snapshot_dir)
+    cold = time.perf_counter() - t0
+
+    # Warm: snapshot already on disk and fresh
+    t0 = time.perf_counter()
+    load_snapshot_frame(csv_path=csv_path, snapshot_dir=snapshot_dir)
+    warm = time.perf_counter() - t0
+    return cold, warm
+
+
+if __name__ == "__main__":
+    cold_s, warm_s = measure_load_times()
+    print(f"Cold start: {cold_s:.3f}s (target {COLD_START_TARGET_S:.2f}s) "
+          f"{'✅' if cold_s <= COLD_START_TARGET_S else '❌'}")
+    print(f"Warm start: {warm_s:.3f}s (target {WARM_START_TARGET_S:.2f}s) "
+          f"{'✅' if warm_s <= WARM_START_TARGET_S else '❌'}")
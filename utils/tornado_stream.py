@@ -0,0 +1,121 @@
+# Chunked streaming summary of SPC-style tornado archives too large to load in one piece
+#
+# Run from the repository root to see peak memory for a file:
+#   python -m utils.tornado_stream [path/to/archive.csv] [--chunksize 50000]
+import argparse
+import heapq
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import TORNADO_CSV_URL, TOP_N_COLUMNS, VALID_COORDS
+from utils.tornado_derived import PREFETCH_METRICS, PREFETCH_TOP_K, MAGNITUDES
+from utils.tornado_snapshot import frame_filter_mask
+
+STREAM_CHUNK_ROWS = 50_000
+STREAM_COLUMNS = TOP_N_COLUMNS + ["mo", "st"]
+
+# Magnitude columns of the count cube; -9 (unknown) gets its own slot
+CUBE_MAGNITUDES = [-9] + MAGNITUDES
+
+
+def _push_top_k(heap, k, values, row_numbers, records):
+    # Min-heap of (value, -row_number, record): the smallest kept value sits at heap[0]
+    for value, row_number, record in zip(values, row_numbers, records):
+        item = (value, -row_number, record)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+
+def stream_tornado_summary(csv_path=TORNADO_CSV_URL, chunksize=STREAM_CHUNK_ROWS, top_k=PREFETCH_TOP_K,
+                           metrics=PREFETCH_METRICS):
+    """
+    Read the CSV `chunksize` rows at a time, apply load_tornado_data's coordinate validation per chunk,
+    and keep only bounded state: a top-K heap per metric, a year × month × magnitude count cube and
+    per-state totals. Memory stays flat no matter how many rows the file has.
+    """
+    heaps = {metric: [] for metric in metrics}
+    cube = {}            # yr -> int64[12, len(CUBE_MAGNITUDES)]
+    state_totals = {}    # st -> [tornadoes, fatalities, injuries, path miles]
+    rows_read = rows_valid = 0
+    mag_slot = {mag: i for i, mag in enumerate(CUBE_MAGNITUDES)}
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, usecols=STREAM_COLUMNS):
+        row_numbers = np.arange(rows_read, rows_read + len(chunk))
+        rows_read += len(chunk)
+
+        keep = frame_filter_mask(chunk, VALID_COORDS)
+        chunk, row_numbers = chunk[keep], row_numbers[keep]
+        rows_valid += len(chunk)
+        if chunk.empty:
+            continue
+        chunk = chunk.assign(date=pd.to_datetime(chunk["date"], errors="coerce"))
+
+        # Top K per metric: only each chunk's own top K can reach the global top K
+        for metric in metrics:
+            best = np.argsort(-chunk[metric].to_numpy(), kind="stable")[:top_k]
+            part = chunk.iloc[best]
+            records = part[TOP_N_COLUMNS].itertuples(index=False, name=None)
+            _push_top_k(heaps[metric], top_k, part[metric].tolist(), row_numbers[best].tolist(), records)
+
+        # Year × month × magnitude counts
+        slots = chunk["mag"].map(mag_slot).fillna(0).astype(int).to_numpy()
+        for yr, yr_rows in chunk.groupby("yr").indices.items():
+            counts = cube.setdefault(int(yr), np.zeros((12, len(CUBE_MAGNITUDES)), dtype=np.int64))
+            np.add.at(counts, (chunk["mo"].to_numpy()[yr_rows] - 1, slots[yr_rows]), 1)
+
+        # Per-state totals
+        per_state = chunk.groupby("st", observed=True).agg(
+            tornadoes=("mag", "size"), fat=("fat", "sum"), inj=("inj", "sum"), len=("len", "sum")
+        )
+        for st, totals in per_state.iterrows():
+            running = state_totals.setdefault(st, [0, 0, 0, 0.0])
+            running[0] += int(totals["tornadoes"])
+            running[1] += int(totals["fat"])
+            running[2] += int(totals["inj"])
+            running[3] += float(totals["len"])
+
+    top = {
+        metric: pd.DataFrame(
+            [record for _, _, record in sorted(heap, reverse=True)], columns=TOP_N_COLUMNS
+        )
+        for metric, heap in heaps.items()
+    }
+    monthly_counts = pd.DataFrame(
+        [[yr, mo + 1, *counts[mo]] for yr, counts in sorted(cube.items()) for mo in range(12)],
+        columns=["yr", "mo"] + CUBE_MAGNITUDES,
+    )
+    states = pd.DataFrame.from_dict(
+        state_totals, orient="index", columns=["tornadoes", "fat", "inj", "len"]
+    ).sort_index()
+
+    return {
+        "rows_read": rows_read,
+        "rows_valid": rows_valid,
+        "top_k": top,
+        "monthly_counts": monthly_counts,
+        "state_totals": states,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a tornado CSV and report peak memory.")
+    parser.add_argument("csv", nargs="?", default=TORNADO_CSV_URL)
+    parser.add_argument("--chunksize", type=int, default=STREAM_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    summary = stream_tornado_summary(args.csv, chunksize=args.chunksize)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Rows read: {summary['rows_read']:,} (valid {summary['rows_valid']:,}) in {elapsed:.2f}s")
+    print(f"Peak traced memory: {peak / 1e6:.1f} MB with {args.chunksize:,}-row chunks")
+    for metric, top in summary["top_k"].items():
+        print(f"Top {metric}: {top[metric].iloc[0] if not top.empty else 'n/a'}")
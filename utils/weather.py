@@ -1,108 +1,240 @@
 # Weather API + cache logic
-import os
-import json
+import time
+
+import numpy as np
 import pandas as pd
-import requests
-from utils.constants import WEATHER_CACHE_FILE
-from utils.coordinates import get_intermediate_points
-from typing import Dict, Tuple
+from utils.coordinates import get_intermediate_points, canonical_coordinate, COORDINATE_DECIMALS
+from utils.weather_api import fetch_missing_weather
+from utils.weather_grid import WEATHER_GRID, grid_key, snap_values
+from utils.weather_matrix import matrix_behind, open_weather_matrix
+from utils.weather_metrics import WEATHER_METRICS, logger
+from utils.weather_nearest import NEAREST_MAX_KM, nearest_cached
+from utils.weather_store import WriteBehindWeatherCache, WEATHER_FIELDS, open_weather_cache, coordinate_key, key_coordinates
+from typing import Dict
 
 # Optional flag to disable live API fetches (safe for presentations)
 DISABLE_API_FETCH = True
+# Evenly spaced points between a tornado's start and end that also get weather
+PATH_STEPS = 4
 
-def load_cached_weather() -> Dict[str, Dict[str, Tuple]]:
-    if os.path.exists(WEATHER_CACHE_FILE):
-        with open(WEATHER_CACHE_FILE, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_cached_weather(cache: Dict[str, Dict[str, Tuple]]) -> None:
-    os.makedirs(os.path.dirname(WEATHER_CACHE_FILE), exist_ok=True)
-    with open(WEATHER_CACHE_FILE, "w") as f:
-        json.dump(cache, f, indent=4)
+def load_cached_weather() -> WriteBehindWeatherCache:
+    # Shared SQLite store (seeded once from cache/weather_cache.json) behind a write buffer.
+    # Renders that can fetch call cache.flush() when done, so new results land in one transaction.
+    return open_weather_cache()
 
-def fetch_weather(lat: float, lon: float, date, cache: Dict[str, Dict[str, Dict]]) -> Dict:
-    key = f"{lat:.2f},{lon:.2f}"
+def fetch_weather(lat: float, lon: float, date, cache: WriteBehindWeatherCache) -> Dict:
+    # Cell of the configured weather grid (utils.weather_grid), used for the lookup and the fetch
+    key = grid_key(lat, lon)
     date_str = pd.to_datetime(date).strftime("%Y-%m-%d")
 
-    if date_str in cache and key in cache[date_str]:
-        print(f"✅ Cache hit for {key} on {date_str}")
-        cached = cache[date_str][key]
-        if isinstance(cached, dict):
-            return cached
-    else:
-        print(f"❌ Cache miss for {key} on {date_str}")
+    started = time.perf_counter()
+    # A row written with fewer fields (see WeatherStore.missing_fields) is a miss for the rest
+    lacking = cache.missing_fields([(date_str, key)])
+    cached = cache.get(date_str, key)
+    WEATHER_METRICS.observe("lookup", time.perf_counter() - started)
+    if not lacking:
+        WEATHER_METRICS.count("hit")
+        logger.debug("Cache hit for %s on %s", key, date_str)
+        return {**cached, "distance_km": 0.0}
+    WEATHER_METRICS.count("miss")
+    logger.debug("Cache miss for %s on %s", key, date_str)
 
     if DISABLE_API_FETCH:
-        print(f"⚠️ API fetch blocked in safe mode: {date_str} @ {key}")
-        return {
-            "temperature": None,
-            "wind_speed": None,
-            "precipitation": None,
-            "dew_point": None,
-            "humidity": None,
-            "cloud_cover": None,
-            "pressure": None,
-            "cape": None,
-            "soil_moisture": None
-        }
-
-    # Open-Meteo request
-    url = (
-        f"https://archive-api.open-meteo.com/v1/archive?"
-        f"latitude={lat}&longitude={lon}&start_date={date_str}&end_date={date_str}"
-        f"&daily=temperature_2m_max,wind_speed_10m_max,precipitation_sum,"
-        f"dew_point_2m_mean,relative_humidity_2m_mean,cloud_cover_mean,"
-        f"pressure_msl_mean,cape_max,soil_moisture_0_to_100cm_mean&timezone=auto"
-    )
-
-    try:
-        r = requests.get(url)
-        r.raise_for_status()
-        daily = r.json().get("daily", {})
-
-        result = {
-            "temperature": daily.get("temperature_2m_max", [None])[0],
-            "wind_speed": daily.get("wind_speed_10m_max", [None])[0],
-            "precipitation": daily.get("precipitation_sum", [None])[0],
-            "dew_point": daily.get("dew_point_2m_mean", [None])[0],
-            "humidity": daily.get("relative_humidity_2m_mean", [None])[0],
-            "cloud_cover": daily.get("cloud_cover_mean", [None])[0],
-            "pressure": daily.get("pressure_msl_mean", [None])[0],
-            "cape": daily.get("cape_max", [None])[0],
-            "soil_moisture": daily.get("soil_moisture_0_to_100cm_mean", [None])[0]
-        }
-
-    except Exception as e:
-        print(f"⚠️ Weather API error: {e}")
-        result = {
-            "temperature": None,
-            "wind_speed": None,
-            "precipitation": None,
-            "dew_point": None,
-            "humidity": None,
-            "cloud_cover": None,
-            "pressure": None,
-            "cape": None,
-            "soil_moisture": None
-        }
-
-    cache.setdefault(date_str, {})[key] = result
-    save_cached_weather(cache)
-    return result
-
-def prepare_weather_data(row, cache, include_path=True):
-    if include_path:
-        points = [(row["slat"], row["slon"])] + get_intermediate_points(
-            row["slat"], row["slon"], row["elat"], row["elon"], steps=4
-        ) + [(row["elat"], row["elon"])]
+        WEATHER_METRICS.count("blocked")
+        logger.debug("API fetch blocked in safe mode: %s @ %s", date_str, key)
     else:
-        points = [(row["slat"], row["slon"]), (row["elat"], row["elon"])]
+        # Open-Meteo request (a batch of one) for the missing fields; failures are logged and not cached
+        fetch_missing_weather(list(lacking), cache)
+        cached = cache.get(date_str, key)
+    if cached is not None:
+        # Whatever fields the row has (all of them after a successful fetch)
+        return {**cached, "distance_km": 0.0}
+    return serve_nearest([(date_str, key)], cache).get((date_str, key), _empty_record())
 
-    # ✅ Round lat/lon to 2 decimal places before fetching
-    weather_data = [
-        fetch_weather(round(lat, 2), round(lon, 2), row["date"], cache)
-        for lat, lon in points
-    ]
+def _empty_record():
+    return {**dict.fromkeys(WEATHER_FIELDS), "distance_km": None}
+
+def serve_nearest(pairs, cache, max_km=NEAREST_MAX_KM):
+    """
+    {(date_str, key): record} for the missing pairs that have a cached point of the same day within
+    max_km; each record carries the "distance_km" it was served from.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs or max_km <= 0:
+        return {}
+    queries = pd.DataFrame([(date_str, *key_coordinates(key)) for date_str, key in pairs], columns=["date", "lat", "lon"])
+    served = nearest_cached(queries, cache.frame(queries["date"].unique()), WEATHER_FIELDS, max_km)
+    found = {
+        pair: {field: (None if pd.isna(value) else float(value)) for field, value in values.items()}
+        for pair, (_, values) in zip(pairs, served.iterrows()) if not pd.isna(values["distance_km"])
+    }
+    WEATHER_METRICS.count("nearest", len(found))
+    return found
+
+def tornado_weather_points(row, include_path=True):
+    start = (canonical_coordinate(row["slat"]), canonical_coordinate(row["slon"]))
+    end = (canonical_coordinate(row["elat"]), canonical_coordinate(row["elon"]))
+    if include_path:
+        return [start] + get_intermediate_points(*start, *end, steps=PATH_STEPS) + [end]
+    return [start, end]
+
+def weather_cache_keys(row, include_path=True):
+    """
+    (date_str, "lat,lon") cache keys that prepare_weather_data looks up for one tornado.
+    """
+    date_str = pd.to_datetime(row["date"]).strftime("%Y-%m-%d")
+    return [(date_str, grid_key(lat, lon)) for lat, lon in tornado_weather_points(row, include_path)]
+
+def nearest_weather(df, cache, include_path=True, pending=(), max_km=NEAREST_MAX_KM):
+    """
+    serve_nearest for every key of df's tornadoes the cache lacks (pending keys excepted), in one
+    store read and one KD-tree query. Maps call this once per render and hand the result to
+    prepare_weather_data(nearest=...), instead of one nearest search per tornado.
+    """
+    keys = weather_key_frame(df, "path")
+    if not include_path:
+        keys = keys[keys["point"].isin([0, PATH_STEPS + 1])]
+    pairs = [(date_str, coordinate_key(lat, lon))
+             for date_str, lat, lon in keys[["date", "lat", "lon"]].drop_duplicates().itertuples(index=False)]
+    found = cache.get_many(pairs)
+    return serve_nearest([pair for pair in pairs if pair not in found and pair not in pending], cache, max_km)
+
+def prepare_weather_data(row, cache, include_path=True, pending=(), nearest=None, failed=()):
+    """
+    Path points and one weather record per point. Keys in `pending` (being fetched by the background
+    warm-up) are not fetched again here; until they land their records carry "pending": True. Keys in
+    `failed` (whose warm-up fetch failed) are not fetched either. Misses are served from `nearest`
+    (see nearest_weather) when given, else searched for this tornado alone.
+    """
+    points = tornado_weather_points(row, include_path)
+    keys = weather_cache_keys(row, include_path)
+
+    started = time.perf_counter()
+    found = cache.get_many(keys)
+    WEATHER_METRICS.observe("lookup", time.perf_counter() - started)
+    missing = [pair for pair in keys if pair not in found]
+    WEATHER_METRICS.count("hit", len(keys) - len(missing))
+    WEATHER_METRICS.count("miss", len(missing))
+
+    found = {pair: {**record, "distance_km": 0.0} for pair, record in found.items()}
+    waiting = [pair for pair in missing if pair in pending]
+    WEATHER_METRICS.count("pending", len(waiting))
+    found.update({pair: {**_empty_record(), "pending": True} for pair in waiting})
+    if missing and DISABLE_API_FETCH:
+        WEATHER_METRICS.count("blocked", len(missing))
+    elif not DISABLE_API_FETCH:
+        # All of this tornado's uncached points (and fields missing from cached ones) in one request
+        if fetch_missing_weather([pair for pair in keys if pair not in pending and pair not in failed], cache)["requests"]:
+            found.update({pair: {**record, "distance_km": 0.0} for pair, record in cache.get_many(keys).items()
+                          if pair not in pending})
+    unserved = [pair for pair in missing if pair not in found]
+    if nearest is None:
+        found.update(serve_nearest(unserved, cache))
+    else:
+        found.update({pair: nearest[pair] for pair in unserved if pair in nearest})
 
+    weather_data = [found.get(pair) or _empty_record() for pair in keys]
     return points, weather_data
+
+def _canonical(values):
+    return np.round(np.asarray(values, dtype=np.float64), COORDINATE_DECIMALS)
+
+def weather_key_frame(df, points="start", grid=WEATHER_GRID):
+    """
+    One row per (tornado, point) with the (date, lat, lon) key fetch_weather would use
+    (the cell of `grid`, by default the configured weather grid).
+    `row` is the tornado's position in df; `point` is 0 for the start and, for points="path", 1..5 along the path.
+    """
+    dates = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d").to_numpy()
+    slat, slon = _canonical(df["slat"]), _canonical(df["slon"])
+    if points == "start":
+        lats, lons = slat[:, None], slon[:, None]
+    elif points == "path":
+        elat, elon = _canonical(df["elat"]), _canonical(df["elon"])
+        # np.linspace per row, as in get_intermediate_points, broadcast over every tornado at once
+        t = np.arange(PATH_STEPS)
+        mid_lats = slat[:, None] + ((elat - slat) / (PATH_STEPS - 1))[:, None] * t
+        mid_lons = slon[:, None] + ((elon - slon) / (PATH_STEPS - 1))[:, None] * t
+        mid_lats[:, -1], mid_lons[:, -1] = elat, elon
+        lats = np.column_stack([slat, np.round(mid_lats, 2), elat])
+        lons = np.column_stack([slon, np.round(mid_lons, 2), elon])
+    else:
+        raise ValueError(f"points must be 'start' or 'path', got {points!r}")
+    lats, lons = snap_values(lats.ravel(), grid).reshape(lats.shape), snap_values(lons.ravel(), grid).reshape(lons.shape)
+
+    n_rows, n_points = lats.shape
+    return pd.DataFrame({
+        "row": np.repeat(np.arange(n_rows), n_points),
+        "point": np.tile(np.arange(n_points), n_rows),
+        "date": np.repeat(dates, n_points),
+        "lat": lats.ravel(),
+        "lon": lons.ravel(),
+    })
+
+def enrich_with_weather(df, fields=WEATHER_FIELDS, points="start", cache=None, nearest_km=NEAREST_MAX_KM):
+    """
+    Copy of df with one float64 column per weather field, a boolean "weather_missing" mask
+    (True where none of `fields` has data) and "weather_distance_km" (0 for exact cache hits,
+    else how far away the data came from; the farthest point for points="path").
+    points="start" uses the start point's weather; points="path" averages the start, path and
+    end points that have data.
+
+    The keys are built column-wise and looked up in the memory-mapped weather matrix in one
+    vectorized pass. Misses are only fetched (batched by date) when live fetching is enabled; what is
+    still missing is served from the nearest cached point of the same day within `nearest_km` (0
+    turns this off).
+    """
+    fields = list(fields)
+    cache = cache if cache is not None else load_cached_weather()
+    started = time.perf_counter()
+    keys = weather_key_frame(df, points)
+
+    matrix = open_weather_matrix(cache)
+    values, found = matrix.lookup(keys["date"], keys["lat"], keys["lon"], fields)
+    hits = int(found.sum())
+    WEATHER_METRICS.count("hit", hits)
+    WEATHER_METRICS.observe("join", time.perf_counter() - started)
+    WEATHER_METRICS.count("miss", len(keys) - hits)
+    fetched = 0
+    if DISABLE_API_FETCH:
+        WEATHER_METRICS.count("blocked", len(keys) - hits)
+    else:
+        # Grouped by date, many locations per request; rows missing only some of `fields` fetch just those
+        pairs = [(date_str, coordinate_key(lat, lon))
+                 for date_str, lat, lon in keys[["date", "lat", "lon"]].drop_duplicates().itertuples(index=False)]
+        fetched = fetch_missing_weather(pairs, cache)["requests"]
+    # Keys written since the matrix build (or still queued) are read from the cache instead
+    behind = matrix_behind(matrix, cache)
+    if behind:
+        lagging = np.flatnonzero(np.isnan(values).any(axis=1) if fetched else ~found)
+        pairs = [(date_str, coordinate_key(lat, lon))
+                 for date_str, lat, lon in keys.iloc[lagging][["date", "lat", "lon"]].itertuples(index=False)]
+        records = cache.get_many(pairs)
+        for position, pair in zip(lagging, pairs):
+            if pair in records:
+                values[position] = [np.nan if records[pair].get(field) is None else records[pair][field]
+                                    for field in fields]
+    joined = keys.assign(**dict(zip(fields, values.astype(np.float64).T)))
+
+    # Points still without data take the nearest cached point of the same day, if one is close enough
+    joined["distance_km"] = np.where(joined[fields].notna().any(axis=1), 0.0, np.nan)
+    unserved = joined[fields].isna().all(axis=1).to_numpy()
+    if unserved.any() and nearest_km > 0:
+        queries = joined.loc[unserved, ["date", "lat", "lon"]]
+        source = cache if behind else matrix
+        served = nearest_cached(queries, source.frame(queries["date"].unique()), fields, nearest_km)
+        joined.loc[unserved, fields + ["distance_km"]] = served.to_numpy()
+        WEATHER_METRICS.count("nearest", int(served["distance_km"].notna().sum()))
+
+    if points == "path":
+        per_row = joined.groupby("row").agg({**{field: "mean" for field in fields}, "distance_km": "max"})
+    else:
+        per_row = joined.set_index("row")[fields + ["distance_km"]]
+    enriched = df.copy()
+    for field in fields:
+        enriched[field] = per_row[field].to_numpy(dtype=np.float64)
+    enriched["weather_missing"] = enriched[fields].isna().all(axis=1)
+    enriched["weather_distance_km"] = per_row["distance_km"].to_numpy(dtype=np.float64)
+
+    logger.debug("Weather join: %d/%d tornadoes with data", int((~enriched["weather_missing"]).sum()), len(enriched))
+    return enriched
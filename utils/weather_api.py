@@ -0,0 +1,381 @@
+# Batched Open-Meteo archive requests: many locations of one date per HTTP request
+#
+# The archive endpoint takes comma-separated latitude/longitude lists and answers with one result per
+# location, in order, over a start_date..end_date range. Pending cache misses are grouped by date, and
+# a location's nearby dates are coalesced into one range; batches hold at most MAX_LOCATIONS_PER_REQUEST
+# locations. `python -m utils.weather_api --plan KEYS.json` reports the requests a plan saves.
+#
+# Tested against a local stub of the archive: python -m pytest tests
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from typing import NamedTuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.weather_metrics import WEATHER_METRICS, logger
+from utils.weather_store import WEATHER_FIELDS
+
+# Override to point at a mirror or a local stub server
+OPEN_METEO_ARCHIVE_URL = os.environ.get("FURY_OPEN_METEO_URL", "https://archive-api.open-meteo.com/v1/archive")
+
+# Cache field -> Open-Meteo daily variable
+DAILY_VARIABLES = {
+    "temperature": "temperature_2m_max",
+    "wind_speed": "wind_speed_10m_max",
+    "precipitation": "precipitation_sum",
+    "dew_point": "dew_point_2m_mean",
+    "humidity": "relative_humidity_2m_mean",
+    "cloud_cover": "cloud_cover_mean",
+    "pressure": "pressure_msl_mean",
+    "cape": "cape_max",
+    "soil_moisture": "soil_moisture_0_to_100cm_mean",
+}
+
+# Locations per request; keeps URLs well under common 8 KB limits
+MAX_LOCATIONS_PER_REQUEST = 100
+
+# (connect, read) timeouts per request, so a hung socket cannot block a Streamlit rerun
+CONNECT_TIMEOUT_S = 5
+READ_TIMEOUT_S = 30
+# Retries inside the shared session for connection errors, 429 and 5xx; waits grow as
+# HTTP_BACKOFF_S * 2**retry plus up to HTTP_BACKOFF_JITTER_S of random jitter, or follow Retry-After
+HTTP_RETRIES = 3
+HTTP_BACKOFF_S = 0.5
+HTTP_BACKOFF_JITTER_S = 0.5
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+# Kept-alive connections to the archive host
+HTTP_POOL_SIZE = 10
+
+# Date-range coalescing: pending dates of one location are fetched as one start_date..end_date range
+# when at most COALESCE_GAP_DAYS unneeded days separate them, and a range spans at most MAX_RANGE_DAYS
+COALESCE_GAP_DAYS = 3
+MAX_RANGE_DAYS = 31
+
+# Reasons the archive gives (HTTP 400, {"error": true, "reason": ...}) when it has no data for the
+# coordinates or dates asked for. Only these mark keys unavailable; any other client error is not cached.
+UNAVAILABLE_REASONS = ("Latitude must be in range", "Longitude must be in range", "is out of allowed range")
+
+
+class WeatherFetchError(Exception):
+    """
+    The batch failed and its keys stay uncached. `resolved` holds (records, unavailable, requests) of
+    the locations settled before the failure, for the caller to store.
+    """
+
+    def __init__(self, message, resolved=None):
+        super().__init__(message)
+        self.resolved = resolved or ({}, [], 1)
+
+
+class TransientWeatherError(WeatherFetchError):
+    """
+    Timeout, connection error, 429, 5xx or a malformed answer: may succeed later.
+    """
+
+
+class WeatherRequestRejected(WeatherFetchError):
+    """
+    A client error that says nothing about the keys (bad parameter, 401/403, a proxy's error page).
+    """
+
+
+class WeatherDataUnavailable(Exception):
+    """
+    The archive has no data for the coordinates or dates; the keys are cached as empty records.
+    """
+
+
+def make_session(retries=HTTP_RETRIES, pool_size=HTTP_POOL_SIZE, backoff_s=HTTP_BACKOFF_S,
+                 backoff_jitter_s=HTTP_BACKOFF_JITTER_S):
+    """
+    requests.Session with a keep-alive connection pool and bounded, jittered retries on connection
+    errors and TRANSIENT_STATUS answers. Retries end with the last response returned, not raised.
+    """
+    retry = Retry(
+        total=retries, connect=retries, read=retries, status=retries,
+        status_forcelist=TRANSIENT_STATUS, allowed_methods=["GET"],
+        backoff_factor=backoff_s, backoff_jitter=backoff_jitter_s,
+        respect_retry_after_header=True, raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # One pooled session per process, shared by every Streamlit session and thread
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+        return _session
+
+
+class FetchBatch(NamedTuple):
+    # One archive request: `fields` of `keys` locations over start_date..end_date, needed for the `wanted` (date, key) pairs
+    start_date: str
+    end_date: str
+    keys: list
+    wanted: list
+    fields: tuple = tuple(WEATHER_FIELDS)
+
+
+def _date_clusters(dates, gap_days, max_days):
+    # Sorted ISO dates -> runs whose neighbours are at most gap_days unneeded days apart
+    clusters = []
+    for date in sorted(dates):
+        day = datetime.date.fromisoformat(date)
+        if clusters:
+            first, last = clusters[-1][0], clusters[-1][-1]
+            if (day - last).days - 1 <= gap_days and (day - first).days < max_days:
+                clusters[-1].append(day)
+                continue
+        clusters.append([day])
+    return [[day.isoformat() for day in cluster] for cluster in clusters]
+
+
+def _chunk(groups, max_locations, fields):
+    # {(start, end): {key: [dates]}} -> FetchBatch per at most max_locations keys, in range order
+    return [
+        FetchBatch(start_date, end_date, keys[i:i + max_locations],
+                   [(date, key) for key in keys[i:i + max_locations] for date in by_key[key]], fields)
+        for (start_date, end_date), by_key in sorted(groups.items())
+        for keys in [list(by_key)]
+        for i in range(0, len(keys), max_locations)
+    ]
+
+
+def plan_batches(keys, max_locations=MAX_LOCATIONS_PER_REQUEST, gap_days=COALESCE_GAP_DAYS, max_days=MAX_RANGE_DAYS):
+    """
+    [FetchBatch, ...] for (date_str, "lat,lon") keys or a missing_fields() map, per field set:
+    each location's nearby dates become one range, single days are batched across locations by date.
+    """
+    if not isinstance(keys, dict):
+        keys = dict.fromkeys(keys, WEATHER_FIELDS)
+    by_fields = {}
+    for pair, fields in keys.items():
+        by_fields.setdefault(tuple(fields), []).append(pair)
+    return [
+        batch
+        for fields, pairs in sorted(by_fields.items(), key=lambda item: -len(item[0]))
+        for batch in _plan_field_set(pairs, fields, max_locations, gap_days, max_days)
+    ]
+
+
+def _plan_field_set(keys, fields, max_locations, gap_days, max_days):
+    by_date = {}
+    for date_str, key in keys:
+        by_date.setdefault((date_str, date_str), {}).setdefault(key, []).append(date_str)
+    date_only = _chunk(by_date, max_locations, fields)
+    if gap_days is None:
+        return date_only
+
+    by_location = {}
+    for date_str, key in keys:
+        by_location.setdefault(key, []).append(date_str)
+    groups = {}
+    for key, dates in by_location.items():
+        for cluster in _date_clusters(dates, gap_days, max_days):
+            groups.setdefault((cluster[0], cluster[-1]), {})[key] = cluster
+    coalesced = _chunk(groups, max_locations, fields)
+    return coalesced if len(coalesced) < len(date_only) else date_only
+
+
+def _days(batch):
+    return (datetime.date.fromisoformat(batch.end_date) - datetime.date.fromisoformat(batch.start_date)).days + 1
+
+
+def plan_report(keys, max_locations=MAX_LOCATIONS_PER_REQUEST, gap_days=COALESCE_GAP_DAYS, max_days=MAX_RANGE_DAYS):
+    """
+    Requests, unneeded location-days and daily values a fetch of `keys` (pairs or a missing_fields()
+    map) would need, against one request per key and date-only batching.
+    """
+    if not isinstance(keys, dict):
+        keys = dict.fromkeys(keys, WEATHER_FIELDS)
+    batches = plan_batches(keys, max_locations, gap_days, max_days)
+    date_only = plan_batches(keys, max_locations, None)
+    downloaded = sum(len(batch.keys) * _days(batch) for batch in batches)
+    values = sum(len(batch.keys) * _days(batch) * len(batch.fields) for batch in batches)
+    return {
+        "keys": len(keys),
+        "partial_keys": sum(len(fields) < len(WEATHER_FIELDS) for fields in keys.values()),
+        "single_requests": len(keys),
+        "date_batched_requests": len(date_only),
+        "planned_requests": len(batches),
+        "saved_vs_single": len(keys) - len(batches),
+        "saved_vs_date_batched": len(date_only) - len(batches),
+        "unused_location_days": downloaded - len(keys),
+        "values_requested": values,
+        "values_full_refetch": downloaded * len(WEATHER_FIELDS),
+    }
+
+
+def _decode_daily(daily, start_date, fields):
+    # {"time": [...], variable: [...]} -> {date_str: record of `fields`}; single-day answers may omit "time"
+    dates = daily.get("time") or [start_date]
+    return {
+        date_str: {field: (daily.get(DAILY_VARIABLES[field]) or [None] * len(dates))[i] for field in fields}
+        for i, date_str in enumerate(dates)
+    }
+
+
+def _error_reason(response):
+    # The archive explains a 400 as {"error": true, "reason": "..."}; other servers may not answer in JSON
+    try:
+        payload = response.json()
+    except ValueError:
+        return ""
+    return str(payload.get("reason", "")) if isinstance(payload, dict) else ""
+
+
+def fetch_batch(batch, base_url=OPEN_METEO_ARCHIVE_URL, session=None):
+    """
+    One request for a FetchBatch: {(date_str, key): record} for every day of the range.
+    Raises a WeatherFetchError or WeatherDataUnavailable.
+    """
+    session = session or get_session()
+    latitudes, longitudes = zip(*(key.split(",") for key in batch.keys))
+    params = {
+        "latitude": ",".join(latitudes),
+        "longitude": ",".join(longitudes),
+        "start_date": batch.start_date,
+        "end_date": batch.end_date,
+        "daily": ",".join(DAILY_VARIABLES[field] for field in batch.fields),
+        "timezone": "auto",
+    }
+    try:
+        response = session.get(base_url, params=params, timeout=(CONNECT_TIMEOUT_S, READ_TIMEOUT_S))
+    except requests.RequestException as e:
+        raise TransientWeatherError(f"{type(e).__name__}: {e}") from e
+    if response.status_code in TRANSIENT_STATUS or response.status_code >= 500:
+        raise TransientWeatherError(f"HTTP {response.status_code}")
+    if response.status_code >= 400:
+        reason = _error_reason(response)
+        if response.status_code == 400 and any(text in reason for text in UNAVAILABLE_REASONS):
+            raise WeatherDataUnavailable(f"HTTP 400: {reason}")
+        raise WeatherRequestRejected(f"HTTP {response.status_code}: {reason or response.text[:200]}")
+
+    try:
+        payload = response.json()
+        # A single location comes back as one object, several as a list in request order
+        results = payload if isinstance(payload, list) else [payload]
+        if len(results) != len(batch.keys):
+            raise ValueError(f"expected {len(batch.keys)} locations, got {len(results)}")
+        return {
+            (date_str, key): record
+            for key, result in zip(batch.keys, results)
+            for date_str, record in _decode_daily(result.get("daily", {}), batch.start_date, batch.fields).items()
+        }
+    except (ValueError, AttributeError, TypeError, IndexError) as e:
+        raise TransientWeatherError(f"Malformed answer for {batch.start_date}..{batch.end_date}: {e}") from e
+
+
+def resolve_batch(batch, base_url=OPEN_METEO_ARCHIVE_URL, session=None, acquire=None):
+    """
+    fetch_batch, retrying a rejected batch one location at a time so one bad location spares the rest.
+    Returns (records, unavailable pairs, requests made); `acquire` runs before every request.
+    """
+    if acquire:
+        acquire()
+    try:
+        return fetch_batch(batch, base_url, session), [], 1
+    except WeatherDataUnavailable as e:
+        if len(batch.keys) == 1:
+            logger.warning("No archive data for %s on %s..%s: %s", batch.keys[0], batch.start_date, batch.end_date, e)
+            return {}, list(batch.wanted), 1
+    records, unavailable, made = {}, [], 1
+    for key in batch.keys:
+        single = FetchBatch(batch.start_date, batch.end_date, [key], [pair for pair in batch.wanted if pair[1] == key],
+                            batch.fields)
+        try:
+            found, missing, n = resolve_batch(single, base_url, session, acquire)
+        except WeatherFetchError as e:
+            # Hand the locations settled so far to the caller along with the error
+            found, missing, n = e.resolved
+            e.resolved = ({**records, **found}, unavailable + missing, made + n)
+            raise
+        records.update(found)
+        unavailable += missing
+        made += n
+    return records, unavailable, made
+
+
+def store_resolved(cache, records, unavailable, fields=WEATHER_FIELDS):
+    # Fetched days as they are (merged into existing rows), rejected keys as empty `fields` so they are not requested again
+    for (date_str, key), record in records.items():
+        cache.put(date_str, key, record)
+    for date_str, key in unavailable:
+        cache.put(date_str, key, dict.fromkeys(fields))
+    WEATHER_METRICS.count("unavailable", len(unavailable))
+
+
+def fetch_missing_weather(keys, cache, base_url=OPEN_METEO_ARCHIVE_URL, max_locations=MAX_LOCATIONS_PER_REQUEST,
+                          session=None, gap_days=COALESCE_GAP_DAYS):
+    """
+    Fetch the fields `cache` lacks for `keys` and queue the results in it (callers flush).
+    Returns {"requests", "fetched", "unavailable", "failed"}, counted in wanted keys.
+    """
+    stats = {"requests": 0, "fetched": 0, "unavailable": 0, "failed": 0}
+    for batch in plan_batches(cache.missing_fields(keys), max_locations, gap_days):
+        for outcome, n in fetch_planned_batch(batch, cache, base_url, session).items():
+            stats[outcome] += n
+    return stats
+
+
+def fetch_planned_batch(batch, cache, base_url=OPEN_METEO_ARCHIVE_URL, session=None):
+    """
+    Resolve one FetchBatch and queue what came back in `cache` (not flushed); failures are logged and
+    counted, not raised. Returns the same counters as fetch_missing_weather for this batch.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        records, unavailable, made = resolve_batch(batch, base_url, session)
+    except WeatherFetchError as e:
+        error = e
+        records, unavailable, made = e.resolved
+    finally:
+        WEATHER_METRICS.observe("fetch", time.perf_counter() - started)
+    store_resolved(cache, records, unavailable, batch.fields)
+    failed = [pair for pair in batch.wanted if pair not in records and pair not in unavailable]
+    if error is not None:
+        WEATHER_METRICS.count("error", len(failed))
+        logger.warning("Weather API error for %s..%s (%d locations), %d keys not cached: %s",
+                       batch.start_date, batch.end_date, len(batch.keys), len(failed), error)
+    return {"requests": made, "fetched": sum(pair in records for pair in batch.wanted),
+            "unavailable": len(unavailable), "failed": len(failed)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched Open-Meteo archive fetcher.")
+    parser.add_argument("--plan", nargs="?", const="", metavar="KEYS_JSON",
+                        help="Report the requests planned for a keys file from ingest_tornado_delta --keys-out "
+                             "(default: the uncached keys of the Top 457 set)")
+    parser.add_argument("--gap-days", type=int, default=COALESCE_GAP_DAYS)
+    args = parser.parse_args()
+    if args.plan is None:
+        parser.print_help()
+        raise SystemExit(0)
+
+    if args.plan:
+        with open(args.plan, "r") as f:
+            pending = [(item["date"], item["key"]) for item in json.load(f)]
+    else:
+        from utils.top_n_index import candidate_rows
+        from utils.weather import load_cached_weather, weather_cache_keys
+        wanted = [pair for _, row in candidate_rows().iterrows() for pair in weather_cache_keys(row, include_path=True)]
+        pending = load_cached_weather().missing_fields(wanted)
+    for name, value in plan_report(pending, gap_days=args.gap_days).items():
+        print(f"{name:>24}: {value}")
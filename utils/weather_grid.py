@@ -0,0 +1,127 @@
+# Snap weather cache keys to the grid of the reanalysis behind the Open-Meteo archive
+#
+# Keying the cache per reanalysis cell instead of per 0.01° point removes near-duplicate entries and
+# fetches. It is opt-in: the archive downscales by elevation, so exact points in one cell do differ.
+# FURY_WEATHER_GRID picks the mode:
+#   exact      0.01° keys (default)
+#   era5_land  0.1° cells (ERA5-Land, the finest grid the archive serves)
+#   era5       0.25° cells (ERA5)
+# Switching to a grid needs the store collapsed onto it first, with the collapse command below; opening
+# the store never rewrites it.
+#
+# Run from the repository root:
+#   python -m utils.weather_grid report                   # key reduction and hit rate on the Top 457 set
+#   python -m utils.weather_grid collapse [--grid era5] [--prune] [--json-out cache/weather_cache.json]
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.coordinates import COORDINATE_DECIMALS
+
+# Cell size in degrees per mode; cells are centred on multiples of the step
+WEATHER_GRIDS = {"exact": 0.01, "era5_land": 0.1, "era5": 0.25}
+WEATHER_GRID = os.environ.get("FURY_WEATHER_GRID", "exact")
+if WEATHER_GRID not in WEATHER_GRIDS:
+    raise ValueError(f"FURY_WEATHER_GRID must be one of {list(WEATHER_GRIDS)}, got {WEATHER_GRID!r}")
+
+
+def snap_values(values, grid=WEATHER_GRID):
+    """
+    Key coordinates (floats with 2 decimals) for an array of latitudes or longitudes: the canonical
+    4-decimal value, moved to its cell centre unless grid="exact", then formatted like the "%.2f" key.
+    """
+    values = np.round(np.asarray(values, dtype=np.float64), COORDINATE_DECIMALS)
+    if grid != "exact":
+        step = WEATHER_GRIDS[grid]
+        values = np.round(values / step) * step
+    return np.char.mod("%.2f", values).astype(np.float64)
+
+
+def grid_key(lat, lon, grid=WEATHER_GRID):
+    # "lat,lon" cache key of the cell containing one point
+    snapped_lat, snapped_lon = snap_values([lat, lon], grid)
+    return f"{snapped_lat:.2f},{snapped_lon:.2f}"
+
+
+def collapse_rows(frame, grid=WEATHER_GRID):
+    """
+    One row per (date, cell) of a store frame: the record of the point nearest the cell centre,
+    re-keyed to the centre. Cells that already have a row at their centre keep it.
+    """
+    snapped = frame.assign(cell_lat=snap_values(frame["lat"], grid), cell_lon=snap_values(frame["lon"], grid))
+    snapped["distance"] = np.hypot(snapped["lat"] - snapped["cell_lat"], snapped["lon"] - snapped["cell_lon"])
+    nearest = snapped.sort_values(["distance", "lat", "lon"], kind="stable").drop_duplicates(["date", "cell_lat", "cell_lon"])
+    nearest = nearest.drop(columns=["lat", "lon", "distance"]).rename(columns={"cell_lat": "lat", "cell_lon": "lon"})
+    return nearest.sort_values(["date", "lat", "lon"]).reset_index(drop=True)
+
+
+def collapse_store(store, grid=WEATHER_GRID, prune=False):
+    """
+    Add the collapsed row of every (date, cell) the store has data for; prune=True then deletes the
+    rows off the grid (irreversible). Returns {"rows_before", "cells", "added", "pruned"}.
+    """
+    from utils.weather_store import WEATHER_FIELDS, coordinate_key
+
+    frame = store.frame(store.dates())
+    collapsed = collapse_rows(frame, grid)
+    existing = set(zip(frame["date"], frame["lat"], frame["lon"]))
+    added = collapsed[[(d, lat, lon) not in existing for d, lat, lon in zip(collapsed["date"], collapsed["lat"], collapsed["lon"])]]
+    store.upsert_many(
+        (date_str, coordinate_key(lat, lon), dict(zip(WEATHER_FIELDS, values)))
+        for date_str, lat, lon, *values in added[["date", "lat", "lon"] + WEATHER_FIELDS].itertuples(index=False)
+    )
+    pruned = store.delete_except(set(zip(collapsed["date"], collapsed["lat"], collapsed["lon"]))) if prune else 0
+    store.set_meta(f"grid_{grid}", "pruned" if prune else "collapsed")
+    return {"rows_before": len(frame), "cells": len(collapsed), "added": len(added), "pruned": pruned}
+
+
+def grid_report(tornadoes, store, grids=tuple(WEATHER_GRIDS)):
+    """
+    Per grid mode, for the start/path/end points of `tornadoes`: lookups, distinct keys, key reduction
+    against "exact", and the hit rate the store gives once collapsed onto that grid.
+    """
+    from utils.weather import weather_key_frame
+
+    stored = None
+    rows = []
+    for grid in grids:
+        keys = weather_key_frame(tornadoes, "path", grid)[["date", "lat", "lon"]]
+        stored = stored if stored is not None else store.frame(keys["date"].unique())
+        cells = collapse_rows(stored, grid)[["date", "lat", "lon"]].assign(cached=True)
+        hits = keys.merge(cells, on=["date", "lat", "lon"], how="left")["cached"].fillna(False).astype(bool)
+        rows.append({"grid": grid, "lookups": len(keys), "keys": len(keys.drop_duplicates()), "hit_rate": hits.mean()})
+    report = pd.DataFrame(rows).set_index("grid")
+    report["key_reduction"] = 1 - report["keys"] / report.loc["exact", "keys"] if "exact" in report.index else np.nan
+    report["hit_rate_gain"] = report["hit_rate"] - report.loc["exact", "hit_rate"] if "exact" in report.index else np.nan
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snap the weather cache onto the archive's grid.")
+    parser.add_argument("command", choices=["report", "collapse"])
+    parser.add_argument("--grid", choices=list(WEATHER_GRIDS), default=WEATHER_GRID)
+    parser.add_argument("--prune", action="store_true", help="Delete off-grid rows after collapsing")
+    parser.add_argument("--json-out", help="Export the store to this JSON file afterwards")
+    args = parser.parse_args()
+
+    from utils.weather_store import open_weather_store, export_json_cache
+    store = open_weather_store()
+    if args.command == "report":
+        from utils.top_n_index import candidate_rows
+        tornadoes = candidate_rows()
+        report = grid_report(tornadoes, store)
+        print(f"Top {len(tornadoes)} set, start + path + end points ({len(store)} rows cached):")
+        print(report.to_string(formatters={
+            "hit_rate": "{:.1%}".format, "key_reduction": "{:.1%}".format, "hit_rate_gain": "{:+.1%}".format,
+        }))
+    else:
+        stats = collapse_store(store, args.grid, args.prune)
+        print(f"✅ {stats['rows_before']} rows -> {stats['cells']} {args.grid} cells "
+              f"({stats['added']} added, {stats['pruned']} pruned)")
+        from utils.weather_matrix import ensure_weather_matrix
+        ensure_weather_matrix(store, refresh=True)
+        if args.json_out:
+            export_json_cache(store, args.json_out)
+            print(f"✅ Exported {len(store)} records to {args.json_out}")
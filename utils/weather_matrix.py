@@ -0,0 +1,257 @@
+# Columnar, memory-mapped copy of the weather store for the analysis pages
+#
+# The science pages join thousands of (date, lat, lon) keys against the cache on every render. The store
+# is compiled into sorted key arrays (day ordinal, lat and lon in hundredths of a degree) and one float32
+# feature matrix (NaN where a value is missing), saved as .npy files next to the SQLite file. Every
+# Streamlit process memory-maps the same files, so the OS page cache holds one copy, and a lookup is a
+# single vectorized searchsorted on a combined int64 key. A build may trail the store's revision (bumped
+# by every write, in any process); reads rebuild it only once it is MATRIX_REBUILD_WRITES writes or
+# MATRIX_REBUILD_AGE_S seconds behind, and readers overlay the newer keys from the store meanwhile.
+#
+# Run from the repository root:
+#   python -m utils.weather_matrix            # rebuild if behind, then report size and lookup speed
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from utils.atomic_write import atomic_write, remove_stale_builds
+from utils.weather_metrics import WEATHER_METRICS, logger
+from utils.weather_store import WEATHER_FIELDS, open_weather_store
+
+MATRIX_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+ARRAYS = ["key", "day", "lat", "lon", "features"]
+# A build trailing the store is rebuilt on read once it misses this many store writes, or is this old
+MATRIX_REBUILD_WRITES = 20
+MATRIX_REBUILD_AGE_S = 300
+
+# Combined key: day, then lat, then lon, each shifted to be non-negative (lat/lon in hundredths)
+_DAY_OFFSET = 100_000
+_LAT_SPAN, _LON_SPAN = 18_001, 36_001
+
+
+def matrix_dir(store_path):
+    # ./cache/weather_cache.sqlite -> ./cache/weather_cache_matrix/
+    return os.path.splitext(store_path)[0] + "_matrix"
+
+
+def day_ordinals(dates):
+    # "YYYY-MM-DD" strings -> days since 1970-01-01
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def hundredths(values):
+    # 2-decimal key coordinates -> exact integers
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def combined_key(days, lat_h, lon_h):
+    return ((days + _DAY_OFFSET) * _LAT_SPAN + lat_h + 9000) * _LON_SPAN + lon_h + 18000
+
+
+class WeatherMatrix:
+    """
+    Read-only view of one build: `key` (sorted int64), `day` (int32), `lat`/`lon` (int16 hundredths)
+    and `features` (float32, one column per entry of `fields`), all memory-mapped.
+    """
+
+    def __init__(self, manifest, arrays):
+        self.revision = manifest["revision"]
+        self.built_at = manifest["built_at"]
+        self.fields = manifest["fields"]
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self):
+        return len(self.key)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    def lookup(self, dates, lats, lons, fields=WEATHER_FIELDS):
+        """
+        Values of `fields` for each (date, lat, lon): a float32 array (n, len(fields)), NaN where the
+        key is not cached or the value is missing, and a boolean array marking the cached keys.
+        """
+        wanted = combined_key(day_ordinals(dates), hundredths(lats), hundredths(lons))
+        values = np.full((len(wanted), len(fields)), np.nan, dtype=np.float32)
+        if not len(self.key):
+            return values, np.zeros(len(wanted), dtype=bool)
+        position = np.minimum(np.searchsorted(self.key, wanted), len(self.key) - 1)
+        found = self.key[position] == wanted
+        columns = [self.fields.index(field) for field in fields]
+        values[found] = self.features[position[found]][:, columns]
+        return values, found
+
+    def frame(self, dates):
+        """
+        Same layout as WeatherStore.frame(dates): one row per cached (date, lat, lon) on those dates.
+        """
+        rows = np.flatnonzero(np.isin(self.day, day_ordinals(sorted(set(dates)))))
+        frame = pd.DataFrame({
+            "date": np.datetime_as_string(self.day[rows].astype("datetime64[D]")),
+            "lat": self.lat[rows] / 100,
+            "lon": self.lon[rows] / 100,
+        })
+        features = self.features[rows].astype(np.float64)
+        for index, field in enumerate(self.fields):
+            frame[field] = features[:, index]
+        return frame
+
+
+def _read_manifest(directory):
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_manifest(directory, manifest):
+    with atomic_write(os.path.join(directory, MANIFEST_FILE)) as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _array_path(directory, name, build):
+    return os.path.join(directory, f"{name}-{build}.npy")
+
+
+def _save_array(directory, name, build, values):
+    # Write then rename so readers never memory-map a half-written file
+    with atomic_write(_array_path(directory, name, build), "wb") as f:
+        np.save(f, values, allow_pickle=False)
+
+
+def build_weather_matrix(store, directory=None):
+    """
+    Compile the whole store into a new build and point the manifest at it. Returns the manifest.
+    """
+    started = time.perf_counter()
+    directory = directory or matrix_dir(store.path)
+    os.makedirs(directory, exist_ok=True)
+    # Read the revision first: a write landing during the build leaves the manifest stale, not wrong
+    revision = store.revision()
+    stored = store.frame(store.dates())
+
+    key = combined_key(day_ordinals(stored["date"]), hundredths(stored["lat"]), hundredths(stored["lon"]))
+    order = np.argsort(key, kind="stable")
+    build = uuid.uuid4().hex[:8]
+    arrays = {
+        "key": key[order],
+        "day": day_ordinals(stored["date"])[order].astype(np.int32),
+        "lat": hundredths(stored["lat"])[order].astype(np.int16),
+        "lon": hundredths(stored["lon"])[order].astype(np.int16),
+        "features": stored[WEATHER_FIELDS].to_numpy(dtype=np.float32)[order],
+    }
+    for name, values in arrays.items():
+        _save_array(directory, name, build, values)
+
+    manifest = {
+        "format_version": MATRIX_FORMAT_VERSION,
+        "revision": revision,
+        "build": build,
+        "rows": len(stored),
+        "fields": WEATHER_FIELDS,
+        "bytes": int(sum(values.nbytes for values in arrays.values())),
+        "built_at": time.time(),
+    }
+    _write_manifest(directory, manifest)
+    remove_stale_builds(directory, build)
+    WEATHER_METRICS.observe("matrix_build", time.perf_counter() - started)
+    logger.info("Weather matrix rebuilt: %d rows, %.1f KB (revision %s)", len(stored), manifest["bytes"] / 1024, revision)
+    return manifest
+
+
+def rebuild_due(built_revision, built_at, revision):
+    """
+    Whether a build of `built_revision` made at `built_at` is too far behind the store's `revision`.
+    """
+    built_id, built_writes = built_revision.rsplit(":", 1)
+    store_id, writes = revision.rsplit(":", 1)
+    if built_id != store_id:
+        return True
+    behind = int(writes) - int(built_writes)
+    return behind >= MATRIX_REBUILD_WRITES or (behind > 0 and time.time() - built_at >= MATRIX_REBUILD_AGE_S)
+
+
+def ensure_weather_matrix(store, directory=None, refresh=False):
+    """
+    The manifest of a usable build, rebuilding one that is incompatible, too far behind the store, or
+    (with `refresh`) behind at all.
+    """
+    directory = directory or matrix_dir(store.path)
+    manifest = _read_manifest(directory)
+    revision = store.revision()
+    if (manifest is None or manifest.get("format_version") != MATRIX_FORMAT_VERSION
+            or manifest["fields"] != WEATHER_FIELDS
+            or (manifest["revision"] != revision
+                and (refresh or rebuild_due(manifest["revision"], manifest["built_at"], revision)))):
+        return build_weather_matrix(store, directory)
+    return manifest
+
+
+def load_weather_matrix(store, directory=None, refresh=False):
+    directory = directory or matrix_dir(store.path)
+    manifest = ensure_weather_matrix(store, directory, refresh)
+    return WeatherMatrix(manifest, {
+        name: np.load(_array_path(directory, name, manifest["build"]), mmap_mode="r", allow_pickle=False)
+        for name in ARRAYS
+    })
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+def open_weather_matrix(cache=None, refresh=False):
+    """
+    Matrix for a WeatherStore or write-behind cache (the shared one by default). It may trail the store
+    (see rebuild_due) and never sees queued writes; `refresh` rebuilds it if it is behind at all.
+    """
+    cache = cache if cache is not None else open_weather_store()
+    store = getattr(cache, "store", cache)
+    revision = store.revision()
+    with _matrices_lock:
+        matrix = _matrices.get(store.path)
+        if matrix is None or (matrix.revision != revision
+                              and (refresh or rebuild_due(matrix.revision, matrix.built_at, revision))):
+            matrix = _matrices[store.path] = load_weather_matrix(store, refresh=refresh)
+        return matrix
+
+
+def matrix_behind(matrix, cache):
+    # Whether `cache` can read keys the matrix lacks: queued writes, or store writes since the build
+    store = getattr(cache, "store", cache)
+    return bool(getattr(cache, "pending", 0)) or matrix.revision != store.revision()
+
+
+if __name__ == "__main__":
+    store = open_weather_store()
+    started = time.perf_counter()
+    matrix = open_weather_matrix(store, refresh=True)
+    print(f"✅ Matrix ready in {time.perf_counter() - started:.3f}s: {len(matrix)} rows, "
+          f"{matrix.nbytes / 1024:.1f} KB ({matrix.nbytes / max(len(matrix), 1):.0f} bytes/entry), "
+          f"revision {matrix.revision}")
+
+    # Lookup speed on the science pages' key set, against the SQLite slice + merge it replaces
+    from utils.top_n_index import candidate_rows
+    from utils.weather import weather_key_frame
+    keys = weather_key_frame(candidate_rows(), "path")
+    started = time.perf_counter()
+    joined = keys.merge(store.frame(keys["date"].unique()), on=["date", "lat", "lon"], how="left", indicator=True)
+    merge_s = time.perf_counter() - started
+    started = time.perf_counter()
+    values, found = matrix.lookup(keys["date"], keys["lat"], keys["lon"])
+    lookup_s = time.perf_counter() - started
+
+    assert found.sum() == (joined["_merge"] == "both").sum(), "matrix and store disagree on cached keys"
+    expected = joined.loc[found, WEATHER_FIELDS].to_numpy(dtype=np.float32)
+    assert np.array_equal(values[found], expected, equal_nan=True), "matrix and store disagree on values"
+    print(f"✅ {len(keys)} keys, {int(found.sum())} cached: store slice + merge {merge_s * 1e3:.1f} ms, "
+          f"matrix lookup {lookup_s * 1e3:.1f} ms")
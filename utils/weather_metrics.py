@@ -0,0 +1,122 @@
+# In-process counters and latency histograms for weather cache lookups (replaces per-lookup prints)
+#
+# Log verbosity: FURY_WEATHER_LOG_LEVEL=DEBUG logs every lookup, INFO (default WARNING) logs one summary
+# per render. FURY_WEATHER_DEBUG=1 shows the metrics panel in the Top N page's sidebar.
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+WEATHER_LOG_LEVEL = os.environ.get("FURY_WEATHER_LOG_LEVEL", "WARNING").upper()
+WEATHER_DEBUG_PANEL = os.environ.get("FURY_WEATHER_DEBUG", "") not in ("", "0", "false", "False")
+
+logger = logging.getLogger("fury.weather")
+logger.setLevel(WEATHER_LOG_LEVEL)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(_handler)
+
+# Outcomes of one (date, lat, lon) lookup; "unavailable" is a miss the archive has no data for (cached
+# as empty), "error" a transient fetch failure (not cached), "nearest" a miss served from a nearby cached point,
+# "pending" a miss shown as a placeholder while the background warm-up fetches it
+OUTCOMES = ["hit", "miss", "blocked", "unavailable", "error", "nearest", "pending"]
+
+# Upper bucket edges in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = [0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000]
+
+RECENT_RENDERS = 20
+
+
+class WeatherMetrics:
+    """
+    Thread-safe lookup counters, per-operation latency histograms and a short history of per-render
+    summaries. snapshot() returns plain dicts so callers can query or serialize them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = dict.fromkeys(OUTCOMES, 0)
+            self._histograms = {}
+            self._renders = deque(maxlen=RECENT_RENDERS)
+
+    def count(self, outcome, n=1):
+        with self._lock:
+            self._counters[outcome] = self._counters.get(outcome, 0) + n
+
+    def observe(self, operation, seconds):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1e3)
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                operation, {"buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1), "count": 0, "total_s": 0.0}
+            )
+            histogram["buckets"][bucket] += 1
+            histogram["count"] += 1
+            histogram["total_s"] += seconds
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def histogram(self, operation):
+        """
+        [(bucket label, count), ...] for one operation, e.g. "lookup", "fetch" or "join".
+        """
+        with self._lock:
+            buckets = list(self._histograms.get(operation, {}).get("buckets", [0] * (len(LATENCY_BUCKETS_MS) + 1)))
+        labels = [f"≤{edge:g} ms" for edge in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]:g} ms"]
+        return list(zip(labels, buckets))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "latency": {
+                    operation: {
+                        "count": h["count"],
+                        "mean_ms": h["total_s"] * 1e3 / h["count"] if h["count"] else 0.0,
+                        "buckets": list(h["buckets"]),
+                    }
+                    for operation, h in self._histograms.items()
+                },
+                "renders": list(self._renders),
+            }
+
+    @contextmanager
+    def render(self, name):
+        """
+        Record one summary (counter deltas and wall time) for everything looked up inside the block.
+        """
+        before = self.counters()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            after = self.counters()
+            summary = {
+                "render": name,
+                "at": time.strftime("%H:%M:%S"),
+                "seconds": round(time.perf_counter() - start, 3),
+                **{outcome: after.get(outcome, 0) - before.get(outcome, 0) for outcome in after},
+            }
+            with self._lock:
+                self._renders.append(summary)
+            logger.info(
+                "%s: %s in %.3fs", name,
+                ", ".join(f"{summary[o]} {o}" for o in OUTCOMES), summary["seconds"],
+            )
+
+    def recent_renders(self):
+        with self._lock:
+            return list(self._renders)
+
+
+# One instance per Streamlit process, shared by every session
+WEATHER_METRICS = WeatherMetrics()
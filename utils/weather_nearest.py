@@ -0,0 +1,67 @@
+# Serve weather cache misses from the nearest cached point of the same day
+#
+# With live fetching off, a tornado outside the prefetched set used to get no weather at all. Misses are
+# now answered by the nearest cached (date, lat, lon) within FURY_WEATHER_NEAREST_KM kilometres
+# (haversine distance), and the distance is returned with the values. 0 turns the fallback off.
+#
+# One KD-tree covers every requested date: points become 3D unit vectors plus a date axis spaced far
+# wider than any search radius, so a single vectorized query never matches across days.
+import os
+
+import numpy as np
+import pandas as pd
+from haversine import Unit, haversine_vector
+
+NEAREST_MAX_KM = float(os.environ.get("FURY_WEATHER_NEAREST_KM", "50"))
+EARTH_RADIUS_KM = 6371.0088
+
+# Chord lengths on the unit sphere are at most 2, so dates 10 apart never fall within one search radius
+_DATE_AXIS_SPACING = 10.0
+
+
+def _tree_points(day_codes, lats, lons):
+    lat, lon = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack([
+        np.cos(lat) * np.cos(lon),
+        np.cos(lat) * np.sin(lon),
+        np.sin(lat),
+        day_codes * _DATE_AXIS_SPACING,
+    ])
+
+
+def nearest_cached(queries, stored, fields, max_km=NEAREST_MAX_KM):
+    """
+    For every (date, lat, lon) row of `queries`, the `fields` of the nearest `stored` row with the same
+    date and data in at least one field, within `max_km`. Returns a frame aligned with `queries`
+    (positional index) holding `fields` and "distance_km"; NaN where nothing is in range.
+    """
+    from scipy.spatial import cKDTree
+
+    result = pd.DataFrame(np.nan, index=range(len(queries)), columns=list(fields) + ["distance_km"])
+    stored = stored[stored[list(fields)].notna().any(axis=1)]
+    if queries.empty or stored.empty or max_km <= 0:
+        return result
+
+    dates = pd.Index(sorted(set(stored["date"])))
+    query_codes = dates.get_indexer(queries["date"])
+    on_cached_day = query_codes >= 0
+    if not on_cached_day.any():
+        return result
+
+    tree = cKDTree(_tree_points(dates.get_indexer(stored["date"]), stored["lat"], stored["lon"]))
+    wanted = queries[on_cached_day]
+    chord = 2 * np.sin(max_km / (2 * EARTH_RADIUS_KM))
+    _, nearest = tree.query(_tree_points(query_codes[on_cached_day], wanted["lat"], wanted["lon"]),
+                            distance_upper_bound=chord * (1 + 1e-9))
+
+    found = nearest < len(stored)
+    if not found.any():
+        return result
+    positions = np.flatnonzero(on_cached_day)[found]
+    matched = stored.iloc[nearest[found]]
+    distance = haversine_vector(
+        wanted[["lat", "lon"]].to_numpy()[found], matched[["lat", "lon"]].to_numpy(), Unit.KILOMETERS
+    )
+    result.iloc[positions, :len(fields)] = matched[list(fields)].to_numpy(dtype=np.float64)
+    result.iloc[positions, len(fields)] = distance
+    return result
@@ -0,0 +1,270 @@
+# Concurrent, rate-limited and resumable weather prefetch for any selection of tornadoes
+#
+# Run from the repository root:
+#   python -m utils.weather_prefetch                              # the prefetched Top 457 set
+#   python -m utils.weather_prefetch --years 2011 2011 --min-mag 3 --all
+#   python -m utils.weather_prefetch --states OK KS --top-k 50 --metrics fat inj
+#
+# The SQLite store is the source of truth for what is done: every run plans only the keys it is still
+# missing, so an interrupted run resumes where it stopped. Results are flushed and the checkpoint file
+# (cache/weather_prefetch_checkpoint.json) rewritten every CHECKPOINT_EVERY_BATCHES batches.
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from utils.atomic_write import atomic_write
+from utils.constants import WEATHER_PREFETCH_CHECKPOINT_FILE
+from utils.data_loader import get_tornado_view, load_tornado_columns
+from utils.top_n_index import candidate_rows
+from utils.tornado_derived import PREFETCH_METRICS, PREFETCH_TOP_K
+from utils.weather import weather_cache_keys
+from utils.weather_api import (
+    OPEN_METEO_ARCHIVE_URL, MAX_LOCATIONS_PER_REQUEST, COALESCE_GAP_DAYS, TransientWeatherError, WeatherFetchError,
+    make_session, plan_batches, plan_report, resolve_batch, store_resolved,
+)
+from utils.weather_matrix import ensure_weather_matrix
+from utils.weather_metrics import WEATHER_METRICS, logger
+from utils.weather_store import open_weather_cache
+
+# Concurrent requests in flight
+PREFETCH_WORKERS = 4
+# Token bucket: sustained requests per second, and how many may go out back to back
+PREFETCH_REQUESTS_PER_S = 5.0
+PREFETCH_BURST = 5
+# Retries per batch after the first transient failure; waits a random 50-100% of BACKOFF_BASE_S * 2**attempt,
+# capped at BACKOFF_MAX_S. The pipeline's session does not retry on its own, so every attempt takes a token.
+PREFETCH_MAX_RETRIES = 4
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 60.0
+CHECKPOINT_EVERY_BATCHES = 20
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: acquire() blocks until a token is available. Tokens refill at `rate`
+    per second up to `capacity`, so requests never exceed `rate` on average or `capacity` in a burst.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def select_tornadoes(filters=(), top_k=PREFETCH_TOP_K, metrics=PREFETCH_METRICS):
+    """
+    Tornadoes with a recorded start point that match every (column, op, value) filter. With `top_k`,
+    only the union of each metric's top k rows is kept (top_n_index.candidate_rows; the defaults give
+    the Top 457 set); top_k=None keeps every matching row.
+    """
+    if top_k is None:
+        view = get_tornado_view("nonzero_start")
+        return view[view.index.isin(load_tornado_columns([], list(filters)).index)] if filters else view
+    return candidate_rows(top_k, metrics, filters=filters)
+
+
+def selection_label(filters=(), top_k=PREFETCH_TOP_K, metrics=PREFETCH_METRICS):
+    # Identifies a selection in the checkpoint, so a rerun knows whether it continues the same prefetch
+    return json.dumps({"filters": [list(f) for f in filters], "top_k": top_k, "metrics": list(metrics)})
+
+
+def _fetch_with_retries(batch, bucket, base_url, session, max_retries, backoff_base_s):
+    # Runs in a worker thread; returns (records, unavailable pairs, requests made, retries, last error or None).
+    # Locations settled by a failed attempt are kept, so a give-up still stores them.
+    records, unavailable, made = {}, [], 0
+    for attempt in range(max_retries + 1):
+        started = time.perf_counter()
+        try:
+            found, missing, n = resolve_batch(batch, base_url, session, bucket.acquire)
+            return {**records, **found}, unavailable + missing, made + n, attempt, None
+        except WeatherFetchError as e:
+            found, missing, n = e.resolved
+            records.update(found)
+            unavailable += [pair for pair in missing if pair not in unavailable]
+            made += n
+            error = e
+            logger.info("Batch %s..%s (%d locations) attempt %d failed: %s",
+                        batch.start_date, batch.end_date, len(batch.keys), attempt + 1, e)
+            if not isinstance(e, TransientWeatherError):
+                # The request itself is refused; retrying it would be refused again
+                return records, unavailable, made, attempt, error
+        finally:
+            WEATHER_METRICS.observe("fetch", time.perf_counter() - started)
+        if attempt < max_retries:
+            time.sleep(min(BACKOFF_MAX_S, backoff_base_s * 2 ** attempt) * random.uniform(0.5, 1.0))
+    return records, unavailable, made, max_retries, error
+
+
+def _write_checkpoint(path, checkpoint):
+    checkpoint["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    with atomic_write(path) as f:
+        json.dump(checkpoint, f, indent=2)
+
+
+def load_checkpoint(path=WEATHER_PREFETCH_CHECKPOINT_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def run_prefetch(tornadoes, cache=None, selection="custom", workers=PREFETCH_WORKERS,
+                 requests_per_s=PREFETCH_REQUESTS_PER_S, burst=PREFETCH_BURST, max_retries=PREFETCH_MAX_RETRIES,
+                 backoff_base_s=BACKOFF_BASE_S, max_locations=MAX_LOCATIONS_PER_REQUEST, gap_days=COALESCE_GAP_DAYS,
+                 max_batches=None, base_url=OPEN_METEO_ARCHIVE_URL, session=None,
+                 checkpoint_path=WEATHER_PREFETCH_CHECKPOINT_FILE, progress=True):
+    """
+    Fetch the start, path and end weather of every tornado in `tornadoes` that the cache is missing.
+    `max_batches` stops after that many batches (the rest is picked up by the next run).
+    Returns the final checkpoint dict: planned/fetched/failed counts, requests, retries and throughput.
+    """
+    cache = cache if cache is not None else open_weather_cache()
+    # Pooled connections for every worker; retries happen here, paced by the token bucket
+    session = session or make_session(retries=0, pool_size=workers)
+    keys = [pair for _, row in tornadoes.iterrows() for pair in weather_cache_keys(row, include_path=True)]
+    missing = cache.missing_fields(keys)
+    planned = plan_batches(missing, max_locations, gap_days)
+    plan = plan_report(missing, max_locations, gap_days)
+    batches = planned[:max_batches]
+
+    previous = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    resumed = previous is not None and previous.get("selection") == selection and not previous.get("finished")
+    checkpoint = {
+        "selection": selection,
+        "started_at": previous["started_at"] if resumed else time.strftime("%Y-%m-%d %H:%M:%S"),
+        "tornadoes": len(tornadoes),
+        "keys": len(set(keys)),
+        "already_cached": len(set(keys)) - len(missing),
+        "planned_batches": len(batches),
+        # Requests avoided by coalescing a location's nearby dates into one range
+        "requests_saved": plan["saved_vs_date_batched"],
+        # Keys whose cached row lacks only some fields, and the daily values planned against a full refetch
+        "partial_keys": plan["partial_keys"],
+        "values_requested": plan["values_requested"],
+        "values_full_refetch": plan["values_full_refetch"],
+        "completed_batches": 0,
+        "requests": 0,
+        "retries": 0,
+        "fetched": 0,
+        "unavailable": 0,
+        "failed": 0,
+        "failed_batches": [],
+        "finished": False,
+    }
+    if resumed:
+        logger.warning("Resuming prefetch '%s' started %s: %d of %d keys already cached",
+                       selection, checkpoint["started_at"], checkpoint["already_cached"], checkpoint["keys"])
+
+    bucket = TokenBucket(requests_per_s, burst)
+    started = time.perf_counter()
+    bar = tqdm(total=len(batches), unit="batch", disable=not progress)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(_fetch_with_retries, batch, bucket, base_url, session, max_retries, backoff_base_s): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            records, unavailable, made, retries, error = future.result()
+            checkpoint["requests"] += made
+            checkpoint["retries"] += retries
+            checkpoint["completed_batches"] += 1
+            store_resolved(cache, records, unavailable, batch.fields)
+            checkpoint["fetched"] += sum(pair in records for pair in batch.wanted)
+            checkpoint["unavailable"] += len(unavailable)
+            if error is not None:
+                # The rest is left uncached, so the next run plans it again
+                failed = [pair for pair in batch.wanted if pair not in records and pair not in unavailable]
+                WEATHER_METRICS.count("error", len(failed))
+                logger.warning("Giving up on %s..%s (%d locations) after %d attempts: %s",
+                               batch.start_date, batch.end_date, len(batch.keys), retries + 1, error)
+                checkpoint["failed"] += len(failed)
+                checkpoint["failed_batches"].append({"start_date": batch.start_date, "end_date": batch.end_date,
+                                                     "locations": len(batch.keys), "error": str(error)})
+
+            elapsed = time.perf_counter() - started
+            bar.update(1)
+            bar.set_postfix(locations_per_s=f"{checkpoint['fetched'] / elapsed:.1f}", failed=checkpoint["failed"])
+            if checkpoint_path and checkpoint["completed_batches"] % CHECKPOINT_EVERY_BATCHES == 0:
+                cache.flush()
+                _write_checkpoint(checkpoint_path, checkpoint)
+        checkpoint["finished"] = len(batches) == len(planned) and not checkpoint["failed"]
+    finally:
+        # On Ctrl+C: drop the queued batches, keep what finished, and leave a checkpoint to resume from
+        executor.shutdown(wait=True, cancel_futures=True)
+        bar.close()
+        cache.flush()
+        elapsed = time.perf_counter() - started
+        checkpoint["seconds"] = round(elapsed, 2)
+        checkpoint["locations_per_s"] = round(checkpoint["fetched"] / elapsed, 2) if elapsed else 0.0
+        if checkpoint_path:
+            _write_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint
+
+
+def _selection_from_args(args):
+    filters = []
+    if args.years:
+        filters += [("yr", ">=", args.years[0]), ("yr", "<=", args.years[1])]
+    if args.min_mag is not None:
+        filters.append(("mag", ">=", args.min_mag))
+    if args.states:
+        filters.append(("st", "in", args.states))
+    top_k = None if args.all else args.top_k
+    return filters, top_k, selection_label(filters, top_k, args.metrics)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefetch Open-Meteo weather for a selection of tornadoes.")
+    parser.add_argument("--years", nargs=2, type=int, metavar=("FIRST", "LAST"), help="Only tornadoes in these years")
+    parser.add_argument("--min-mag", type=int, help="Only tornadoes of at least this (E)F rating")
+    parser.add_argument("--states", nargs="+", help="Only tornadoes starting in these states (e.g. OK KS)")
+    parser.add_argument("--top-k", type=int, default=PREFETCH_TOP_K, help="Keep the top k per metric (default %(default)s)")
+    parser.add_argument("--metrics", nargs="+", default=PREFETCH_METRICS, help="Metrics for --top-k (default %(default)s)")
+    parser.add_argument("--all", action="store_true", help="Every matching tornado instead of the top k")
+    parser.add_argument("--workers", type=int, default=PREFETCH_WORKERS)
+    parser.add_argument("--rate", type=float, default=PREFETCH_REQUESTS_PER_S, help="Requests per second")
+    parser.add_argument("--gap-days", type=int, default=COALESCE_GAP_DAYS,
+                        help="Unneeded days allowed inside one date range (default %(default)s)")
+    parser.add_argument("--max-batches", type=int, help="Stop after this many requests' worth of batches")
+    args = parser.parse_args()
+
+    filters, top_k, selection = _selection_from_args(args)
+    tornadoes = select_tornadoes(filters, top_k, args.metrics)
+    print(f"🌪️ {len(tornadoes)} tornadoes selected")
+    try:
+        report = run_prefetch(tornadoes, selection=selection, workers=args.workers,
+                              requests_per_s=args.rate, gap_days=args.gap_days,
+                              max_batches=args.max_batches)
+    except KeyboardInterrupt:
+        print(f"⏸️ Interrupted; progress saved. Rerun the same command to resume ({WEATHER_PREFETCH_CHECKPOINT_FILE}).")
+        raise SystemExit(130)
+    print(f"✅ {report['fetched']} locations fetched in {report['requests']} requests "
+          f"({report['retries']} retries, {report['requests_saved']} saved by date ranges, "
+          f"{report['locations_per_s']} locations/s); "
+          f"{report['already_cached']} of {report['keys']} were already cached")
+    if report["failed"]:
+        print(f"⚠️ {report['failed']} locations failed and stay uncached; rerun to retry them")
+    # The science pages see the new rows now rather than once the matrix falls far enough behind
+    ensure_weather_matrix(open_weather_cache().store, refresh=True)
@@ -0,0 +1,484 @@
+# SQLite-backed weather cache keyed by (date, lat, lon)
+#
+# Replaces rewriting cache/weather_cache.json on every miss. The first open migrates the JSON file
+# into the store; the JSON layout can be regenerated from the store at any time:
+#   python -m utils.weather_store export [cache/weather_cache.json]
+#   python -m utils.weather_store migrate [cache/weather_cache.json]
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from utils.atomic_write import atomic_write
+from utils.constants import TOP_N_CHOICES, WEATHER_CACHE_FILE, WEATHER_STORE_FILE
+from utils.weather_grid import WEATHER_GRID
+from utils.weather_metrics import logger
+
+# Daily variables kept per (date, lat, lon), in the order of the Open-Meteo request. Adding one adds a
+# column on the next open; existing rows then miss only that field, and only it is fetched for them.
+WEATHER_FIELDS = [
+    "temperature", "wind_speed", "precipitation", "dew_point", "humidity",
+    "cloud_cover", "pressure", "cape", "soil_moisture",
+]
+
+# 1: one REAL column per field. 2: plus fields_mask, one bit per field (in the order of the "fields"
+# meta entry) set once that field has been fetched for the row, even if its value is null.
+WEATHER_SCHEMA_VERSION = 2
+# The field set every row written before version 2 was fetched with
+_VERSION_1_FIELDS = [
+    "temperature", "wind_speed", "precipitation", "dew_point", "humidity",
+    "cloud_cover", "pressure", "cape", "soil_moisture",
+]
+
+# Other Streamlit processes may hold the write lock briefly; wait instead of failing
+BUSY_TIMEOUT_MS = 5000
+
+# Write-behind thresholds. Renders flush once when they end; the size cap is only a safety net for bulk
+# work, twice the keys of the largest Top N map (6 points per tornado). A timer flushes whatever has
+# waited WRITE_BATCH_MAX_AGE_S, so a crash loses at most that much.
+WRITE_BATCH_MAX_RECORDS = 2 * 6 * max(TOP_N_CHOICES)
+WRITE_BATCH_MAX_AGE_S = 10.0
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS weather (
+    date TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    {", ".join(f"{field} REAL" for field in _VERSION_1_FIELDS)},
+    PRIMARY KEY (date, lat, lon)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _upsert_sql(fields):
+    # Writes only `fields` and adds their bits to the row's mask; other fields keep their values
+    return (
+        f"INSERT INTO weather (date, lat, lon, {', '.join(fields)}, fields_mask) "
+        f"VALUES (?, ?, ?, {', '.join('?' for _ in fields)}, ?) "
+        f"ON CONFLICT (date, lat, lon) DO UPDATE SET "
+        f"{''.join(f'{field} = excluded.{field}, ' for field in fields)}fields_mask = fields_mask | excluded.fields_mask"
+    )
+
+
+def record_fields(record):
+    # The fields a (possibly partial) record holds, in WEATHER_FIELDS order
+    return tuple(field for field in WEATHER_FIELDS if field in record)
+
+
+def key_coordinates(key):
+    # "35.46,-97.38" -> (35.46, -97.38); the 2-decimal key format round-trips exactly through float
+    lat, lon = key.split(",")
+    return float(lat), float(lon)
+
+
+def coordinate_key(lat, lon):
+    return f"{lat:.2f},{lon:.2f}"
+
+
+class WeatherStore:
+    """
+    Daily weather records keyed by (date_str, "lat,lon"), in WAL mode so processes read while one writes.
+    """
+
+    def __init__(self, path=WEATHER_STORE_FILE):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+        self._migrate()
+        if self.get_meta("store_id") is None:
+            # Tells a recreated store apart from the old one, whose write count may have been the same
+            self.set_meta("store_id", uuid.uuid4().hex[:12])
+
+    def _migrate(self):
+        """
+        Bring the table to WEATHER_SCHEMA_VERSION and add a column (and mask bit) for every field in
+        WEATHER_FIELDS it does not have yet. Bits are never reused, so old masks stay valid.
+        """
+        version = int(self.get_meta("schema_version") or 1)
+        registry = json.loads(self.get_meta("fields") or json.dumps(_VERSION_1_FIELDS))
+        with self._connection() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(weather)")}
+            if "fields_mask" not in columns:
+                conn.execute("ALTER TABLE weather ADD COLUMN fields_mask INTEGER NOT NULL DEFAULT 0")
+                # Rows from before the mask were always fetched with the full original field set
+                conn.execute("UPDATE weather SET fields_mask = ?", (_mask(registry, _VERSION_1_FIELDS),))
+            for field in WEATHER_FIELDS:
+                if field not in registry:
+                    registry.append(field)
+                if field not in columns:
+                    conn.execute(f"ALTER TABLE weather ADD COLUMN {field} REAL")
+        if version < WEATHER_SCHEMA_VERSION or self.get_meta("fields") != json.dumps(registry):
+            self.set_meta("fields", json.dumps(registry))
+            self.set_meta("schema_version", str(WEATHER_SCHEMA_VERSION))
+        self.registry = registry
+        self._upserts = {}
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, date_str, key):
+        lat, lon = key_coordinates(key)
+        row = self._connection().execute(
+            f"SELECT {', '.join(WEATHER_FIELDS)} FROM weather WHERE date = ? AND lat = ? AND lon = ?",
+            (date_str, lat, lon),
+        ).fetchone()
+        return None if row is None else dict(zip(WEATHER_FIELDS, row))
+
+    def get_many(self, keys):
+        """
+        {(date_str, key): record} for the (date_str, key) pairs that are stored; missing pairs are left out.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for date_str in sorted({date_str for date_str, _ in keys}):
+            rows = self._connection().execute(
+                f"SELECT lat, lon, {', '.join(WEATHER_FIELDS)} FROM weather WHERE date = ?", (date_str,)
+            ).fetchall()
+            by_key = {coordinate_key(lat, lon): dict(zip(WEATHER_FIELDS, values)) for lat, lon, *values in rows}
+            for wanted_date, key in keys:
+                if wanted_date == date_str and key in by_key:
+                    found[(date_str, key)] = by_key[key]
+        return found
+
+    def missing_fields(self, keys, fields=WEATHER_FIELDS):
+        """
+        {(date_str, key): [field, ...]} for the pairs that lack any of `fields`: every field for pairs
+        with no row, only the unfetched ones for rows written with a smaller field set.
+        """
+        keys = list(dict.fromkeys(keys))
+        masks = {}
+        for date_str in sorted({date_str for date_str, _ in keys}):
+            rows = self._connection().execute(
+                "SELECT lat, lon, fields_mask FROM weather WHERE date = ?", (date_str,)
+            ).fetchall()
+            masks.update({(date_str, coordinate_key(lat, lon)): mask for lat, lon, mask in rows})
+        missing = {}
+        for pair in keys:
+            mask = masks.get(pair, 0)
+            lacking = [field for field in fields if not mask & (1 << self.registry.index(field))]
+            if lacking:
+                missing[pair] = lacking
+        return missing
+
+    def missing_keys(self, keys, fields=WEATHER_FIELDS):
+        return list(self.missing_fields(keys, fields))
+
+    def upsert_many(self, records):
+        """
+        Insert or merge (date_str, key, record) triples in one transaction. Only the fields a record
+        holds are written, so a partial record fills in fields without touching the others.
+        """
+        by_fields = {}
+        for date_str, key, record in records:
+            fields = record_fields(record)
+            by_fields.setdefault(fields, []).append(
+                (date_str, *key_coordinates(key), *(record[field] for field in fields), _mask(self.registry, fields))
+            )
+        by_fields.pop((), None)
+        if by_fields:
+            with self._connection() as conn:
+                for fields, rows in by_fields.items():
+                    if fields not in self._upserts:
+                        self._upserts[fields] = _upsert_sql(fields)
+                    conn.executemany(self._upserts[fields], rows)
+                _bump_revision(conn)
+        return sum(len(rows) for rows in by_fields.values())
+
+    def put(self, date_str, key, record):
+        self.upsert_many([(date_str, key, record)])
+
+    def frame(self, dates):
+        """
+        Columnar slice of the store: one row per cached (date, lat, lon) for the given dates.
+        """
+        dates = sorted(set(dates))
+        rows = []
+        for start in range(0, len(dates), 500):
+            chunk = dates[start:start + 500]
+            rows += self._connection().execute(
+                f"SELECT date, lat, lon, {', '.join(WEATHER_FIELDS)} FROM weather "
+                f"WHERE date IN ({', '.join('?' for _ in chunk)})", chunk
+            ).fetchall()
+        return _records_frame(rows)
+
+    def dates(self):
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT date FROM weather ORDER BY date")]
+
+    def delete_except(self, keep):
+        """
+        Delete every row whose (date, lat, lon) is not in `keep`, in one transaction. Returns the number deleted.
+        """
+        rows = self._connection().execute("SELECT date, lat, lon FROM weather").fetchall()
+        doomed = [row for row in rows if row not in keep]
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM weather WHERE date = ? AND lat = ? AND lon = ?", doomed)
+            if doomed:
+                _bump_revision(conn)
+        return len(doomed)
+
+    def revision(self):
+        """
+        "<store id>:<write count>", changed by every upsert or delete in any process; what derived
+        artifacts (utils.weather_matrix) compare to know they are stale.
+        """
+        return f"{self.get_meta('store_id')}:{self.get_meta('revision') or 0}"
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM weather").fetchone()[0]
+
+    def get_meta(self, key):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key, value):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def to_nested_dict(self):
+        nested = {}
+        rows = self._connection().execute(
+            f"SELECT date, lat, lon, {', '.join(WEATHER_FIELDS)} FROM weather ORDER BY date, lat, lon"
+        )
+        for date_str, lat, lon, *values in rows:
+            nested.setdefault(date_str, {})[coordinate_key(lat, lon)] = dict(zip(WEATHER_FIELDS, values))
+        return nested
+
+
+def _overlay(stored, queued):
+    # A queued (possibly partial) record over the stored one; None when neither exists
+    if queued is None:
+        return stored
+    return {**dict.fromkeys(WEATHER_FIELDS), **(stored or {}), **queued}
+
+
+def _bump_revision(conn):
+    # Inside the writing transaction, so readers never see new rows with the old revision
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('revision', '1') "
+        "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+
+
+def _mask(registry, fields):
+    return sum(1 << registry.index(field) for field in fields)
+
+
+def _records_frame(rows):
+    frame = pd.DataFrame(rows, columns=["date", "lat", "lon"] + WEATHER_FIELDS)
+    return frame.astype({field: "float64" for field in WEATHER_FIELDS})
+
+
+def migrate_json_cache(store, json_path=WEATHER_CACHE_FILE):
+    """
+    Load the {date: {"lat,lon": record}} JSON cache into the store. Existing rows are overwritten.
+    """
+    with open(json_path, "r") as f:
+        cache = json.load(f)
+    records = [
+        (date_str, key, record)
+        for date_str, by_key in cache.items()
+        for key, record in by_key.items()
+        if isinstance(record, dict)
+    ]
+    count = store.upsert_many(records)
+    store.set_meta("migrated_from", os.path.abspath(json_path))
+    return count
+
+
+def export_json_cache(store, json_path=WEATHER_CACHE_FILE):
+    # Same layout as the original cache file, so the JSON stays usable for review and diffs
+    with atomic_write(json_path) as f:
+        json.dump(store.to_nested_dict(), f, indent=4)
+
+
+class WriteBehindWeatherCache:
+    """
+    The store's read API over a write buffer, written in one upsert on flush(), at `max_records`,
+    `max_age_s` after the first put (on a timer) or at exit. Reads see queued records.
+    """
+
+    def __init__(self, store, max_records=WRITE_BATCH_MAX_RECORDS, max_age_s=WRITE_BATCH_MAX_AGE_S):
+        self.store = store
+        self.max_records = max_records
+        self.max_age_s = max_age_s
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def get(self, date_str, key):
+        with self._lock:
+            record = self._pending.get((date_str, key))
+        if record is not None and len(record) == len(WEATHER_FIELDS):
+            return record
+        stored = self.store.get(date_str, key)
+        return _overlay(stored, record)
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            queued = {pair: self._pending[pair] for pair in keys if pair in self._pending}
+        partial = [pair for pair, record in queued.items() if len(record) < len(WEATHER_FIELDS)]
+        found = self.store.get_many([pair for pair in keys if pair not in queued] + partial)
+        for pair, record in queued.items():
+            found[pair] = _overlay(found.get(pair), record)
+        return found
+
+    def missing_fields(self, keys, fields=WEATHER_FIELDS):
+        missing = self.store.missing_fields(keys, fields)
+        with self._lock:
+            for pair in list(missing):
+                queued = self._pending.get(pair)
+                if queued is not None:
+                    lacking = [field for field in missing[pair] if field not in queued]
+                    if lacking:
+                        missing[pair] = lacking
+                    else:
+                        del missing[pair]
+        return missing
+
+    def missing_keys(self, keys, fields=WEATHER_FIELDS):
+        return list(self.missing_fields(keys, fields))
+
+    def frame(self, dates):
+        dates = set(dates)
+        with self._lock:
+            queued = [
+                (date_str, *key_coordinates(key), *(record.get(field) for field in WEATHER_FIELDS))
+                for (date_str, key), record in self._pending.items() if date_str in dates
+            ]
+        stored = self.store.frame(dates)
+        if not queued:
+            return stored
+        # Queued values replace what the store has for the same key; fields a partial record lacks keep the stored value
+        index = ["date", "lat", "lon"]
+        queued = _records_frame(queued).set_index(index)
+        return queued.combine_first(stored.set_index(index)).reset_index()[index + WEATHER_FIELDS]
+
+    def put(self, date_str, key, record):
+        with self._lock:
+            # A partial record merges into a queued one for the same key
+            self._pending[(date_str, key)] = {**self._pending.get((date_str, key), {}), **record}
+            if self._oldest is None:
+                self._start_age_timer()
+            due = len(self._pending) >= self.max_records
+        if due:
+            self.flush()
+
+    def _start_age_timer(self):
+        # Called with the lock held when the buffer stops being empty
+        self._oldest = time.monotonic()
+        timer = threading.Timer(self.max_age_s, self._flush_if_old)
+        timer.daemon = True
+        timer.start()
+
+    def _flush_if_old(self):
+        with self._lock:
+            # Flushed (and possibly refilled, with its own timer) since this timer started
+            due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_age_s
+        if due:
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.warning("Weather write-behind flush failed, retrying later: %s", e)
+
+    def upsert_many(self, records):
+        for date_str, key, record in records:
+            self.put(date_str, key, record)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """
+        Write every queued record in one transaction. Returns the number written.
+        """
+        with self._flush_lock:
+            # Records stay queued (and readable) until the transaction has committed
+            with self._lock:
+                batch = dict(self._pending)
+            if not batch:
+                return 0
+            try:
+                written = self.store.upsert_many((date_str, key, record) for (date_str, key), record in batch.items())
+            except sqlite3.Error:
+                # Still queued, so the next flush retries it
+                with self._lock:
+                    self._start_age_timer()
+                raise
+            with self._lock:
+                # A put() during the write replaced its record with a merged one, which stays queued
+                for pair, record in batch.items():
+                    if self._pending.get(pair) is record:
+                        del self._pending[pair]
+                self._oldest = None
+                if self._pending:
+                    self._start_age_timer()
+            return written
+
+
+_stores = {}
+_caches = {}
+_stores_lock = threading.Lock()
+
+
+def open_weather_store(path=WEATHER_STORE_FILE, json_path=WEATHER_CACHE_FILE):
+    """
+    Shared store for `path`, created on first use and seeded once from the JSON cache.
+    """
+    with _stores_lock:
+        if path not in _stores:
+            store = WeatherStore(path)
+            if store.get_meta("migrated_from") is None and os.path.exists(json_path):
+                migrate_json_cache(store, json_path)
+            if WEATHER_GRID != "exact" and store.get_meta(f"grid_{WEATHER_GRID}") is None:
+                logger.warning("FURY_WEATHER_GRID=%s but the store has no %s cells yet; run "
+                               "python -m utils.weather_grid collapse --grid %s", WEATHER_GRID, WEATHER_GRID, WEATHER_GRID)
+            _stores[path] = store
+        return _stores[path]
+
+
+def open_weather_cache(path=WEATHER_STORE_FILE):
+    """
+    Shared write-behind cache over open_weather_store(path); what the app's fetch paths read and write.
+    """
+    store = open_weather_store(path)
+    with _stores_lock:
+        if path not in _caches:
+            _caches[path] = WriteBehindWeatherCache(store)
+        return _caches[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate or export the SQLite weather cache.")
+    parser.add_argument("command", choices=["migrate", "export"])
+    parser.add_argument("json_path", nargs="?", default=WEATHER_CACHE_FILE)
+    parser.add_argument("--store", default=WEATHER_STORE_FILE)
+    args = parser.parse_args()
+
+    store = WeatherStore(args.store)
+    if args.command == "migrate":
+        print(f"✅ Migrated {migrate_json_cache(store, args.json_path)} records into {args.store}")
+    else:
+        export_json_cache(store, args.json_path)
+        print(f"✅ Exported {len(store)} records to {args.json_path}")
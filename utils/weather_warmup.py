@@ -0,0 +1,117 @@
+# Background weather warm-up for a new Top N selection
+#
+# With live fetching on, the first map render of a new metric / N used to block on the archive for every
+# path point. The sidebar now hands the selection's missing keys to a small thread pool as soon as it
+# changes; the map renders at once with placeholders for keys still in flight and reruns until they land.
+# The in-flight registry is shared by every session of the Streamlit process, so two users picking the
+# same selection trigger one fetch per key. Keys whose fetch failed are left alone (by the warm-up and
+# the render) for WARMUP_RETRY_S, so a failing archive is not hit again on every rerun.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from utils.weather_api import OPEN_METEO_ARCHIVE_URL, fetch_planned_batch, plan_batches
+from utils.weather_metrics import logger
+from utils.weather_store import coordinate_key, open_weather_cache
+
+# Batches fetched at once; each holds up to 100 locations, so this stays well within the archive's limits
+WARMUP_WORKERS = 4
+# Seconds between the map's reruns while keys of its selection are still being fetched
+WARMUP_POLL_S = 2.0
+# Seconds a key whose warm-up fetch failed is served nearest-or-missing instead of being fetched again
+WARMUP_RETRY_S = 300.0
+
+_executor = None
+# (date_str, "lat,lon") -> Future of the batch fetching it. Reentrant: a done callback can run inline
+_in_flight = {}
+_in_flight_lock = threading.RLock()
+# (date_str, "lat,lon") -> time.monotonic() of its last failed fetch
+_failed = {}
+
+
+def _get_executor():
+    global _executor
+    with _in_flight_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WARMUP_WORKERS, thread_name_prefix="weather-warmup")
+        return _executor
+
+
+def _fetch_batch(batch, cache, base_url, session):
+    try:
+        stats = fetch_planned_batch(batch, cache, base_url, session)
+        lost = cache.missing_keys(list(batch.wanted), batch.fields) if stats["failed"] else []
+    except Exception:
+        _record_failures(batch.wanted, batch.wanted)
+        raise
+    _record_failures(batch.wanted, lost)
+    cache.flush()
+    logger.info("Warm-up batch %s..%s: %d fetched, %d failed", batch.start_date, batch.end_date,
+                stats["fetched"], stats["failed"])
+    return stats
+
+
+def _record_failures(pairs, lost):
+    with _in_flight_lock:
+        for pair in pairs:
+            _failed.pop(pair, None)
+        _failed.update(dict.fromkeys(lost, time.monotonic()))
+
+
+def _release(pairs, future):
+    with _in_flight_lock:
+        for pair in pairs:
+            if _in_flight.get(pair) is future:
+                del _in_flight[pair]
+
+
+def warm_up(keys, cache=None, base_url=OPEN_METEO_ARCHIVE_URL, session=None):
+    """
+    Start fetching the (date_str, "lat,lon") keys that `cache` lacks (or lacks fields for) in the
+    background, one pool task per planned batch. Keys already being fetched by any session, or whose
+    fetch recently failed, are skipped. Returns the number of keys queued by this call.
+    """
+    cache = cache if cache is not None else open_weather_cache()
+    skipped = failed(keys)
+    with _in_flight_lock:
+        candidates = [pair for pair in dict.fromkeys(keys) if pair not in _in_flight and pair not in skipped]
+    missing = cache.missing_fields(candidates)
+    with _in_flight_lock:
+        # Another session may have queued some of them while the store was being read
+        missing = {pair: fields for pair, fields in missing.items() if pair not in _in_flight}
+        for batch in plan_batches(missing):
+            future = _get_executor().submit(_fetch_batch, batch, cache, base_url, session)
+            for pair in batch.wanted:
+                _in_flight[pair] = future
+            future.add_done_callback(partial(_release, batch.wanted))
+    return len(missing)
+
+
+def warm_up_tornadoes(df, cache=None):
+    """
+    Queue the start, path and end keys of every tornado in df (what the map can show for them).
+    Returns the keys, for in_flight() on later reruns.
+    """
+    from utils.weather import weather_key_frame
+
+    keys = weather_key_frame(df, "path")[["date", "lat", "lon"]].drop_duplicates()
+    pairs = [(date_str, coordinate_key(lat, lon)) for date_str, lat, lon in keys.itertuples(index=False)]
+    queued = warm_up(pairs, cache)
+    logger.info("Weather warm-up: %d of %d keys queued", queued, len(pairs))
+    return pairs
+
+
+def in_flight(keys=None):
+    # The given keys (all by default) that a background fetch is still working on
+    with _in_flight_lock:
+        if keys is None:
+            return set(_in_flight)
+        return {pair for pair in keys if pair in _in_flight}
+
+
+def failed(keys):
+    # The given keys whose warm-up fetch failed less than WARMUP_RETRY_S ago
+    cutoff = time.monotonic() - WARMUP_RETRY_S
+    with _in_flight_lock:
+        return {pair for pair in keys if _failed.get(pair, cutoff) > cutoff}